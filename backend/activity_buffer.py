@@ -0,0 +1,130 @@
+import os
+import threading
+from dotenv import load_dotenv
+from . import database, progress
+
+load_dotenv()
+
+# Write-behind for /api/track-activity: off by default, events are committed per request
+ACTIVITY_BUFFER = os.getenv("ACTIVITY_BUFFER", "0") == "1"
+ACTIVITY_BUFFER_MAX_EVENTS = int(os.getenv("ACTIVITY_BUFFER_MAX_EVENTS", "500"))
+ACTIVITY_BUFFER_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_BUFFER_FLUSH_INTERVAL", "1.0"))
+# Events kept for retry when the database is unavailable; older ones are dropped beyond this
+ACTIVITY_BUFFER_MAX_PENDING = int(os.getenv("ACTIVITY_BUFFER_MAX_PENDING", "100000"))
+
+
+class ActivityBuffer:
+    """
+    Collects study sessions in memory and writes them with
+    progress.record_sessions() in one transaction once `max_events` are
+    queued or `flush_interval` seconds have passed, whichever comes first.
+    Each event keeps the time it was received. stop() drains what is left.
+    """
+
+    def __init__(self, max_events=ACTIVITY_BUFFER_MAX_EVENTS, flush_interval=ACTIVITY_BUFFER_FLUSH_INTERVAL,
+                 max_pending=ACTIVITY_BUFFER_MAX_PENDING, session_factory=None):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.session_factory = session_factory or database.SessionLocal
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # one writer at a time keeps events in arrival order
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flusher = None
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and self._flusher.is_alive()
+
+    def add(self, activity_type: str, duration_seconds: int = 0):
+        with self._lock:
+            self._events.append({
+                "activity_type": activity_type,
+                "duration_seconds": duration_seconds,
+                "created_at": progress.utc_now(),
+            })
+            full = len(self._events) >= self.max_events
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Writes every queued event now. Returns how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+
+            db = self.session_factory()
+            try:
+                progress.record_sessions(db, events)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Activity buffer flush failed ({len(events)} events): {e}")
+                with self._lock:
+                    self.failures += 1
+                    # Put them back in front of anything queued meanwhile, bounded by max_pending
+                    self._events = events + self._events
+                    overflow = len(self._events) - self.max_pending
+                    if overflow > 0:
+                        del self._events[:overflow]
+                        self.dropped += overflow
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                self.flushed += len(events)
+                self.flushes += 1
+            return len(events)
+
+    def clear(self):
+        """Discards queued events (used when progress is reset)."""
+        with self._lock:
+            self._events = []
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self.flush()
+
+        self._flusher = threading.Thread(target=_loop, name="activity-buffer-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self, timeout=10.0):
+        """Stops the flusher and drains the remaining events."""
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout)
+            self._flusher = None
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.running,
+                "pending": len(self._events),
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "max_events": self.max_events,
+                "flush_interval": self.flush_interval,
+            }
+
+
+buffer = ActivityBuffer()
@@ -1,211 +1,215 @@
 
 import os
 import json
-import time 
-import requests
-import google.generativeai as genai
+import time
+import asyncio
 from dotenv import load_dotenv
+from . import model_catalog, result_cache, providers, hedging, circuit_breaker, singleflight, timing, question_bank
 
 load_dotenv()
 
+# google.generativeai itself is imported lazily (see providers.gemini)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Parts of a study pack, and the result-cache generator each one shares with its own endpoint
+STUDY_PACK_PARTS = ("summary", "quiz", "flashcards", "map")
+STUDY_PACK_GENERATORS = {"summary": "summary", "quiz": "quiz", "flashcards": "flashcards", "map": "concept_map"}
+
+# What each part looks like in the combined answer, how it is normalized and
+# the check it must pass (the same ones the single-artifact generators apply)
+STUDY_PACK_FORMATS = {
+    "summary": '"summary": "One clear paragraph, under 300 words: key concepts, importance and main details"',
+    "quiz": '"quiz": {"questions": [{"id": 1, "question": "Question text?", "options": ["Unique Option A", "Unique Option B", "Unique Option C", "Unique Option D"], "answer": "Correct Option Text"}]}',
+    "flashcards": '"flashcards": {"flashcards": [{"front": "Question/Term", "back": "Answer/Definition"}]}',
+    "map": '"map": {"layout": "tree", "root": "ROOT_TOPIC", "edges": [{"source": "Parent Node", "target": "Child Node", "relationship": "contains/relates-to"}]}',
+}
+STUDY_PACK_RULES = {
+    "summary": '"summary" is plain text, not markdown.',
+    "quiz": '"quiz" has EXACTLY 10 questions, each with 4 unique options; no generic options like "Option A".',
+    "flashcards": '"flashcards" has 10 cards.',
+    "map": '"map" is a hierarchical concept map of 5-8 nodes rooted at the topic.',
+}
+STUDY_PACK_NORMALIZERS = {
+    "quiz": question_bank.normalize_quiz,
+}
+STUDY_PACK_CHECKS = {
+    "summary": lambda v: isinstance(v, str) and bool(v.strip()),
+    "quiz": lambda v: len(v["questions"]) >= question_bank.QUIZ_SIZE,
+    "flashcards": lambda v: isinstance(v, dict) and isinstance(v.get("flashcards"), list) and len(v["flashcards"]) > 0,
+    "map": lambda v: isinstance(v, dict) and "root" in v and isinstance(v.get("edges"), list) and len(v["edges"]) > 0,
+}
+
+PROBE_PROMPT = "Reply with the single word OK."
+
+async def _probe_gemini(breaker_name: str):
+    # "gemini" probes the top-priority model; "gemini:<model>" probes that model
+    model_name = breaker_name.split(":", 1)[1] if ":" in breaker_name else model_catalog.catalog.get()[0]
+    await providers.generate_with_gemini(model_name, PROBE_PROMPT)
+
+async def _probe_huggingface(breaker_name: str):
+    await providers.generate_with_huggingface(PROBE_PROMPT)
+
+async def _probe_pollinations(breaker_name: str):
+    await providers.generate_with_pollinations(PROBE_PROMPT)
+
+circuit_breaker.breakers.register_probe("gemini", _probe_gemini)
+circuit_breaker.breakers.register_probe("huggingface", _probe_huggingface)
+circuit_breaker.breakers.register_probe("pollinations", _probe_pollinations)
 
 class AIService:
     @staticmethod
     def _get_valid_models():
         """
-        Returns a prioritized list of GEMINI models (excludes Gemma which doesn't support JSON mode).
+        Returns the prioritized list of GEMINI models from the cached catalog.
+        Never blocks on genai.list_models(); stale entries are refreshed in the background.
         """
-        try:
-            # Get all models that support content generation
-            all_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-            
-            # CRITICAL: Filter out Gemma models - they don't support JSON mode
-            all_models = [m for m in all_models if 'gemini' in m.lower() and 'gemma' not in m.lower()]
-            
-            if not all_models:
-                return []
-
-            # Define preference order
-            preference = [
-                'gemini-2.0-flash', 
-                'gemini-1.5-pro', 
-                'gemini-1.5-flash', 
-                'gemini-pro',
-                'gemini-1.0-pro'
-            ]
-            
-            prioritized_models = []
-            
-            # 1. Add preferred models in order if they exist
-            for p in preference:
-                for m in all_models:
-                    if p in m and m not in prioritized_models:
-                        prioritized_models.append(m)
-            
-            # 2. Add any remaining models that weren't in our preference list
-            for m in all_models:
-                if m not in prioritized_models:
-                    prioritized_models.append(m)
-                    
-            print(f"DEBUG: Prioritized Model List: {prioritized_models}")
-            return prioritized_models
+        return model_catalog.catalog.get()
 
-        except Exception as e:
-            print(f"Error listing models: {e}")
-            return ['models/gemini-1.5-flash'] # Fallback
+    @staticmethod
+    async def _generate_with_gemini(prompt: str, generation_config=None):
+        valid_models = AIService._get_valid_models()
+        for model_name in valid_models:
+            # Quota is shared across models, so stop as soon as the provider circuit opens
+            if not circuit_breaker.breakers.allow("gemini"):
+                break
+            # Skip models we already know are failing instead of waiting on them
+            breaker_name = f"gemini:{model_name}"
+            if not circuit_breaker.breakers.allow(breaker_name):
+                continue
+            try:
+                # print(f"Trying Gemini: {model_name}...")
+                return await circuit_breaker.breakers.call(
+                    breaker_name,
+                    lambda: providers.generate_with_gemini(model_name, prompt, generation_config)
+                )
+            except Exception as e:
+                if circuit_breaker.is_quota_error(e):
+                    print(f"Gemini 429 (Quota) on {model_name}. Circuit opened.")
+                    raise e # Shared quota exhausted - other models will 429 too
+                print(f"Gemini error on {model_name}: {e}") # Next model
+        raise Exception("No Gemini model available (circuits open or all models failed).")
 
     @staticmethod
-    def _generate_with_huggingface(prompt: str):
-        """
-        Fallback generator using Direct HTTP Request to Hugging Face
-        """
-        if not HUGGINGFACE_API_KEY:
-            raise Exception("No Hugging Face Key available for fallback.")
-            
-        print("Switched to Hugging Face Model (Mistral-7B via HTTP)...")
-        
-        # Using Mistral v0.3 on classic endpoint (more stable than router)
-        API_URL = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.3"
-        headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-        
-        # Mistral expects a specific prompt format for best results, but raw text works too
-        payload = {
-            "inputs": f"[INST] {prompt} [/INST]",
-            "parameters": {
-                "max_new_tokens": 1000,
-                "temperature": 0.7,
-                "return_full_text": False
-            }
-        }
-        
-        try:
-            response = requests.post(API_URL, headers=headers, json=payload)
-            
-            if response.status_code != 200:
-                raise Exception(f"HF API Error {response.status_code}: {response.text}")
-                
-            result = response.json()
-            # HF returns a list of objects, usually [{'generated_text': '...'}]
-            if isinstance(result, list) and len(result) > 0:
-                generated_text = result[0].get('generated_text', '')
-            elif isinstance(result, dict):
-                 generated_text = result.get('generated_text', '')
-            else:
-                generated_text = str(result)
+    async def _generate_content_safe(prompt: str, generation_config=None):
+        # One "llm" span per call; the provider that answers labels it with its name and model
+        with timing.span("llm", provider="", model=""):
+            return await AIService._generate_with_fallbacks(prompt, generation_config)
+
+    @staticmethod
+    async def _generate_with_fallbacks(prompt: str, generation_config=None):
+        # Provider chain in priority order: Gemini, Hugging Face, Pollinations.ai (Free Public API)
+        candidates = []
+        if GEMINI_API_KEY:
+            candidates.append(("gemini", lambda: AIService._generate_with_gemini(prompt, generation_config)))
+        if providers.HUGGINGFACE_API_KEY:
+            candidates.append(("huggingface", lambda: providers.generate_with_huggingface(prompt)))
+        candidates.append(("pollinations", lambda: providers.generate_with_pollinations(prompt)))
+
+        # Open circuits are skipped outright; every outcome feeds the provider's breaker
+        attempts = [
+            (name, lambda name=name, factory=factory: circuit_breaker.breakers.call(name, factory))
+            for name, factory in candidates
+            if circuit_breaker.breakers.allow(name)
+        ]
+        if not attempts:
+            raise Exception("ALL AI SYSTEMS BUSY (circuits open for every provider).")
+
+        # Hedged mode races the next provider once the current one is slower than its p95
+        if hedging.AI_HEDGING:
+            response, errors = await hedging.run_hedged(attempts)
+        else:
+            response, errors = await hedging.run_sequential(attempts)
+
+        if response is not None:
+            return response
+
+        # If All Failed
+        error_msg = "; ".join(f"{name}: {e}" for name, e in errors)
+        if "429" in error_msg:
+             raise Exception(f"ALL AI SYSTEMS BUSY (Quota Exceeded). Errors: {error_msg}")
+        raise Exception(f"All AI Providers Failed. Details: {error_msg}")
+
 
-            # Mocking a response object to match Gemini's interface
-            class MockResponse:
-                def __init__(self, text):
-                    self.text = text
-            
-            return MockResponse(generated_text)
-            
-        except Exception as e:
-            print(f"Hugging Face HTTP Error: {e}")
-            raise e
 
     @staticmethod
-    def _generate_with_pollinations(prompt: str):
+    async def stream_response(prompt: str):
         """
-        Free public AI API - No authentication required!
+        Yields the chat answer in chunks as the provider produces them.
+        Falls through the provider chain only if nothing has been sent yet;
+        a failure mid-stream is raised to the caller.
         """
-        print("Switched to Pollinations.ai (Free Public API)...")
-        
-        try:
-            API_URL = "https://text.pollinations.ai/"
-            # Pollinations accepts plain text prompts
-            response = requests.post(API_URL, json={"messages": [{" role": "user", "content": prompt}]}, timeout=30)
-            
-            if response.status_code == 200:
-                generated_text = response.text
-                
-                # Mock response object
-                class MockResponse:
-                    def __init__(self, text):
-                        self.text = text
-                
-                return MockResponse(generated_text)
-            else:
-                raise Exception(f"Pollinations API Error {response.status_code}: {response.text[:100]}")
-                
-        except Exception as e:
-            print(f"Pollinations Error: {e}")
-            raise e
+        candidates = []
+        if GEMINI_API_KEY:
+            for model_name in AIService._get_valid_models():
+                candidates.append((f"gemini:{model_name}", lambda m=model_name: providers.stream_with_gemini(m, prompt)))
+        if providers.HUGGINGFACE_API_KEY:
+            candidates.append(("huggingface", lambda: providers.stream_with_huggingface(prompt)))
+        candidates.append(("pollinations", lambda: providers.stream_with_pollinations(prompt)))
 
-    @staticmethod
-    def _generate_content_safe(prompt: str, generation_config=None):
         error_log = []
-        
-        # 1. Try Gemini First
-        if GEMINI_API_KEY:
+        for name, open_stream in candidates:
+            provider = name.split(":", 1)[0]
+            if not circuit_breaker.breakers.allow(provider) or not circuit_breaker.breakers.allow(name):
+                continue
+
+            breaker = circuit_breaker.breakers.get(name)
+            started = False
+            start = time.perf_counter()
             try:
-                valid_models = AIService._get_valid_models()
-                for model_name in valid_models:
-                    # Retry loop for 429 errors
-                    for attempt in range(2):
-                        try:
-                            # print(f"Trying Gemini: {model_name}...")
-                            model = genai.GenerativeModel(model_name)
-                            response = model.generate_content(prompt, generation_config=generation_config)
-                            return response
-                        except Exception as e:
-                            if "429" in str(e):
-                                print(f"Gemini 429 (Quota) on {model_name}. Waiting...")
-                                time.sleep(1)
-                                continue
-                            else:
-                                raise e # Next model
+                async for chunk in open_stream():
+                    started = True
+                    yield chunk
             except Exception as e:
-                print(f"Gemini Failed: {e}")
-                error_log.append(str(e))
-        
-        # 2. Fallback to Hugging Face if Gemini failed
-        print("Gemini unavailable. Attempting Hugging Face Fallback...")
-        try:
-            return AIService._generate_with_huggingface(prompt)
-        except Exception as hf_e:
-            error_log.append(f"HF Error: {hf_e}")
-        
-        # 3. Fallback to Pollinations.ai (Free Public API)
-        print("Hugging Face failed. Attempting Pollinations.ai (Free Public API)...")
-        try:
-            return AIService._generate_with_pollinations(prompt)
-        except Exception as poll_e:
-            error_log.append(f"Pollinations Error: {poll_e}")
-            
-        # 3. If All Failed
-        error_msg = "; ".join(error_log)
-        if "429" in error_msg:
-             raise Exception(f"ALL AI SYSTEMS BUSY (Quota Exceeded). Errors: {error_msg}")
-        raise Exception(f"All AI Providers Failed. Details: {error_msg}")
+                breaker.record_failure(e)
+                if provider != name:
+                    circuit_breaker.breakers.get(provider).record_failure(e)
+                if started:
+                    raise
+                print(f"Streaming from {name} failed: {e}")
+                error_log.append(f"{name}: {e}")
+                continue
+
+            breaker.record_success(time.perf_counter() - start)
+            return
 
+        raise Exception(f"All AI Providers Failed. Details: {'; '.join(error_log)}")
 
+    @staticmethod
+    async def _generate_once(generator: str, topic: str, refresh: bool, produce):
+        """
+        Serves `generator` results from the result cache; on a miss, identical
+        concurrent requests share a single in-flight produce() call.
+        """
+        cached = await result_cache.cache.aget(generator, topic, refresh=refresh)
+        if cached is not None:
+            return cached
+        return await singleflight.group.do(result_cache.make_key(generator, topic), produce)
 
     @staticmethod
-    def generate_response(prompt: str) -> str:
+    async def generate_response(prompt: str) -> str:
         try:
-            response = AIService._generate_content_safe(prompt)
+            response = await AIService._generate_content_safe(prompt)
             return response.text
         except Exception as e:
             error_msg = str(e)
             print(f"Gemini API Error: {error_msg}")
-            if "429" in error_msg:
+            if "429" in error_msg or "BUSY" in error_msg:
                 return f"⚠️ All AI models are currently busy or out of quota. Please try again in 1 minute. (Simulated Response: {prompt[:50]}...)"
             return f"Error connecting to Gemini AI: {error_msg}"
 
     @staticmethod
-    def summarize_topic(topic: str) -> str:
+    async def summarize_topic(topic: str, refresh: bool = False) -> str:
+        return await AIService._generate_once("summary", topic, refresh, lambda: AIService._summarize_topic(topic))
+
+    @staticmethod
+    async def _summarize_topic(topic: str) -> str:
         print(f"Generating summary for topic: {topic}")
         try:
             prompt = f"Provide a comprehensive, continuous, and clear summary of the following topic: '{topic}'. Focus on key concepts, importance, and main details. Keep it under 300 words. Format it as a clean paragraph."
-            response = AIService._generate_content_safe(prompt)
+            response = await AIService._generate_content_safe(prompt)
             
             if response.parts:
+                await result_cache.cache.aput("summary", topic, response.text)
                 return response.text
             else:
                 return f"The AI could not generate a summary for '{topic}' due to safety filters or other restrictions."
@@ -216,8 +220,26 @@ class AIService:
             return f"We could not generate a live summary for '{topic}' at this moment. However, '{topic}' is a significant subject that warrants further study. Please try again later or check your network connection."
 
     @staticmethod
-    def generate_quiz(topic: str) -> dict:
+    async def generate_quiz(topic: str, refresh: bool = False) -> dict:
+        if not question_bank.bank.enabled:
+            return await AIService._generate_once("quiz", topic, refresh, lambda: AIService._generate_quiz(topic))
+        # A topic with a big enough question pool gets a fresh random quiz from
+        # the bank; the LLM is only called to grow pools that are still small
+        if not refresh:
+            quiz = await question_bank.bank.adraw(topic)
+            if quiz is not None:
+                return quiz
+        return await singleflight.group.do(result_cache.make_key("quiz", topic), lambda: AIService._generate_quiz(topic))
+
+    @staticmethod
+    async def _generate_quiz(topic: str) -> dict:
         try:
+            # Repeats are dropped by the bank, so ask for questions it does not have yet
+            existing = await question_bank.bank.aavoid(topic) if question_bank.bank.enabled else []
+            avoid = ""
+            if existing:
+                listed = "\n            ".join(f"- {question}" for question in existing)
+                avoid = f"\n            5. DO NOT repeat or rephrase any of these existing questions:\n            {listed}"
             prompt = f"""
             Generate a 10-question multiple choice quiz about: {topic}.
             Return ONLY raw JSON in this format:
@@ -235,15 +257,18 @@ class AIService:
             1. Provide EXACTLY 10 questions.
             2. Each question MUST have 4 unique options.
             3. DO NOT use generic options like "Option A", "Option B".
-            4. Ensure high academic quality and variety.
+            4. Ensure high academic quality and variety.{avoid}
             """
-            response = AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
-            quiz_data = json.loads(AIService._clean_json_response(response.text))
-            
-            if len(quiz_data.get("questions", [])) < 10:
-                print(f"Warning: AI only generated {len(quiz_data.get('questions', []))} questions. Triggering fallback.")
+            response = await AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
+            quiz_data = question_bank.normalize_quiz(AIService._parse_json_response(response.text))
+
+            if len(quiz_data["questions"]) < question_bank.QUIZ_SIZE:
+                print(f"Warning: AI only generated {len(quiz_data['questions'])} usable questions. Triggering fallback.")
                 raise ValueError("Insufficient questions generated by AI")
 
+            await result_cache.cache.aput("quiz", topic, quiz_data)
+            if question_bank.bank.enabled:
+                await question_bank.bank.aadd(topic, quiz_data["questions"])
             return quiz_data
 
         except Exception as e:
@@ -251,26 +276,36 @@ class AIService:
             print(f"Gemini API Error: {error_msg}")
             # fall through to fallback
 
-        # Smart Fallback: Generate basic but relevant quiz
+        # Whatever the bank already holds for the topic beats a generic quiz
+        if question_bank.bank.enabled:
+            quiz = await question_bank.bank.adraw(topic, min_pool=question_bank.QUIZ_SIZE)
+            if quiz is not None:
+                print(f"All AI providers failed. Serving a quiz from the question bank for: {topic}")
+                return quiz
+
+        # Generic Fallback: study-skill questions that hold for any topic
         print(f"All AI providers failed. Generating basic quiz for: {topic}")
         return {
-            "topic": topic,
             "questions": [
-                {"id": 1, "question": f"What is {topic}?", "options": [f"A process related to {topic}", "An unrelated concept", "A type of food", "A programming language"], "answer": f"A process related to {topic}"},
-                {"id": 2, "question": f"Which field is {topic} most associated with?", "options": ["Science", "Art", "Sports", "Music"], "answer": "Science"},
-                {"id": 3, "question": f"What is a key component of {topic}?", "options": ["Energy", "Water", "Soil", "All of the above"], "answer": "All of the above"},
-                {"id": 4, "question": f"Where does {topic} primarily occur?", "options": ["In plants", "In animals", "In machines", "In space"], "answer": "In plants"},
-                {"id": 5, "question": f"What is the main purpose of {topic}?", "options": ["To produce energy", "To consume energy", "To store energy", "To transfer energy"], "answer": "To produce energy"},
-                {"id": 6, "question": f"Which of these is required for {topic}?", "options": ["Sunlight", "Darkness", "Cold temperature", "High pressure"], "answer": "Sunlight"},
-                {"id": 7, "question": f"What is a product of {topic}?", "options": ["Oxygen", "Carbon dioxide", "Nitrogen", "Hydrogen"], "answer": "Oxygen"},
-                {"id": 8, "question": f"In which organelle does {topic} occur?", "options": ["Chloroplast", "Mitochondria", "Nucleus", "Ribosome"], "answer": "Chloroplast"},
-                {"id": 9, "question": f"What color pigment is essential for {topic}?", "options": ["Green (Chlorophyll)", "Red", "Blue", "Yellow"], "answer": "Green (Chlorophyll)"},
-                {"id": 10, "question": f"What is the chemical equation for {topic}?", "options": ["6CO2 + 6H2O → C6H12O6 + 6O2", "C6H12O6 + 6O2 → 6CO2 + 6H2O", "2H2 + O2 → 2H2O", "N2 + 3H2 → 2NH3"], "answer": "6CO2 + 6H2O → C6H12O6 + 6O2"}
+                {"id": 1, "question": f"What is a good first step when starting to learn {topic}?", "options": ["Get an overview of its key ideas", "Memorize every detail at once", "Skip the basics", "Avoid asking questions"], "answer": "Get an overview of its key ideas"},
+                {"id": 2, "question": f"Which habit helps you remember what you learn about {topic}?", "options": ["Reviewing it at spaced intervals", "Reading it once the night before", "Highlighting whole pages", "Studying only when tired"], "answer": "Reviewing it at spaced intervals"},
+                {"id": 3, "question": f"How can you check that you really understand {topic}?", "options": ["Explain it in your own words", "Re-read the same page", "Copy out the definitions", "Look at the headings only"], "answer": "Explain it in your own words"},
+                {"id": 4, "question": f"What should you do when part of {topic} is confusing?", "options": ["Break it into smaller questions", "Ignore it", "Move on and never come back", "Memorize it word for word"], "answer": "Break it into smaller questions"},
+                {"id": 5, "question": f"Which is the most effective way to practise {topic}?", "options": ["Testing yourself with questions", "Passively re-reading notes", "Watching videos without notes", "Cramming in one session"], "answer": "Testing yourself with questions"},
+                {"id": 6, "question": f"Why link {topic} to things you already know?", "options": ["New ideas stick better when connected to old ones", "It makes the topic longer", "It is never useful", "It replaces the need to practise"], "answer": "New ideas stick better when connected to old ones"},
+                {"id": 7, "question": f"What makes good notes on {topic}?", "options": ["Short summaries in your own words", "Every sentence copied verbatim", "No notes at all", "Only page numbers"], "answer": "Short summaries in your own words"},
+                {"id": 8, "question": f"When is a concept map of {topic} most helpful?", "options": ["When seeing how its ideas relate", "When checking spelling", "When timing an exam", "Never"], "answer": "When seeing how its ideas relate"},
+                {"id": 9, "question": f"How should you plan study sessions on {topic}?", "options": ["Short focused sessions with breaks", "One marathon session", "Only right before deadlines", "Random unplanned bursts"], "answer": "Short focused sessions with breaks"},
+                {"id": 10, "question": f"What should you do after getting a question on {topic} wrong?", "options": ["Find out why and review that part", "Forget about it", "Keep guessing until it is right", "Stop studying the topic"], "answer": "Find out why and review that part"}
             ]
         }
 
     @staticmethod
-    def generate_flashcards(topic: str) -> dict:
+    async def generate_flashcards(topic: str, refresh: bool = False) -> dict:
+        return await AIService._generate_once("flashcards", topic, refresh, lambda: AIService._generate_flashcards(topic))
+
+    @staticmethod
+    async def _generate_flashcards(topic: str) -> dict:
         print(f"Generating flashcards for topic: {topic}")
         try:
             prompt = f"""
@@ -282,9 +317,10 @@ class AIService:
                 ]
             }}
             """
-            response = AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
-            data = json.loads(AIService._clean_json_response(response.text))
+            response = await AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
+            data = AIService._parse_json_response(response.text)
             if len(data.get("flashcards", [])) > 0:
+                await result_cache.cache.aput("flashcards", topic, data)
                 return data
         except Exception as e:
             error_msg = str(e)
@@ -321,13 +357,58 @@ class AIService:
         return text.strip()
 
     @staticmethod
-    def generate_concept_map_data(topic: str) -> dict:
+    def _parse_json_response(response_text: str):
+        with timing.span("json"):
+            return json.loads(AIService._clean_json_response(response_text))
 
-        print(f"Generating concept map for topic: {topic}")
-        # --- 100% GUARANTEED DEMO FALLBACK (Zero AI Involvement) ---
-        clean_topic = topic.lower().strip()
+    @staticmethod
+    async def generate_concept_map_data(topic: str, refresh: bool = False) -> dict:
+        return await AIService._generate_once("concept_map", topic, refresh, lambda: AIService._generate_concept_map_data(topic))
+
+    @staticmethod
+    async def expand_concept_map_node(root: str, node: str, existing=(), refresh: bool = False) -> dict:
+        """Asks only for the children of one node of an existing map. Returns {"children": [...]}."""
+        return await AIService._generate_once(
+            "concept_map_expand", f"{root} > {node}", refresh,
+            lambda: AIService._expand_concept_map_node(root, node, existing),
+        )
+
+    @staticmethod
+    async def _expand_concept_map_node(root: str, node: str, existing=()) -> dict:
+        print(f"Expanding concept map node: {root} > {node}")
+        avoid = ", ".join(f'"{label}"' for label in existing) or "none"
+        prompt = f"""
+        You are a "Literal Physical Entity" architect.
+        Task: A hierarchical concept map about "{root}" contains the node "{node}".
+        List ONLY the direct children of "{node}" (do not repeat: {avoid}).
+
+        Respond ONLY with raw JSON in this format:
+        {{
+            "children": [
+                {{ "target": "Child Node", "relationship": "contains/relates-to" }}
+            ]
+        }}
+        Limit to 3-6 children.
+        """
+
+        response = await AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
+        if not hasattr(response, 'text'):
+            raise ValueError("Invalid AI Response Object")
 
+        data = AIService._parse_json_response(response.text)
+        children = [child for child in data.get("children", []) if isinstance(child, dict) and child.get("target")]
+        if not children:
+            # Unlike a whole map there is no useful fallback here - do not cache, let the caller report it
+            raise ValueError(f"AI returned no children for {node}")
 
+        result = {"children": children}
+        await result_cache.cache.aput("concept_map_expand", f"{root} > {node}", result)
+        return result
+
+    @staticmethod
+    def _demo_concept_map(topic: str):
+        """Hand-written maps served for demo topics without calling the AI; None for any other topic."""
+        clean_topic = topic.lower().strip()
         if "judiciary" in clean_topic or "court" in clean_topic:
             return {
                 "layout": "tree",
@@ -358,8 +439,18 @@ class AIService:
                     {"source": "Tehsildar", "target": "Asst. Tehsildar", "relationship": "Hierarchy"}
                 ]
             }
+        return None
+
+    @staticmethod
+    async def _generate_concept_map_data(topic: str) -> dict:
+
+        print(f"Generating concept map for topic: {topic}")
+        # --- 100% GUARANTEED DEMO FALLBACK (Zero AI Involvement) ---
+        demo = AIService._demo_concept_map(topic)
+        if demo is not None:
+            return demo
         # ---------------------------------------------------------
-        
+
         try:
             prompt = f"""
             You are a "Literal Physical Entity" architect.
@@ -376,14 +467,14 @@ class AIService:
             Limit to 5-8 nodes.
             """
             
-            response = AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
+            response = await AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
             
             if not hasattr(response, 'text'):
                 raise ValueError("Invalid AI Response Object")
 
-            cleaned_json = AIService._clean_json_response(response.text)
-            data = json.loads(cleaned_json)
+            data = AIService._parse_json_response(response.text)
             if "root" in data and "edges" in data and len(data["edges"]) > 0:
+                await result_cache.cache.aput("concept_map", topic, data)
                 return data
 
         except Exception as e:
@@ -401,3 +492,81 @@ class AIService:
                 {"source": f"AI Error: {str(error_msg)[:30]}...", "target": "Try Later", "relationship": "action"}
             ]
         }
+
+    @staticmethod
+    async def generate_study_pack(topic: str, parts=STUDY_PACK_PARTS, refresh: bool = False) -> dict:
+        """
+        Summary, quiz, flashcards and concept-map structure for `topic` from a
+        single LLM call. Parts already in the result cache (or, for the quiz,
+        drawable from the question bank) are left out of the prompt; each part
+        generated here is cached under its own generator, so the
+        single-artifact endpoints reuse it. A part that is missing or
+        invalid in the combined answer falls back to its own generator.
+
+        Returns {part: value} for the requested `parts`.
+        """
+        parts = [part for part in STUDY_PACK_PARTS if part in parts]
+        pack = {}
+        if not refresh:
+            if "quiz" in parts and question_bank.bank.enabled:
+                quiz = await question_bank.bank.adraw(topic)
+                if quiz is not None:
+                    pack["quiz"] = quiz
+            lookup = [part for part in parts if part not in pack]
+            cached = await asyncio.gather(*(result_cache.cache.aget(STUDY_PACK_GENERATORS[part], topic) for part in lookup))
+            pack.update((part, value) for part, value in zip(lookup, cached) if value is not None)
+        if "map" in parts and "map" not in pack:
+            demo = AIService._demo_concept_map(topic)
+            if demo is not None:
+                pack["map"] = demo
+
+        missing = [part for part in parts if part not in pack]
+        if missing:
+            key = f"{result_cache.make_key('study_pack', topic)}:{'+'.join(missing)}"
+            pack.update(await singleflight.group.do(key, lambda: AIService._generate_study_pack(topic, missing)))
+
+        fallbacks = {
+            "summary": AIService.summarize_topic,
+            "quiz": AIService.generate_quiz,
+            "flashcards": AIService.generate_flashcards,
+            "map": AIService.generate_concept_map_data,
+        }
+        still_missing = [part for part in parts if part not in pack]
+        if still_missing:
+            print(f"Study pack for {topic}: generating {', '.join(still_missing)} separately")
+            values = await asyncio.gather(*(fallbacks[part](topic, refresh=refresh) for part in still_missing))
+            pack.update(zip(still_missing, values))
+        return {part: pack[part] for part in parts}
+
+    @staticmethod
+    async def _generate_study_pack(topic: str, parts) -> dict:
+        """One LLM call for `parts`; returns (and caches) only the parts that pass their checks."""
+        print(f"Generating study pack for topic: {topic} ({', '.join(parts)})")
+        fields = ",\n                ".join(STUDY_PACK_FORMATS[part] for part in parts)
+        rules = "\n            ".join(f"{i}. {STUDY_PACK_RULES[part]}" for i, part in enumerate(parts, 1))
+        prompt = f"""
+            Create a study pack about: {topic}.
+            Include exactly these keys: {", ".join(parts)}
+            Return ONLY raw JSON in this format:
+            {{
+                {fields}
+            }}
+            CRITICAL RULES:
+            {rules}
+            """
+        try:
+            response = await AIService._generate_content_safe(prompt, generation_config={"response_mime_type": "application/json"})
+            data = AIService._parse_json_response(response.text)
+        except Exception as e:
+            print(f"Study pack generation failed: {e}")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+
+        data = {part: STUDY_PACK_NORMALIZERS.get(part, lambda v: v)(data.get(part)) for part in parts}
+        valid = {part: data[part] for part in parts if STUDY_PACK_CHECKS[part](data[part])}
+        writes = [result_cache.cache.aput(STUDY_PACK_GENERATORS[part], topic, value) for part, value in valid.items()]
+        if "quiz" in valid and question_bank.bank.enabled:
+            writes.append(question_bank.bank.aadd(topic, valid["quiz"]["questions"]))
+        await asyncio.gather(*writes)
+        return valid
@@ -1,60 +1,105 @@
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
 import base64
+from datetime import datetime, timezone
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from . import models
+from . import models, rendering
 
-def generate_study_chart(db: Session):
-    # 1. Fetch data using SQLALchemy
-    query = db.query(models.StudySession.activity_type, models.StudySession.duration_seconds)
-    data = query.all()
+# strftime() formats for date-bucketed rollups (created_at is stored as UTC text by SQLite)
+BUCKET_FORMATS = {
+    "hour": "%Y-%m-%d %H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
 
-    if not data:
+def _as_utc(value):
+    # created_at is naive UTC text, so aware bounds must be converted before comparing
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _filtered(query, start: datetime = None, end: datetime = None, activity_type: str = None):
+    """Applies the dashboard filters: start inclusive, end exclusive."""
+    start, end = _as_utc(start), _as_utc(end)
+    if start is not None:
+        query = query.filter(models.StudySession.created_at >= start)
+    if end is not None:
+        query = query.filter(models.StudySession.created_at < end)
+    if activity_type is not None:
+        query = query.filter(models.StudySession.activity_type == activity_type)
+    return query
+
+def summarize_study_time(db: Session, start: datetime = None, end: datetime = None):
+    """Returns [(activity_type, total_minutes), ...] for the chart, aggregated in SQL."""
+    query = db.query(
+        models.StudySession.activity_type,
+        func.sum(models.StudySession.duration_seconds) / 60.0,
+    )
+    query = _filtered(query, start, end).group_by(models.StudySession.activity_type)
+    return [(activity, float(minutes or 0)) for activity, minutes in query.all()]
+
+def study_time_rollup(db: Session, bucket: str = "day", start: datetime = None, end: datetime = None, activity_type: str = None):
+    """
+    Date-bucketed totals: [{"bucket", "activity_type", "sessions", "minutes"}, ...]
+    ordered by bucket, one row per (bucket, activity) that has any sessions.
+    """
+    if bucket not in BUCKET_FORMATS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    period = func.strftime(BUCKET_FORMATS[bucket], models.StudySession.created_at)
+    query = db.query(
+        period,
+        models.StudySession.activity_type,
+        func.count(models.StudySession.id),
+        func.sum(models.StudySession.duration_seconds) / 60.0,
+    )
+    query = _filtered(query, start, end, activity_type)
+    query = query.group_by(period, models.StudySession.activity_type).order_by(period, models.StudySession.activity_type)
+    return [
+        {"bucket": label, "activity_type": activity, "sessions": sessions, "minutes": float(minutes or 0)}
+        for label, activity, sessions, minutes in query.all()
+    ]
+
+def render_study_chart(summary, output_format="png"):
+    """Renders the aggregated rows from summarize_study_time() to base64 png/svg/svgz."""
+    if not summary:
         return None
 
-    # 2. Convert to Pandas DataFrame
-    df = pd.DataFrame(data, columns=['Activity', 'Seconds'])
+    activities = [row[0] for row in summary]
+    minutes = [row[1] for row in summary]
 
-    # 3. Clean and Aggregate Data
-    # Convert seconds to minutes for better readability
-    df['Minutes'] = df['Seconds'] / 60
-    
-    # Group by Activity Type
-    summary = df.groupby('Activity')['Minutes'].sum().reset_index()
+    # 4. detailed Matplotlib Visualization (reused Agg figure, no pyplot state)
+    fig = rendering.reusable_figure("study_chart", figsize=(10, 6))
+    ax = fig.add_subplot()
 
-    # 4. detailed Matplotlib Visualization
-    plt.figure(figsize=(10, 6))
-    
     # Custom styling
-    bars = plt.bar(summary['Activity'], summary['Minutes'], color=['#3b82f6', '#10b981', '#f59e0b'])
-    
+    bars = ax.bar(activities, minutes, color=['#3b82f6', '#10b981', '#f59e0b'])
+
     # Add labels and title
-    plt.title('Study Time Distribution', fontsize=16, fontweight='bold', pad=20)
-    plt.xlabel('Activity Type', fontsize=12)
-    plt.ylabel('Total Minutes', fontsize=12)
-    
+    ax.set_title('Study Time Distribution', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Activity Type', fontsize=12)
+    ax.set_ylabel('Total Minutes', fontsize=12)
+
     # Add value labels on top of bars
     for bar in bars:
         height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height,
+        ax.text(bar.get_x() + bar.get_width()/2., height,
                 f'{height:.1f}m',
                 ha='center', va='bottom')
 
     # Remove top and right spines for cleaner look
-    plt.gca().spines['top'].set_visible(False)
-    plt.gca().spines['right'].set_visible(False)
-    
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
     # Add grid on y-axis
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
 
-    # 5. Save to Bytes Buffer
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight', dpi=100)
-    buffer.seek(0)
-    plt.close()
+    # 5. Save to Bytes
+    data = rendering.save_figure(fig, output_format, dpi=100, bbox_inches='tight')
 
     # 6. Encode to Base64
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    image_base64 = base64.b64encode(data).decode('utf-8')
     return image_base64
+
+def generate_study_chart(db: Session, output_format="png", start: datetime = None, end: datetime = None):
+    return render_study_chart(summarize_study_time(db, start, end), output_format)
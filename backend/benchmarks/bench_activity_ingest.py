@@ -0,0 +1,111 @@
+"""
+Benchmark: activity ingestion throughput.
+
+Compares, on a throwaway SQLite database built by backend.migrations:
+  per-event   what /api/track-activity does: INSERT + counters + COMMIT per event
+  batch       /api/track-activity/batch: one transaction per --batch-size events
+  buffered    write-behind ActivityBuffer fed by --threads threads, timed until drained
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_activity_ingest [--events 20000] [--threads 8]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from backend import activity_buffer, migrations, models, progress
+
+ACTIVITIES = ["timer_focus", "quiz", "chat", "flashcards"]
+
+
+def make_events(n, seed=0):
+    rng = random.Random(seed)
+    return [{"activity_type": rng.choice(ACTIVITIES), "duration_seconds": rng.randint(30, 1500)} for _ in range(n)]
+
+
+def fresh_database(directory, name):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, name)}", connect_args={"check_same_thread": False})
+    migrations.upgrade(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def per_event(session_factory, events, threads):
+    def track(event):
+        db = session_factory()
+        try:
+            db.add(models.StudySession(**event))
+            progress.record_activity(db, event["activity_type"], event["duration_seconds"])
+            db.commit()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(track, events))
+
+
+def batched(session_factory, events, batch_size):
+    for first in range(0, len(events), batch_size):
+        db = session_factory()
+        try:
+            progress.record_sessions(db, events[first:first + batch_size])
+            db.commit()
+        finally:
+            db.close()
+
+
+def buffered(session_factory, events, threads, max_events, flush_interval):
+    buffer = activity_buffer.ActivityBuffer(max_events, flush_interval, session_factory=session_factory)
+    buffer.start()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda event: buffer.add(event["activity_type"], event["duration_seconds"]), events))
+    buffer.stop() # drains
+    return buffer.stats()
+
+
+def verify(session_factory, expected):
+    db = session_factory()
+    try:
+        sessions = db.query(func.count(models.StudySession.id)).scalar()
+        counted = db.query(func.sum(models.ProgressCounter.sessions)).scalar()
+    finally:
+        db.close()
+    assert sessions == counted == expected, (sessions, counted, expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [
+            ("per-event, 1 thread", lambda sf: per_event(sf, events, 1)),
+            (f"per-event, {args.threads} threads", lambda sf: per_event(sf, events, args.threads)),
+            (f"batch of {args.batch_size}", lambda sf: batched(sf, events, args.batch_size)),
+            (f"buffered, {args.threads} threads", lambda sf: buffered(sf, events, args.threads, args.batch_size, args.flush_interval)),
+        ]
+        print(f"{'mode':<24} {'events/s':>10} {'total (s)':>10}")
+        baseline = None
+        for i, (name, run) in enumerate(runs):
+            engine, session_factory = fresh_database(tmp, f"ingest_{i}.db")
+            start = time.perf_counter()
+            run(session_factory)
+            elapsed = time.perf_counter() - start
+            verify(session_factory, len(events))
+            engine.dispose()
+
+            rate = len(events) / elapsed
+            baseline = baseline or rate
+            print(f"{name:<24} {rate:10.0f} {elapsed:10.2f}   x{rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
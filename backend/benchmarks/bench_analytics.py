@@ -0,0 +1,122 @@
+"""
+Benchmark: SQL-side study-time aggregation vs loading every session into pandas.
+
+Builds a throwaway SQLite database with synthetic study sessions (schema from
+backend.migrations), then times the dashboard summary both ways, plus the
+date-bucketed rollups. --no-indexes drops the query indexes first.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_analytics [--rows 1000000] [--no-indexes]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend import analytics, migrations, models
+
+ACTIVITIES = ["timer_focus", "quiz", "chat", "flashcards", "summary", "map"]
+
+
+def pandas_summarize_study_time(db):
+    """The dashboard summary before analytics moved to SQL (kept here for comparison)."""
+    import pandas as pd
+    data = db.query(models.StudySession.activity_type, models.StudySession.duration_seconds).all()
+    if not data:
+        return []
+    df = pd.DataFrame(data, columns=['Activity', 'Seconds'])
+    df['Minutes'] = df['Seconds'] / 60
+    summary = df.groupby('Activity')['Minutes'].sum().reset_index()
+    return list(zip(summary['Activity'], summary['Minutes'].astype(float)))
+
+
+def populate(path, rows, days=365, seed=0, indexes=True):
+    """Fills study_sessions with `rows` sessions spread over the last `days` days."""
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    if not indexes:
+        with engine.begin() as conn:
+            for index in models.StudySession.__table__.indexes:
+                conn.exec_driver_sql(f"DROP INDEX {index.name}")
+    engine.dispose()
+
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    conn = sqlite3.connect(path)
+    batch = 100_000
+    for first in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO study_sessions (activity_type, duration_seconds, created_at) VALUES (?, ?, ?)",
+            (
+                (
+                    rng.choice(ACTIVITIES),
+                    rng.randint(30, 3600),
+                    (now - timedelta(seconds=rng.randint(0, days * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+                )
+                for _ in range(min(batch, rows - first))
+            ),
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def measure(fn, *args, repeat=3):
+    """Best wall time over `repeat` runs, then peak traced memory of one more run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-indexes", action="store_true", help="drop the study_sessions query indexes first")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_analytics.db")
+        start = time.perf_counter()
+        populate(path, args.rows, indexes=not args.no_indexes)
+        print(f"populated {args.rows:,} sessions in {time.perf_counter() - start:.1f}s")
+
+        engine = create_engine(f"sqlite:///{path}")
+        db = sessionmaker(bind=engine)()
+        last_month = datetime(2025, 12, 1), datetime(2026, 1, 1)
+        cases = [
+            ("sql summary (all time)", analytics.summarize_study_time, db),
+            ("sql summary (last month)", analytics.summarize_study_time, db, *last_month),
+            ("sql rollup by day", analytics.study_time_rollup, db, "day"),
+            ("sql rollup by week, 1 activity", analytics.study_time_rollup, db, "week", None, None, "quiz"),
+            ("sql rollup by month", analytics.study_time_rollup, db, "month"),
+        ]
+        try:
+            import pandas # noqa: F401
+            cases.insert(0, ("pandas summary (all time)", pandas_summarize_study_time, db))
+        except ImportError:
+            print("pandas not installed - skipping the legacy path")
+
+        print(f"{'query':<32} {'time (ms)':>10} {'peak (MB)':>10} {'rows out':>9}")
+        for name, fn, *fn_args in cases:
+            best, peak, result = measure(fn, *fn_args, repeat=args.repeat)
+            print(f"{name:<32} {best * 1000:10.0f} {peak / 2**20:10.1f} {len(result):9}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
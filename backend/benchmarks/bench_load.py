@@ -0,0 +1,233 @@
+"""
+Benchmark: end-to-end load test of the API against fake LLM providers.
+
+Starts backend.benchmarks.fake_providers and the backend (uvicorn) as
+subprocesses on free ports, with a throwaway database, render store and
+semantic index, then drives each endpoint in turn with --requests requests
+at --concurrency:
+
+  chat        POST /api/chat
+  quiz        POST /api/generate-quiz
+  flashcards  POST /api/generate-flashcards
+  map         POST /api/generate-map
+  progress    GET  /api/progress
+  dashboard   GET  /api/analytics/dashboard
+  study_pack  POST /api/study-pack              (not in the default set)
+
+Reports p50/p95/p99 latency, throughput, non-200 responses and the peak RSS
+of the backend (including render workers) per endpoint. Topics are unique per
+request unless --topics N is given, so the LLM path is measured rather than
+the result cache. Unknown options are passed to fake_providers (e.g.
+--latency lognormal:0.3,0.5 --rate-429 0.05 --malformed-rate 0.1).
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_load [--requests 200] [--concurrency 20] [--endpoints chat,map]
+        [--json results.json] [fake_providers options...]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from backend.benchmarks.fake_providers import provider_env
+
+ENDPOINTS = {
+    "chat": ("POST", "/api/chat", lambda topic: {"message": f"Explain {topic} in simple terms."}),
+    "quiz": ("POST", "/api/generate-quiz", lambda topic: {"topic": topic}),
+    "flashcards": ("POST", "/api/generate-flashcards", lambda topic: {"topic": topic}),
+    "map": ("POST", "/api/generate-map", lambda topic: {"topic": topic}),
+    "progress": ("GET", "/api/progress", None),
+    "dashboard": ("GET", "/api/analytics/dashboard", None),
+    "study_pack": ("POST", "/api/study-pack", lambda topic: {"topic": topic}),
+}
+DEFAULT_ENDPOINTS = ["chat", "quiz", "flashcards", "map", "progress", "dashboard"]
+ACTIVITIES = ["timer_focus", "quiz", "chat", "flashcards"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start within {timeout}s")
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident memory of `pid` and all its descendants (Linux /proc; 0 elsewhere)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return total
+
+
+@contextlib.contextmanager
+def running_stack(provider_args=()):
+    """
+    Runs fake_providers and the backend (uvicorn) on free ports with a
+    throwaway database, render store and semantic index. Yields (api_url,
+    fake_url, server_pid).
+    """
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PYTHONWARNINGS="ignore",
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'load.db')}",
+            RENDER_STORE_DIR=os.path.join(tmp, "renders"),
+            SEMANTIC_CACHE_DIR=os.path.join(tmp, "semantic"),
+            SERVER_TIMING="0",
+            **provider_env(fake_url),
+        )
+        fake = subprocess.Popen([sys.executable, "-m", "backend.benchmarks.fake_providers", "--port", str(fake_port), *provider_args],
+                                env=env, stdout=subprocess.DEVNULL)
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(api_port), "--log-level", "warning"],
+                                  env=env, stdout=subprocess.DEVNULL)
+        try:
+            wait_until_up(f"{fake_url}/stats", fake)
+            wait_until_up(f"{api_url}/", server)
+            yield api_url, fake_url, server.pid
+        finally:
+            server.terminate()
+            fake.terminate()
+            server.wait(10)
+            fake.wait(10)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_endpoint(client, name, requests, concurrency, topics, server_pid):
+    method, path, body = ENDPOINTS[name]
+    latencies = []
+    statuses = {}
+    peak_rss = rss_bytes(server_pid)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            topic = random.choice(topics) if topics else f"{name} topic {i} {random.random():.6f}"
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body(topic) if body else None)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, rss_bytes(server_pid))
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_memory())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    latencies.sort()
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": sum(count for status, count in statuses.items() if status != 200),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "peak_rss_mb": peak_rss / 2**20,
+    }
+
+
+async def drive(base_url, args, server_pid):
+    topics = [f"Topic {i}" for i in range(args.topics)]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        # Something for the dashboard and progress endpoints to aggregate
+        rng = random.Random(0)
+        for _ in range(args.seed_sessions // 1000):
+            activities = [{"activity_type": rng.choice(ACTIVITIES), "duration_seconds": rng.randint(30, 1500)} for _ in range(1000)]
+            (await client.post("/api/track-activity/batch", json={"activities": activities})).raise_for_status()
+        # One untimed request per endpoint so lazy imports and render workers are warm
+        for name in args.endpoints:
+            await run_endpoint(client, name, 1, 1, ["warm-up"], server_pid)
+
+        results = []
+        for name in args.endpoints:
+            results.append(await run_endpoint(client, name, args.requests, args.concurrency, topics, server_pid))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS), help=f"any of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--topics", type=int, default=0, help="draw topics from a pool of N (0 = unique per request)")
+    parser.add_argument("--seed-sessions", type=int, default=20000)
+    parser.add_argument("--json", help="also write the results to this file")
+    args, provider_args = parser.parse_known_args()
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    with running_stack(provider_args) as (api_url, fake_url, server_pid):
+        results = asyncio.run(drive(api_url, args, server_pid))
+        provider_stats = httpx.get(f"{fake_url}/stats").json()
+
+    print(f"{'endpoint':<11} {'req/s':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>7} {'peak RSS (MB)':>14}")
+    for r in results:
+        print(f"{r['endpoint']:<11} {r['throughput']:7.1f} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['p99_ms']:9.1f} "
+              f"{r['errors']:7} {r['peak_rss_mb']:14.1f}")
+    print("fake providers:", ", ".join(f"{key}={value}" for key, value in sorted(provider_stats.items())))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "provider_args": provider_args, "results": results,
+                       "provider_stats": provider_stats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: batched (collection) map drawing vs the legacy per-artist path.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_map_render [--sizes 10 50 200 1000]
+"""
+import argparse
+import time
+import tracemalloc
+from backend import maps
+
+
+def synthetic_map(n, fanout=4):
+    """Concept-map payload shaped like the AI output: a tree of n labelled nodes."""
+    labels = [f"Concept {i} of the syllabus" if i else "Syllabus" for i in range(n)]
+    return {
+        "layout": "tree",
+        "root": labels[0],
+        "edges": [
+            {"source": labels[(i - 1) // fanout], "target": labels[i], "relationship": "contains"}
+            for i in range(1, n)
+        ],
+    }
+
+
+def measure(edge_data, backend, repeat):
+    """Best wall time over `repeat` runs, then peak traced memory of one more run (tracing skews timing)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        maps.render_network_graph_png(edge_data, backend=backend)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    maps.render_network_graph_png(edge_data, backend=backend)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm up fonts and caches so the first row is not penalised
+    maps.render_network_graph_png(synthetic_map(5))
+
+    print(f"{'nodes':>6} {'legacy (ms)':>12} {'batched (ms)':>13} {'legacy peak (MB)':>17} {'batched peak (MB)':>18}")
+    for size in args.sizes:
+        edge_data = synthetic_map(size)
+        legacy_time, legacy_peak = measure(edge_data, "legacy", args.repeat)
+        batched_time, batched_peak = measure(edge_data, "batched", args.repeat)
+        print(f"{size:>6} {legacy_time * 1000:12.0f} {batched_time * 1000:13.0f} "
+              f"{legacy_peak / 2**20:17.1f} {batched_peak / 2**20:18.1f}")
+
+
+if __name__ == "__main__":
+    main()
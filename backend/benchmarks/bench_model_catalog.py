@@ -0,0 +1,90 @@
+"""
+Benchmark: list-models traffic from ModelCatalog.get() during a provider outage.
+
+Calls get() --gets times from --threads threads against a lister that always
+fails (after --lister-seconds), and counts how many listings were attempted:
+with the failure backoff that is one per retry window, not one per get().
+Then lets two short retry windows pass to show the retry and its doubling.
+
+Exits 1 when the failing lister is called more than once inside one window,
+so it can run in CI.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_model_catalog [--gets 10000] [--threads 8]
+"""
+import argparse
+import sys
+import threading
+import time
+from backend import model_catalog
+
+
+class FailingLister:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.seconds)
+        raise RuntimeError("503 Service Unavailable")
+
+
+def hammer(catalog, gets, threads):
+    def worker():
+        for _ in range(gets // threads):
+            catalog.get()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def wait_idle(catalog, timeout=10):
+    deadline = time.monotonic() + timeout
+    while catalog.snapshot()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gets", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lister-seconds", type=float, default=0.05, help="how long each failing listing takes")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="first backoff window (seconds)")
+    args = parser.parse_args()
+
+    lister = FailingLister(args.lister_seconds)
+    catalog = model_catalog.ModelCatalog(fetcher=lister, retry_after=args.retry_after, retry_max=10 * args.retry_after)
+
+    # Keep calling get() across the first listing and after it has failed
+    elapsed = hammer(catalog, args.gets, args.threads)
+    wait_idle(catalog)
+    hammer(catalog, args.gets, args.threads)
+    first_window = lister.calls
+    print(f"{2 * args.gets} get() calls in {elapsed:.2f}s+: {first_window} listing attempt(s), "
+          f"models served {catalog.get()}")
+
+    windows = []
+    for _ in range(2):
+        time.sleep(catalog.snapshot()["retry_in_seconds"] + 0.05)
+        hammer(catalog, args.gets, args.threads)
+        wait_idle(catalog)
+        snapshot = catalog.snapshot()
+        windows.append((lister.calls, snapshot["retry_in_seconds"]))
+    for calls, retry_in in windows:
+        print(f"after the window: {calls} attempts in total, next retry in {retry_in:.2f}s")
+
+    if first_window != 1 or [calls for calls, _ in windows] != [2, 3]:
+        print("FAIL: a failing model lister must be called once per backoff window")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: quiz serving from the question bank.
+
+Part 1 (in process) fills a throwaway database with --bank-topics topics of
+--pool questions each and times the indexed pool count + random draw that
+serve a quiz, with the SQLite query plan.
+
+Part 2 runs the backend against backend.benchmarks.fake_providers (see
+bench_load), once with QUESTION_BANK=1 and once with QUESTION_BANK=0, and
+requests --rounds quizzes for each of --topics popular topics (one round =
+one quiz per topic, --concurrency at a time). Per round it reports latency
+and LLM calls (counted by the fake providers); per run, how many distinct
+question sets each topic got and the bank's size. The fake model repeats the
+same questions for a topic, so the pools stay below QUESTION_BANK_MIN_POOL:
+the LLM calls should stop after QUESTION_BANK_MAX_GENERATIONS rounds anyway.
+Unknown options are passed to fake_providers.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_question_bank [--bank-topics 10000] [--pool 50]
+        [--topics 20] [--rounds 8] [--skip-server] [--latency lognormal:1.5,0.4]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend import migrations, question_bank
+from backend.migrations.plans import capture_selects, explain
+from backend.benchmarks.bench_load import percentile, running_stack
+from backend.benchmarks.bench_study_pack import provider_calls
+
+
+def make_questions(rng, topic, count):
+    return [
+        {"question": f"Question {i} about {topic} ({rng.random():.8f})?",
+         "options": [f"Option {i}{letter} for {topic}" for letter in "abcd"],
+         "answer": f"Option {i}a for {topic}"}
+        for i in range(count)
+    ]
+
+
+def bench_draws(args):
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bank.db')}")
+        migrations.upgrade(engine)
+        Session = sessionmaker(bind=engine)
+        topics = [f"bench topic {i}" for i in range(args.bank_topics)]
+
+        start = time.perf_counter()
+        with Session() as db:
+            for topic in topics:
+                for first in range(0, args.pool, question_bank.QUIZ_SIZE):
+                    question_bank.add_quiz(db, topic, make_questions(rng, topic, min(question_bank.QUIZ_SIZE, args.pool - first)))
+            db.commit()
+        build = time.perf_counter() - start
+        print(f"bank: {args.bank_topics} topics x {args.pool} questions in {build:.1f}s, "
+              f"{os.path.getsize(os.path.join(tmp, 'bank.db')) / 2**20:.0f} MB")
+
+        latencies = []
+        with Session() as db:
+            for _ in range(args.draws):
+                topic = rng.choice(topics)
+                start = time.perf_counter()
+                if question_bank.pool_size(db, topic) >= question_bank.QUESTION_BANK_MIN_POOL:
+                    question_bank.sample(db, topic)
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"draw (pool count + {question_bank.QUIZ_SIZE} random questions): p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, mean {statistics.mean(latencies) * 1000:.2f} ms")
+
+        topic = topics[0]
+        for statement, parameters in capture_selects(engine, lambda db: (question_bank.pool_size(db, topic), question_bank.sample(db, topic))):
+            for line in explain(engine, statement, parameters):
+                print(f"    {line}")
+        engine.dispose()
+
+
+async def quiz(client, topic):
+    start = time.perf_counter()
+    response = await client.post("/api/generate-quiz", json={"topic": topic})
+    response.raise_for_status()
+    return time.perf_counter() - start, frozenset(q["question"] for q in response.json()["questions"])
+
+
+def bench_server(args, provider_args, enabled):
+    os.environ["QUESTION_BANK"] = "1" if enabled else "0"
+    topics = [f"Popular topic {i}" for i in range(args.topics)]
+    rounds = []
+    with running_stack(provider_args) as (api_url, fake_url, _):
+        async def drive():
+            semaphore = asyncio.Semaphore(args.concurrency)
+            seen = {topic: set() for topic in topics}
+
+            async def one(client, topic):
+                async with semaphore:
+                    latency, questions = await quiz(client, topic)
+                    seen[topic].add(questions)
+                    return latency
+
+            async with httpx.AsyncClient(base_url=api_url, timeout=120) as client:
+                await quiz(client, "warm-up")
+                for _ in range(args.rounds):
+                    before = provider_calls(fake_url)
+                    latencies = sorted(await asyncio.gather(*(one(client, topic) for topic in topics)))
+                    rounds.append((latencies, provider_calls(fake_url) - before))
+                stats = (await client.get("/api/admin/question-bank")).json()
+            return statistics.mean(len(quizzes) for quizzes in seen.values()), stats
+
+        distinct, stats = asyncio.run(drive())
+
+    print(f"QUESTION_BANK={int(enabled)}")
+    print(f"{'round':>5} {'p50 (ms)':>9} {'p95 (ms)':>9} {'LLM calls':>10}")
+    for i, (latencies, calls) in enumerate(rounds, 1):
+        print(f"{i:5} {percentile(latencies, 0.5) * 1000:9.1f} {percentile(latencies, 0.95) * 1000:9.1f} {calls:10}")
+    print(f"distinct question sets per topic over {args.rounds} rounds: {distinct:.1f}")
+    if enabled:
+        print(f"bank: {stats['questions']} questions over {stats['topics']} topics "
+              f"(min pool {stats['min_pool']}, max generations {stats['max_generations']}), "
+              f"{stats['generated_quizzes']} LLM quizzes stored, {stats['duplicates']} repeated questions dropped")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bank-topics", type=int, default=10_000)
+    parser.add_argument("--pool", type=int, default=50, help="questions per topic in part 1")
+    parser.add_argument("--draws", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=20, help="popular topics in part 2")
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--skip-server", action="store_true", help="only run part 1")
+    args, provider_args = parser.parse_known_args()
+    if not any(arg.startswith("--latency") for arg in provider_args):
+        provider_args += ["--latency", "lognormal:1.5,0.4"] # a realistic full-answer LLM latency
+
+    bench_draws(args)
+    if not args.skip_server:
+        print()
+        for enabled in (True, False):
+            bench_server(args, provider_args, enabled)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark: semantic topic index hit rate and lookup latency.
+
+Indexes --topics synthetic topics (1-4 words drawn from a pseudo-word
+vocabulary) in a throwaway directory, reopens the index from disk, then looks
+up three kinds of query:
+
+  paraphrase  an indexed topic reworded: filler words ("what is", "how does ...
+              work", "explained"), casing, punctuation, plural -s, word order
+              -> should hit that topic
+  near miss   an indexed topic with one word swapped for another -> should miss
+  novel       a topic that was never indexed -> should miss
+
+and reports, per similarity threshold, the paraphrase hit rate (and how many
+of those hits found the right topic) against the false-hit rate of the other
+two, plus build, load and per-lookup times.
+
+Finally checks MUST_MISS, topic pairs that look alike but are different
+subjects ("c" / "c++", "world war i" / "world war ii"), at every threshold,
+and exits 1 if any of them match, so it can run in CI.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_semantic_cache [--topics 100000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from backend import topic_index
+from backend.result_cache import normalize_topic
+
+THRESHOLDS = (0.7, 0.75, 0.8, 0.85, 0.9)
+SYLLABLES = "ba be bi bo bu ca co cu da de di do fa fe fi ga ge go ka ke ki la le li lo lu ma me mi mo mu na ne ni no pa pe pi po ra re ri ro ru sa se si so ta te ti to tu va ve vi zo".split()
+PARAPHRASES = [
+    "what is {}?", "how does {} work", "{} explained", "introduction to {}", "Explain {}",
+    "{}", "{}!", "the basics of {}", "tell me about {}", "{} overview",
+]
+MUST_MISS = [
+    ("C programming", "C++ programming"),
+    ("C", "C#"),
+    ("F#", "F"),
+    ("World War I", "World War II"),
+    ("Henry VIII", "Henry VII"),
+    ("Second World War", "First World War"),
+    ("Part 1", "Part 2"),
+]
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_topic(rng, vocabulary):
+    return " ".join(rng.sample(vocabulary, rng.choice([1, 2, 2, 3, 3, 4])))
+
+
+def paraphrase(rng, topic):
+    words = topic.split()
+    if len(words) > 1 and rng.random() < 0.2:
+        words[0], words[1] = words[1], words[0]
+    if rng.random() < 0.3:
+        i = rng.randrange(len(words))
+        words[i] += "s"
+    text = " ".join(words)
+    text = text.title() if rng.random() < 0.5 else text
+    return rng.choice(PARAPHRASES).format(text)
+
+
+def near_miss(rng, topic, vocabulary):
+    words = topic.split()
+    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000, help="per kind")
+    parser.add_argument("--vocabulary", type=int, default=30_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    indexed = set()
+    topics = []
+    while len(topics) < args.topics:
+        topic = normalize_topic(make_topic(rng, vocabulary))
+        if topic not in indexed:
+            indexed.add(topic)
+            topics.append(topic)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        index = topic_index.VectorIndex(tmp, "bench")
+        for first in range(0, len(topics), 10_000):
+            index.add(topics[first:first + 10_000])
+        build = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+
+        start = time.perf_counter()
+        index = topic_index.VectorIndex(tmp, "bench")
+        count = len(index)
+        load = time.perf_counter() - start
+        print(f"indexed {count} topics in {build:.1f}s ({size / 2**20:.0f} MB on disk), reopened in {load * 1000:.0f} ms")
+
+        sampled = rng.sample(topics, args.queries)
+        novel = []
+        while len(novel) < args.queries:
+            topic = normalize_topic(make_topic(rng, vocabulary))
+            if topic not in indexed:
+                novel.append(topic)
+        kinds = {
+            "paraphrase": [(normalize_topic(paraphrase(rng, t)), t) for t in sampled],
+            "near miss": [(normalize_topic(near_miss(rng, t, vocabulary)), None) for t in sampled],
+            "novel": [(t, None) for t in novel],
+        }
+
+        # One lookup per query with no threshold; each threshold then just filters the best score
+        results = {}
+        latencies = []
+        for kind, queries in kinds.items():
+            results[kind] = []
+            for query, expected in queries:
+                if query in indexed and kind != "paraphrase":
+                    continue # the swap happened to produce another indexed topic
+                start = time.perf_counter()
+                match = index.nearest(query, -1.0)
+                latencies.append(time.perf_counter() - start)
+                results[kind].append((match, expected))
+
+    latencies.sort()
+    print(f"lookup latency over {count} topics: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, mean {statistics.mean(latencies) * 1000:.2f} ms")
+    print()
+    print(f"{'threshold':>9} {'paraphrase hits':>16} {'right topic':>12} {'near-miss false hits':>21} {'novel false hits':>17}")
+    for threshold in THRESHOLDS:
+        def rate(kind, correct=False):
+            rows = results[kind]
+            hits = [(m, e) for m, e in rows if m is not None and m[1] >= threshold]
+            if correct:
+                return sum(1 for m, e in hits if m[0] == e) / max(1, len(hits))
+            return len(hits) / max(1, len(rows))
+        print(f"{threshold:9.2f} {rate('paraphrase'):16.1%} {rate('paraphrase', True):12.1%} "
+              f"{rate('near miss'):21.1%} {rate('novel'):17.1%}")
+
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = topic_index.VectorIndex(tmp, "guard")
+        index.add([normalize_topic(indexed) for indexed, _ in MUST_MISS])
+        for indexed, query in MUST_MISS:
+            match = index.nearest(normalize_topic(query), min(THRESHOLDS))
+            if match is not None and match[0] == normalize_topic(indexed):
+                failed.append(f"{query!r} matched {indexed!r} ({match[1]:.2f})")
+    print()
+    print(f"must-miss pairs: {len(MUST_MISS) - len(failed)}/{len(MUST_MISS)} kept apart")
+    if failed:
+        for line in failed:
+            print(f"FAIL: {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: concurrent chat writes vs dashboard reads, rollback journal vs WAL.
+
+Writer threads save chat exchanges (INSERT + COMMIT) while reader threads run
+the dashboard summary and /api/progress queries, for --seconds per config.
+Reports writer throughput and reader latency percentiles.
+
+  legacy  journal_mode=DELETE, synchronous=FULL (the old database.py)
+  tuned   database.sqlite_pragmas(): WAL, synchronous=NORMAL, cache/mmap/busy_timeout
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_sqlite_concurrency [--seconds 5] [--writers 4] [--readers 4]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend import analytics, database, migrations, models, progress
+
+LEGACY_PRAGMAS = ["PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL"]
+
+
+def build_engine(path, pragmas):
+    engine = create_engine(f"sqlite:///{path}", **database.engine_options(f"sqlite:///{path}"))
+
+    def apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    event.listen(engine, "connect", apply)
+    return engine
+
+
+def seed(path, sessions=200_000):
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.upgrade(engine)
+    engine.dispose()
+    rng = random.Random(0)
+    now = datetime(2026, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO study_sessions (activity_type, duration_seconds, created_at) VALUES (?, ?, ?)",
+        (
+            (rng.choice(["timer_focus", "quiz", "chat"]), rng.randint(30, 3600),
+             (now - timedelta(seconds=rng.randint(0, 90 * 86400))).strftime("%Y-%m-%d %H:%M:%S"))
+            for _ in range(sessions)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(session_factory, seconds, writers, readers):
+    stop = threading.Event()
+    writes = []
+    read_latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def writer():
+        count = 0
+        while not stop.is_set():
+            db = session_factory()
+            try:
+                db.add(models.ChatHistory(role="user", content="What is photosynthesis?"))
+                db.add(models.ChatHistory(role="ai", content="Photosynthesis is ..." * 20))
+                db.commit()
+                count += 1
+            except Exception as e:
+                db.rollback()
+                with lock:
+                    errors.append(str(e))
+            finally:
+                db.close()
+        with lock:
+            writes.append(count)
+
+    def reader():
+        latencies = []
+        while not stop.is_set():
+            db = session_factory()
+            start = time.perf_counter()
+            try:
+                analytics.summarize_study_time(db, datetime(2025, 12, 1), datetime(2026, 1, 1))
+                progress.read(db)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            finally:
+                db.close()
+        with lock:
+            read_latencies.extend(latencies)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)] + \
+              [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(writes) / seconds, sorted(read_latencies), errors
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'config':<8} {'writes/s':>9} {'reads/s':>8} {'read p50 (ms)':>14} {'read p99 (ms)':>14} {'errors':>7}")
+        for name, pragmas in (("legacy", LEGACY_PRAGMAS), ("tuned", database.sqlite_pragmas())):
+            path = os.path.join(tmp, f"{name}.db")
+            seed(path)
+            engine = build_engine(path, pragmas)
+            write_rate, latencies, errors = run(sessionmaker(bind=engine), args.seconds, args.writers, args.readers)
+            engine.dispose()
+            print(f"{name:<8} {write_rate:9.0f} {len(latencies) / args.seconds:8.0f} "
+                  f"{percentile(latencies, 0.5) * 1000:14.1f} {percentile(latencies, 0.99) * 1000:14.1f} {len(errors):7}")
+            if errors:
+                print(f"         first error: {errors[0][:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: app import and startup time, with a regression guard.
+
+Each measurement runs in a fresh interpreter so nothing is already imported:
+  import      `import backend.main` wall time (median of --runs)
+  heavy       modules that must not be loaded by that import (matplotlib,
+              networkx, google.generativeai, pandas)
+  ready       startup hooks done and GET /api/progress answered (TestClient)
+  warm        the background warm-up finished (maps + genai imported)
+
+Exits 1 when the median import time exceeds --max-import-seconds or a heavy
+module is imported eagerly, so it can run in CI.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_startup [--runs 5] [--max-import-seconds 1.5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ["matplotlib", "networkx", "google.generativeai", "pandas"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+STARTUP_PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+import backend.main as main
+with TestClient(main.app) as client:
+    client.get("/api/progress").raise_for_status()
+    ready = time.perf_counter() - start
+    client.portal.call(lambda: asyncio.wait_for(main.app.state.warm_up, 60))
+    warm = time.perf_counter() - start
+print(json.dumps({"ready": ready, "warm": warm}))
+"""
+
+
+def probe(code, env):
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=os.getcwd())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "probe failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=1.5)
+    parser.add_argument("--skip-startup", action="store_true", help="only time the import")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            PYTHONWARNINGS="ignore",
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            RENDER_STORE_DIR=os.path.join(tmp, "renders"),
+            SEMANTIC_CACHE_DIR=os.path.join(tmp, "semantic"),
+            RENDER_POOL_WORKERS=os.getenv("RENDER_POOL_WORKERS", "0"),
+        )
+        imports = [probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+        seconds = sorted(run["seconds"] for run in imports)
+        heavy = sorted({m for run in imports for m in run["heavy"]})
+        print(f"import backend.main   median {statistics.median(seconds):.2f}s  "
+              f"min {seconds[0]:.2f}s  max {seconds[-1]:.2f}s  ({args.runs} runs)")
+        print(f"heavy modules loaded  {', '.join(heavy) or 'none'}")
+
+        if not args.skip_startup:
+            startup = probe(STARTUP_PROBE, env)
+            print(f"first request served  {startup['ready']:.2f}s")
+            print(f"warm-up finished      {startup['warm']:.2f}s")
+
+    failures = []
+    if statistics.median(seconds) > args.max_import_seconds:
+        failures.append(f"import took {statistics.median(seconds):.2f}s (limit {args.max_import_seconds:.2f}s)")
+    if heavy:
+        failures.append(f"imported eagerly: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: the "new topic" flow, four endpoints vs one /api/study-pack call.
+
+Runs the backend against backend.benchmarks.fake_providers (see bench_load)
+and, for --topics fresh topics each, times until a summary, quiz, flashcards
+and a rendered map are all available:
+
+  sequential  /api/summarize, /api/generate-quiz, /api/generate-flashcards and
+              /api/generate-map one after another, as when visiting each page
+  separate    the same four requests fired together
+  study pack  one POST /api/study-pack
+
+Reports end-to-end latency per topic and LLM calls per topic (counted by the
+fake providers). Every quiz served is checked the way the frontend uses it
+(10+ questions, unique ids, unique options, the answer among them) and the
+run exits 1 if one is not, e.g. with --bad-question-rate 0.2 the broken
+questions must never reach the client. Unknown options are passed to
+fake_providers.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_study_pack [--topics 20] [--concurrency 4] [--latency lognormal:1.5,0.4]
+        [--bad-question-rate 0.2]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+from backend.benchmarks.bench_load import percentile, running_stack
+
+SEPARATE = [
+    ("/api/summarize", "topic"),
+    ("/api/generate-quiz", "topic"),
+    ("/api/generate-flashcards", "topic"),
+    ("/api/generate-map", "topic"),
+]
+
+
+def quiz_from(responses):
+    for response in responses:
+        response.raise_for_status()
+    return dict(zip((path for path, _ in SEPARATE), responses))["/api/generate-quiz"].json()
+
+
+async def sequential(client, topic):
+    return quiz_from([await client.post(path, json={key: topic}) for path, key in SEPARATE])
+
+
+async def separate(client, topic):
+    return quiz_from(await asyncio.gather(*(client.post(path, json={key: topic}) for path, key in SEPARATE)))
+
+
+async def study_pack(client, topic):
+    response = await client.post("/api/study-pack", json={"topic": topic})
+    response.raise_for_status()
+    return response.json()["quiz"]
+
+
+def usable_quiz(quiz) -> bool:
+    questions = quiz.get("questions") if isinstance(quiz, dict) else None
+    if not isinstance(questions, list) or len(questions) < 10:
+        return False
+    if len({q.get("id") for q in questions}) != len(questions):
+        return False
+    return all(
+        isinstance(q.get("options"), list) and len(set(q["options"])) == len(q["options"]) >= 2
+        and q.get("answer") in q["options"]
+        for q in questions
+    )
+
+
+async def run(client, flow, topics, concurrency):
+    latencies = []
+    bad = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(topic):
+        nonlocal bad
+        async with semaphore:
+            start = time.perf_counter()
+            quiz = await flow(client, topic)
+            latencies.append(time.perf_counter() - start)
+            bad += not usable_quiz(quiz)
+
+    await asyncio.gather(*(one(topic) for topic in topics))
+    return sorted(latencies), bad
+
+
+def provider_calls(fake_url):
+    stats = httpx.get(f"{fake_url}/stats").json()
+    return sum(count for key, count in stats.items() if key.endswith(".requests"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="topics in flight at once")
+    args, provider_args = parser.parse_known_args()
+    if not any(arg.startswith("--latency") for arg in provider_args):
+        provider_args += ["--latency", "lognormal:1.5,0.4"] # a realistic full-answer LLM latency
+
+    flows = [("sequential", sequential), ("separate", separate), ("study pack", study_pack)]
+    with running_stack(provider_args) as (api_url, fake_url, _):
+        async def drive():
+            async with httpx.AsyncClient(base_url=api_url, timeout=120) as client:
+                await study_pack(client, "warm-up") # lazy imports and render workers
+                results = []
+                for name, flow in flows:
+                    before = provider_calls(fake_url)
+                    topics = [f"{name} topic {i}" for i in range(args.topics)]
+                    latencies, bad = await run(client, flow, topics, args.concurrency)
+                    calls = (provider_calls(fake_url) - before) / args.topics
+                    results.append((name, latencies, calls, bad))
+                return results
+
+        results = asyncio.run(drive())
+
+    print(f"{'flow':<11} {'mean (ms)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'LLM calls/topic':>16} {'bad quizzes':>12}")
+    for name, latencies, calls, bad in results:
+        print(f"{name:<11} {statistics.mean(latencies) * 1000:10.0f} {percentile(latencies, 0.5) * 1000:9.0f} "
+              f"{percentile(latencies, 0.95) * 1000:9.0f} {calls:16.1f} {bad:12}")
+    if any(bad for *_, bad in results):
+        print("FAIL: a quiz with unusable questions reached the client")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
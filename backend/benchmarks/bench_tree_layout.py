@@ -0,0 +1,101 @@
+"""
+Benchmark: iterative tree layout vs the previous recursive hierarchy_pos.
+
+Also a regression guard: exits 1 when laying out a --guard-nodes chain (the
+deepest possible tree) takes longer than --max-chain-seconds, since a per-level
+pass would make the layout O(n * depth) there.
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_tree_layout [--sizes 1000 10000 50000]
+        [--guard-nodes 50000] [--max-chain-seconds 0.5]
+"""
+import argparse
+import random
+import sys
+import time
+import networkx as nx
+from backend import tree_layout
+
+
+def recursive_hierarchy_pos(G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5):
+    """The layout maps.hierarchy_pos used before tree_layout (kept here for comparison)."""
+    layout_G = nx.bfs_tree(G, root)
+
+    def _hierarchy_pos(G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5, pos=None, parent=None):
+        if pos is None:
+            pos = {root: (xcenter, vert_loc)}
+        else:
+            pos[root] = (xcenter, vert_loc)
+        children = list(G.neighbors(root))
+        if len(children) != 0:
+            dx = width / len(children)
+            nextx = xcenter - width / 2 - dx / 2
+            for child in children:
+                nextx += dx
+                pos = _hierarchy_pos(G, child, width=dx, vert_gap=vert_gap,
+                                     vert_loc=vert_loc - vert_gap, xcenter=nextx,
+                                     pos=pos, parent=root)
+        return pos
+
+    return _hierarchy_pos(layout_G, root, width, vert_gap, vert_loc, xcenter)
+
+
+def random_tree(n, seed=0):
+    """Random recursive tree: node i attaches to a uniformly chosen earlier node."""
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_node(0)
+    for i in range(1, n):
+        G.add_edge(rng.randrange(i), i)
+    return G
+
+
+def syllabus_tree(n, fanout=6):
+    """Balanced tree with a fixed fan-out, like a subject > unit > chapter > topic syllabus."""
+    G = nx.DiGraph()
+    G.add_node(0)
+    for i in range(1, n):
+        G.add_edge((i - 1) // fanout, i)
+    return G
+
+
+def chain(n):
+    return nx.path_graph(n, create_using=nx.DiGraph)
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--guard-nodes", type=int, default=50000)
+    parser.add_argument("--max-chain-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{'tree':<10} {'nodes':>8} {'iterative (ms)':>15} {'recursive (ms)':>15}")
+    for size in args.sizes:
+        for name, G in (("random", random_tree(size)), ("syllabus", syllabus_tree(size)), ("chain", chain(size))):
+            new = timed(tree_layout.tree_layout, G, 0) * 1000
+            try:
+                old = f"{timed(recursive_hierarchy_pos, G, 0) * 1000:15.1f}"
+            except RecursionError:
+                old = f"{'RecursionError':>15}"
+            print(f"{name:<10} {size:>8} {new:15.1f} {old}")
+
+    nodes, parent, _ = tree_layout.bfs_children(chain(args.guard_nodes), 0)
+    seconds = timed(tree_layout.layout_from_parents, nodes, parent)
+    print(f"\nchain of {args.guard_nodes} nodes: layout_from_parents {seconds:.3f}s (limit {args.max_chain_seconds}s)")
+    if seconds > args.max_chain_seconds:
+        print("FAIL: tree layout is no longer linear in the number of nodes")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Local stand-in for the three LLM APIs the backend calls, for offline load tests.
+
+Serves plausible answers to the prompts in ai_service.py (quiz, flashcards,
+concept map, node expansion, summary, study pack, chat) after a sampled
+delay, and fails a configurable share of requests with 429s or malformed JSON
+(and of quiz questions with a missing or wrong answer key):
+
+  Gemini        GET  /v1beta/models
+                POST /v1beta/models/<model>:generateContent
+                POST /v1beta/models/<model>:streamGenerateContent?alt=sse
+  Hugging Face  POST /hf/models/<org>/<model>          (JSON, or SSE with "stream": true)
+  Pollinations  POST /pollinations/                    (plain text, streamed in chunks)
+  Counters      GET  /stats
+
+Latency specs: fixed:S  uniform:LO,HI  normal:MEAN,SD  lognormal:MEDIAN,SIGMA  exp:MEAN
+(seconds). --latency sets all providers; --gemini-latency etc. override one.
+
+Run from the repository root:
+    python -m backend.benchmarks.fake_providers [--port 8100] [--latency lognormal:0.8,0.5]
+        [--rate-429 0.02] [--malformed-rate 0.05] [--bad-question-rate 0.1] [--seed 0]
+
+and start the backend with:
+    GEMINI_API_KEY=fake GEMINI_API_BASE=http://127.0.0.1:8100/v1beta
+    HUGGINGFACE_API_KEY=fake HUGGINGFACE_API_URL=http://127.0.0.1:8100/hf/models/fake/mistral
+    POLLINATIONS_API_URL=http://127.0.0.1:8100/pollinations/
+(provider_env() returns exactly these.)
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+PROVIDERS = ("gemini", "huggingface", "pollinations")
+MODELS = ["models/gemini-2.0-flash", "models/gemini-1.5-flash"]
+STREAM_CHUNKS = 8
+
+WORDS = (
+    "energy structure process system function cell light water carbon layer signal force "
+    "pattern model network change growth balance source cycle element reaction theory"
+).split()
+
+
+def provider_env(base_url: str) -> dict:
+    """Environment variables that point the backend's providers at a fake server at `base_url`."""
+    base_url = base_url.rstrip("/")
+    return {
+        "GEMINI_API_KEY": "fake",
+        "GEMINI_API_BASE": f"{base_url}/v1beta",
+        "HUGGINGFACE_API_KEY": "fake",
+        "HUGGINGFACE_API_URL": f"{base_url}/hf/models/fake/mistral",
+        "POLLINATIONS_API_URL": f"{base_url}/pollinations/",
+    }
+
+
+def parse_latency(spec: str):
+    """Returns a function rng -> seconds for a spec like "lognormal:0.8,0.5"."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    samplers = {
+        "fixed": lambda rng: values[0],
+        "uniform": lambda rng: rng.uniform(values[0], values[1]),
+        "normal": lambda rng: rng.gauss(values[0], values[1]),
+        "lognormal": lambda rng: values[0] * rng.lognormvariate(0, values[1]),
+        "exp": lambda rng: rng.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise argparse.ArgumentTypeError(f"Unknown latency distribution: {kind}")
+    sampler = samplers[kind]
+    return lambda rng: max(0.0, sampler(rng))
+
+
+class Behaviour:
+    """How one fake provider answers: latency distribution and failure rates."""
+
+    def __init__(self, latency, rate_429=0.0, malformed_rate=0.0, bad_question_rate=0.0):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.malformed_rate = malformed_rate
+        self.bad_question_rate = bad_question_rate
+
+
+# --- Answers -----------------------------------------------------------------
+
+def _topic(prompt: str, pattern: str, default="the topic"):
+    match = re.search(pattern, prompt)
+    return match.group(1).strip() if match else default
+
+
+def _phrase(rng, n=2):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).title()
+
+
+def _quiz(topic, rng, bad_question_rate=0.0):
+    questions = []
+    for i in range(1, 11):
+        options = [f"{_phrase(rng)} of {topic} ({i}{letter})" for letter in "abcd"]
+        question = {"id": i, "question": f"Which statement about {topic} is true ({i})?",
+                    "options": options, "answer": rng.choice(options)}
+        if rng.random() < bad_question_rate:
+            _break_question(question, rng)
+        questions.append(question)
+    return {"questions": questions}
+
+
+def _break_question(question, rng):
+    """The ways LLM quiz questions go wrong while the JSON stays valid."""
+    kind = rng.randrange(3)
+    if kind == 0:
+        question["answer"] = "None of the above" # not one of the options
+    elif kind == 1:
+        del question["options"]
+    else:
+        question["options"] = [question["answer"]] * 4
+
+
+def _flashcards(topic, rng):
+    return {"flashcards": [
+        {"front": f"{_phrase(rng)} in {topic}", "back": f"How {topic} relates to {_phrase(rng, 3).lower()}."}
+        for _ in range(10)
+    ]}
+
+
+def _concept_map(topic, rng):
+    nodes = [topic] + [f"{_phrase(rng)} {i}" for i in range(rng.randint(4, 7))]
+    edges = [{"source": rng.choice(nodes[:i]), "target": node, "relationship": rng.choice(["contains", "relates-to"])}
+             for i, node in enumerate(nodes) if i]
+    return {"layout": "tree", "root": topic, "edges": edges}
+
+
+def _children(node, rng):
+    return {"children": [{"target": f"{node} {_phrase(rng, 1)} {i}", "relationship": "contains"}
+                         for i in range(rng.randint(3, 6))]}
+
+
+def _prose(subject, rng, words=120):
+    return f"{subject} is about " + " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def _study_pack(topic, parts, rng, bad_question_rate=0.0):
+    makers = {
+        "summary": lambda: _prose(topic, rng, 200),
+        "quiz": lambda: _quiz(topic, rng, bad_question_rate),
+        "flashcards": lambda: _flashcards(topic, rng),
+        "map": lambda: _concept_map(topic, rng),
+    }
+    return {part: makers[part]() for part in parts if part in makers}
+
+
+def answer(prompt: str, rng, bad_question_rate=0.0) -> tuple:
+    """(text, is_json) for a prompt built by ai_service.py."""
+    if "study pack about:" in prompt:
+        parts = [p.strip() for p in _topic(prompt, r"Include exactly these keys:\s*(.+)\n", "").split(",")]
+        topic = _topic(prompt, r"study pack about:\s*(.+?)\.\s*\n")
+        return json.dumps(_study_pack(topic, parts, rng, bad_question_rate)), True
+    if "multiple choice quiz about:" in prompt:
+        return json.dumps(_quiz(_topic(prompt, r"quiz about:\s*(.+?)\.\s*\n"), rng, bad_question_rate)), True
+    if "flashcards for:" in prompt:
+        return json.dumps(_flashcards(_topic(prompt, r"flashcards for:\s*(.+?)\.\s*\n"), rng)), True
+    if "direct children of" in prompt:
+        return json.dumps(_children(_topic(prompt, r'direct children of "(.+?)"'), rng)), True
+    if "concept map for:" in prompt:
+        return json.dumps(_concept_map(_topic(prompt, r'concept map for:\s*"(.+?)"'), rng)), True
+    if "summary of the following topic:" in prompt:
+        return _prose(_topic(prompt, r"topic:\s*'(.+?)'"), rng, 200), False
+    if "single word OK" in prompt:
+        return "OK", False
+    return _prose("Your question", rng), False
+
+
+def malform(text: str, rng) -> str:
+    if rng.random() < 0.5:
+        return text[: max(1, len(text) // 2)] # truncated mid-object
+    return "Sure! Here is the JSON you asked for:\n" + text.replace('"', "'", 3)
+
+
+def chunks(text: str, n=STREAM_CHUNKS):
+    size = max(1, -(-len(text) // n))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# --- App ---------------------------------------------------------------------
+
+def create_app(behaviours: dict, seed=0) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = Counter()
+
+    async def respond(provider: str, prompt: str):
+        """Sleeps for the sampled latency; returns (status, text, delay)."""
+        behaviour = behaviours[provider]
+        delay = behaviour.latency(rng)
+        stats[f"{provider}.requests"] += 1
+        if rng.random() < behaviour.rate_429:
+            stats[f"{provider}.429"] += 1
+            await asyncio.sleep(delay / 10) # quota errors come back fast
+            return 429, None, 0
+        text, is_json = answer(prompt, rng, behaviour.bad_question_rate)
+        if is_json and rng.random() < behaviour.malformed_rate:
+            stats[f"{provider}.malformed"] += 1
+            text = malform(text, rng)
+        return 200, text, delay
+
+    def streamed(parts, delay, render):
+        async def body():
+            for part in parts:
+                await asyncio.sleep(delay / len(parts))
+                yield render(part)
+        return body()
+
+    @app.get("/stats")
+    def get_stats():
+        return dict(stats)
+
+    @app.get("/v1beta/models")
+    def list_models():
+        return {"models": [{"name": m, "supportedGenerationMethods": ["generateContent"]} for m in MODELS]}
+
+    @app.post("/v1beta/models/{model_method}")
+    async def gemini(model_method: str, request: Request):
+        body = await request.json()
+        prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        status, text, delay = await respond("gemini", prompt)
+        if status == 429:
+            return JSONResponse({"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                           "status": "RESOURCE_EXHAUSTED"}}, status_code=429)
+
+        def candidate(part):
+            return {"candidates": [{"content": {"role": "model", "parts": [{"text": part}]}, "finishReason": "STOP"}]}
+
+        if model_method.endswith(":streamGenerateContent"):
+            return StreamingResponse(streamed(chunks(text), delay, lambda part: f"data: {json.dumps(candidate(part))}\r\n\r\n"),
+                                     media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return candidate(text)
+
+    @app.post("/hf/models/{model_path:path}")
+    async def huggingface(model_path: str, request: Request):
+        body = await request.json()
+        prompt = body.get("inputs", "").removeprefix("[INST] ").removesuffix(" [/INST]")
+        status, text, delay = await respond("huggingface", prompt)
+        if status == 429:
+            return JSONResponse({"error": "Rate limit reached. You reached free usage limit (reset hourly)."}, status_code=429)
+        if body.get("stream"):
+            event = lambda part: f"data: {json.dumps({'token': {'text': part, 'special': False}})}\n\n"
+            return StreamingResponse(streamed(chunks(text), delay, event), media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return [{"generated_text": text}]
+
+    @app.post("/pollinations/")
+    async def pollinations(request: Request):
+        body = await request.json()
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+        status, text, delay = await respond("pollinations", prompt)
+        if status == 429:
+            return PlainTextResponse("Too Many Requests", status_code=429)
+        # The real API always streams its plain-text body; clients read it whole or chunk by chunk
+        return StreamingResponse(streamed(chunks(text), delay, lambda part: part), media_type="text/plain")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:0.8,0.5")
+    for provider in PROVIDERS:
+        parser.add_argument(f"--{provider}-latency", help=f"overrides --latency for {provider}")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of JSON answers that are broken")
+    parser.add_argument("--bad-question-rate", type=float, default=0.0,
+                        help="share of quiz questions with a missing or wrong answer key")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    behaviours = {
+        provider: Behaviour(parse_latency(getattr(args, f"{provider}_latency") or args.latency),
+                            args.rate_429, args.malformed_rate, args.bad_question_rate)
+        for provider in PROVIDERS
+    }
+    import uvicorn
+    uvicorn.run(create_app(behaviours, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy.orm import Session
+from . import models
+
+MAX_PAGE_SIZE = 200
+
+
+def page(db: Session, limit: int = 50, before: datetime = None):
+    """
+    The newest `limit` messages older than `before` (keyset pagination on
+    timestamp), returned oldest first for display.
+    """
+    query = db.query(models.ChatHistory)
+    if before is not None:
+        query = query.filter(models.ChatHistory.timestamp < before)
+    rows = query.order_by(models.ChatHistory.timestamp.desc(), models.ChatHistory.id.desc())\
+        .limit(max(1, min(limit, MAX_PAGE_SIZE))).all()
+    return rows[::-1]
@@ -0,0 +1,207 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# A breaker opens when, over the last BREAKER_WINDOW calls (and at least
+# BREAKER_MIN_CALLS), the failure rate reaches BREAKER_FAILURE_RATE. A 429 opens
+# it immediately because quota errors do not clear up on retry.
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "20"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "600"))
+BREAKER_PROBE_INTERVAL = float(os.getenv("BREAKER_PROBE_INTERVAL", "5"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_quota_error(error) -> bool:
+    return "429" in str(error)
+
+
+class CircuitBreaker:
+    """Tracks error rate, 429s and latency for one provider or model."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = None
+        self.last_error = None
+        self.total_calls = 0
+        self.total_failures = 0
+        self.quota_errors = 0
+        self.slow_calls = 0
+        self._outcomes = deque(maxlen=BREAKER_WINDOW)
+        self._latencies = deque(maxlen=BREAKER_WINDOW)
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Regular traffic only goes through closed circuits; half-open is reserved for probes."""
+        return self.state == CLOSED
+
+    def probe_due(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.total_calls += 1
+            slow = seconds >= BREAKER_SLOW_CALL_SECONDS
+            if slow:
+                self.slow_calls += 1
+            self._latencies.append(seconds)
+            self._outcomes.append(not slow)
+            if self.state == HALF_OPEN:
+                self._close()
+            elif slow:
+                self._evaluate()
+
+    def record_failure(self, error):
+        with self._lock:
+            self.total_calls += 1
+            self.total_failures += 1
+            self.last_error = str(error)[:200]
+            self._outcomes.append(False)
+            if is_quota_error(error):
+                self.quota_errors += 1
+                self._open()
+            elif self.state == HALF_OPEN:
+                self._open()
+            else:
+                self._evaluate()
+
+    def _evaluate(self):
+        if len(self._outcomes) < BREAKER_MIN_CALLS:
+            return
+        failure_rate = self._outcomes.count(False) / len(self._outcomes)
+        if failure_rate >= BREAKER_FAILURE_RATE:
+            self._open()
+
+    def _open(self):
+        # Back off harder every time a probe finds the circuit still broken
+        if self.state == HALF_OPEN:
+            self.cooldown = min(BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+        if self.state != OPEN:
+            print(f"Circuit OPEN for {self.name} ({self.last_error})")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def _close(self):
+        print(f"Circuit CLOSED for {self.name}")
+        self.state = CLOSED
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = None
+        self._outcomes.clear()
+
+    def half_open(self):
+        with self._lock:
+            self.state = HALF_OPEN
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+            latencies = sorted(self._latencies)
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, round(self.cooldown - (time.monotonic() - self.opened_at), 1))
+        return {
+            "state": self.state,
+            "error_rate": round(outcomes.count(False) / len(outcomes), 2) if outcomes else 0.0,
+            "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+            "total_calls": self.total_calls,
+            "total_failures": self.total_failures,
+            "quota_errors": self.quota_errors,
+            "slow_calls": self.slow_calls,
+            "retry_in_seconds": retry_in,
+            "last_error": self.last_error,
+        }
+
+
+class BreakerRegistry:
+    """
+    Holds one breaker per provider ("gemini") and per model ("gemini:models/...").
+    Open circuits are probed in the background once their cooldown elapses,
+    using the probe registered for the breaker's provider.
+    """
+
+    def __init__(self):
+        self._breakers = {}
+        self._probes = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name)
+            return breaker
+
+    def allow(self, name: str) -> bool:
+        return self.get(name).allow()
+
+    async def call(self, name: str, factory):
+        """Runs factory() and records its outcome against breaker `name`."""
+        breaker = self.get(name)
+        start = time.perf_counter()
+        try:
+            result = await factory()
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success(time.perf_counter() - start)
+        return result
+
+    def register_probe(self, provider: str, probe):
+        """probe(breaker_name) is an async callable that raises if the target is unhealthy."""
+        self._probes[provider] = probe
+
+    async def _probe(self, breaker: CircuitBreaker):
+        probe = self._probes.get(breaker.name.split(":", 1)[0])
+        if probe is None:
+            return
+        breaker.half_open()
+        await self.call(breaker.name, lambda: probe(breaker.name))
+
+    async def probe_open_circuits(self):
+        with self._lock:
+            due = [b for b in self._breakers.values() if b.probe_due()]
+        if due:
+            await asyncio.gather(*(self._probe(b) for b in due), return_exceptions=True)
+
+    async def _probe_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.probe_open_circuits()
+            except Exception as e:
+                print(f"Circuit probe error: {e}")
+
+    def start(self, interval=BREAKER_PROBE_INTERVAL):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._probe_loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
+
+
+breakers = BreakerRegistry()
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AI_HEDGING = os.getenv("AI_HEDGING", "1") == "1"
+
+# The hedge fires once the running provider exceeds its observed p95 latency,
+# clamped to [HEDGE_MIN_BUDGET, HEDGE_MAX_BUDGET]. Until enough samples exist
+# HEDGE_DEFAULT_BUDGET is used.
+HEDGE_MIN_BUDGET = float(os.getenv("HEDGE_MIN_BUDGET", "0.5"))
+HEDGE_MAX_BUDGET = float(os.getenv("HEDGE_MAX_BUDGET", "10"))
+HEDGE_DEFAULT_BUDGET = float(os.getenv("HEDGE_DEFAULT_BUDGET", "4"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per provider."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(provider)
+            if samples is None:
+                samples = self._samples[provider] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, provider: str, pct: float):
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def count(self, provider: str) -> int:
+        with self._lock:
+            return len(self._samples.get(provider, ()))
+
+    def budget(self, provider: str) -> float:
+        """Seconds to wait for `provider` before hedging to the next one."""
+        if self.count(provider) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_BUDGET
+        p95 = self.percentile(provider, 95)
+        return min(HEDGE_MAX_BUDGET, max(HEDGE_MIN_BUDGET, p95))
+
+    def snapshot(self):
+        with self._lock:
+            providers = list(self._samples)
+        return {
+            name: {
+                "samples": self.count(name),
+                "p50": self.percentile(name, 50),
+                "p95": self.percentile(name, 95),
+                "hedge_budget": self.budget(name),
+            }
+            for name in providers
+        }
+
+
+latency = LatencyTracker()
+
+
+async def _timed(name, factory):
+    start = time.perf_counter()
+    result = await factory()
+    latency.record(name, time.perf_counter() - start)
+    return result
+
+
+async def run_sequential(attempts):
+    """
+    Tries each (name, factory) in order until one succeeds.
+    Returns (result, errors); result is None if every attempt failed.
+    """
+    errors = []
+    for name, factory in attempts:
+        try:
+            return await _timed(name, factory), errors
+        except Exception as e:
+            errors.append((name, e))
+    return None, errors
+
+
+async def run_hedged(attempts):
+    """
+    Starts the first (name, factory) and launches the next one whenever the
+    running attempt outlives its latency budget or fails. The first success
+    wins and every other in-flight attempt is cancelled.
+    Returns (result, errors); result is None if every attempt failed.
+    """
+    errors = []
+    pending = {}
+    queue = list(attempts)
+
+    def launch():
+        name, factory = queue.pop(0)
+        task = asyncio.ensure_future(_timed(name, factory))
+        pending[task] = name
+        return name
+
+    current = launch()
+    try:
+        while pending:
+            timeout = latency.budget(current) if queue else None
+            done, _ = await asyncio.wait(set(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                print(f"Hedging: {current} exceeded {timeout:.2f}s budget, starting {queue[0][0]}")
+                current = launch()
+                continue
+
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None:
+                    return task.result(), errors
+                errors.append((name, task.exception()))
+
+            # A failure hands over to the next provider right away
+            if queue:
+                current = launch()
+        return None, errors
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,14 +1,21 @@
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
+import asyncio
+import json
+import time
+from datetime import datetime
+import base64
+import re
 
-from . import models, database, ai_service, analytics, maps
-
-# Create Database Tables
-models.Base.metadata.create_all(bind=database.engine)
+# maps (networkx + matplotlib) and google.generativeai are imported lazily, then preloaded by warm_up()
+from . import models, database, ai_service, analytics, model_catalog, result_cache, providers, hedging, circuit_breaker, singleflight, render_store, render_pool, rendering, map_graphs, progress, migrations, chat_history, activity_buffer, timing, question_bank
 
 app = FastAPI()
 
@@ -26,17 +33,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_services():
+    # Bring the schema up to date (tables are no longer created at import time)
+    await run_in_threadpool(migrations.upgrade, database.engine)
+    # Keep the Gemini model list warm so requests never wait on list_models()
+    if ai_service.GEMINI_API_KEY:
+        model_catalog.catalog.start_background_refresh()
+    # Half-open probes for tripped provider/model circuits run off the request path
+    circuit_breaker.breakers.start()
+    # Heavy imports and render workers load in the background once the server is accepting requests
+    app.state.warm_up = asyncio.create_task(warm_up())
+    # Databases with sessions from before the progress counters existed get them built once
+    await run_in_threadpool(backfill_progress)
+    # Quizzes cached before the question bank existed seed it once
+    await run_in_threadpool(backfill_question_bank)
+    # The semantic topic index catches up with generated_results: new results added, expired ones dropped
+    await run_in_threadpool(result_cache.cache.index_stored_topics)
+    # Stored renders are capped by size and age (RENDER_STORE_MAX_BYTES / RENDER_STORE_MAX_AGE)
+    await run_in_threadpool(render_store.store.prune)
+    if activity_buffer.ACTIVITY_BUFFER:
+        activity_buffer.buffer.start()
+
+async def warm_up():
+    """
+    Spawns the matplotlib render workers, then imports google.generativeai and
+    maps in this process, so the first map/chart/chat request does not pay
+    for them. Requests that arrive earlier simply import on demand.
+    """
+    try:
+        await render_pool.pool.start()
+        await run_in_threadpool(_preload_modules)
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+def _preload_modules():
+    if not providers.GEMINI_API_BASE:
+        providers.gemini()
+    from . import maps  # noqa: F401
+
+def backfill_progress():
+    db = database.SessionLocal()
+    try:
+        if progress.backfill_if_needed(db):
+            print("Progress counters rebuilt from study_sessions")
+    finally:
+        db.close()
+
+def backfill_question_bank():
+    db = database.SessionLocal()
+    try:
+        added = question_bank.backfill_if_needed(db)
+        if added:
+            db.commit()
+            print(f"Question bank seeded with {added} questions from cached quizzes")
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    # Drain buffered activity events before anything else goes away
+    await run_in_threadpool(activity_buffer.buffer.stop)
+    warm = getattr(app.state, "warm_up", None)
+    if warm is not None and not warm.done():
+        warm.cancel()
+    await database.dispose_async_engine()
+    model_catalog.catalog.stop_background_refresh()
+    await circuit_breaker.breakers.stop()
+    render_pool.pool.shutdown()
+    await providers.close_client()
+
 @app.middleware("http")
-async def add_process_time_header(request, call_next):
-    import time
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    print(f"Request: {request.url.path} took {process_time:.4f} seconds")
-    response.headers["X-Process-Time"] = str(process_time)
+async def record_request_timing(request, call_next):
+    # Spans (LLM call, JSON parsing, layout, render, DB commit) recorded while
+    # handling the request go out in Server-Timing and into the /metrics histograms
+    token = timing.begin_request()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        spans = timing.end_request(token)
+        route = request.scope.get("route")
+        # Route templates, not raw paths, keep the label set bounded
+        timing.request_seconds.observe(
+            elapsed, method=request.method, route=route.path if route else "unmatched", status=status)
+    if timing.SERVER_TIMING:
+        response.headers["Server-Timing"] = timing.server_timing_header(spans, elapsed)
     return response
 
 # Pydantic Schemas
+MAX_ACTIVITY_BATCH = 1000
+
 class ChatRequest(BaseModel):
     message: str
 
@@ -45,19 +135,42 @@ class ChatResponse(BaseModel):
 
 class QuizRequest(BaseModel):
     topic: str
+    refresh: bool = False # generate new questions instead of drawing from the question bank
 
 class SummarizeRequest(BaseModel):
     topic: str
+    refresh: bool = False # bypass the result cache
 
 class ActivityRequest(BaseModel):
     activity_type: str
     duration_seconds: int = 0
 
+class ActivityBatchRequest(BaseModel):
+    activities: List[ActivityRequest] = Field(..., max_length=MAX_ACTIVITY_BATCH)
+
 class FlashcardRequest(BaseModel):
     topic: str
+    refresh: bool = False # bypass the result cache
 
 class MapRequest(BaseModel):
     topic: str
+    refresh: bool = False # bypass the result cache
+    image_url_only: bool = False # return /api/maps/<id>.<format> instead of inline base64
+    # "layout" skips rendering and returns node/edge geometry for the browser to draw
+    output_format: Literal["png", "svg", "svgz", "layout"] = "png"
+
+class StudyPackRequest(BaseModel):
+    topic: str
+    parts: List[Literal["summary", "quiz", "flashcards", "map"]] = Field(default_factory=lambda: list(ai_service.STUDY_PACK_PARTS), min_length=1)
+    refresh: bool = False # bypass the result cache
+    image_url_only: bool = False
+    map_format: Literal["png", "svg", "svgz", "layout"] = "png"
+
+class ExpandNodeRequest(BaseModel):
+    node: str
+    refresh: bool = False # bypass the result cache
+    image_url_only: bool = False
+    output_format: Literal["png", "svg", "svgz", "layout"] = "layout"
 
 # Dependency
 def get_db():
@@ -71,83 +184,252 @@ def get_db():
 def read_root():
     return {"message": "Welcome to AI Study Buddy Backend!"}
 
-@app.post("/api/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
-    # 1. Generate AI Response
-    ai_response = ai_service.AIService.generate_response(request.message)
-    
-    # 2. Save to Database
-    db_chat = models.ChatHistory(role="user", content=request.message)
+async def save_chat_exchange(db: AsyncSession, message: str, ai_response: str):
+    db_chat = models.ChatHistory(role="user", content=message)
     db.add(db_chat)
     db_chat_response = models.ChatHistory(role="ai", content=ai_response)
     db.add(db_chat_response)
-    db.commit()
+    await db.commit()
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest, db: AsyncSession = Depends(database.get_async_db)):
+    # 1. Generate AI Response
+    ai_response = await ai_service.AIService.generate_response(request.message)
+    
+    # 2. Save to Database (async session, no threadpool hop)
+    await save_chat_exchange(db, request.message, ai_response)
     
     return {"response": ai_response}
 
+async def persist_chat_exchange(message: str, ai_response: str):
+    async with database.async_session_factory()() as db:
+        await save_chat_exchange(db, message, ai_response)
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Relays the answer as server-sent events: `data: {"delta": ...}` per chunk, then `event: done`."""
+    async def event_stream():
+        chunks = []
+        try:
+            async for chunk in ai_service.AIService.stream_response(request.message):
+                chunks.append(chunk)
+                yield sse_event({"delta": chunk})
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            if not chunks:
+                # Nothing streamed yet - fall back to the same message /api/chat would give
+                fallback = await ai_service.AIService.generate_response(request.message)
+                chunks.append(fallback)
+                yield sse_event({"delta": fallback})
+            else:
+                yield sse_event({"error": str(e)}, event="error")
+
+        # Persist the full transcript once the stream has completed
+        ai_response = "".join(chunks)
+        await persist_chat_exchange(request.message, ai_response)
+        yield sse_event({"response": ai_response}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/api/generate-quiz")
-def quiz_endpoint(request: QuizRequest, db: Session = Depends(get_db)):
-    quiz_data = ai_service.AIService.generate_quiz(request.topic)
+async def quiz_endpoint(request: QuizRequest):
+    quiz_data = await ai_service.AIService.generate_quiz(request.topic, refresh=request.refresh)
     return quiz_data
 
 @app.post("/api/summarize")
-def summarize_endpoint(request: SummarizeRequest):
-    summary = ai_service.AIService.summarize_topic(request.topic)
+async def summarize_endpoint(request: SummarizeRequest):
+    summary = await ai_service.AIService.summarize_topic(request.topic, refresh=request.refresh)
     return {"summary": summary}
 
 @app.post("/api/track-activity")
 def track_activity(request: ActivityRequest, db: Session = Depends(get_db)):
+    if activity_buffer.buffer.running:
+        # Write-behind: committed with the next batch (within ACTIVITY_BUFFER_FLUSH_INTERVAL)
+        activity_buffer.buffer.add(request.activity_type, request.duration_seconds)
+        return {"status": "success", "queued": True}
+
     session = models.StudySession(
         activity_type=request.activity_type,
         duration_seconds=request.duration_seconds
     )
     db.add(session)
+    progress.record_activity(db, request.activity_type, request.duration_seconds)
     db.commit()
     return {"status": "success"}
 
+@app.post("/api/track-activity/batch")
+def track_activity_batch(request: ActivityBatchRequest, db: Session = Depends(get_db)):
+    # One multi-row INSERT and one commit for the whole batch
+    progress.record_sessions(db, [activity.model_dump() for activity in request.activities])
+    db.commit()
+    return {"status": "success", "count": len(request.activities)}
+
 @app.post("/api/generate-flashcards")
-def flashcards_endpoint(request: FlashcardRequest):
-    data = ai_service.AIService.generate_flashcards(request.topic)
+async def flashcards_endpoint(request: FlashcardRequest):
+    data = await ai_service.AIService.generate_flashcards(request.topic, refresh=request.refresh)
     return data
 
+async def render_map(structure_data: dict, output_format: str) -> bytes:
+    from . import maps
+    return await render_pool.pool.submit(maps.render_network_graph, structure_data, output_format)
+
+async def map_image_response(structure_data: dict, output_format: str, image_url_only: bool = False) -> dict:
+    # Convert to Image using Python NetworkX in the render pool.
+    # Renders are content-addressed, so a repeat structure costs a hash lookup.
+    try:
+        image_id, image = await render_store.store.get_or_render(structure_data, render_map, output_format)
+    except render_pool.RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except render_pool.RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"CRITICAL MAP GENERATION ERROR: {e}")
+        from . import maps
+        image = await render_pool.pool.submit(maps.render_error_image, str(e), output_format)
+        return {
+            "map_image": base64.b64encode(image).decode('utf-8'),
+            "format": output_format,
+            "mime_type": rendering.MIME_TYPES[output_format],
+        }
+
+    response = {
+        # The map id names the structure (for /expand); the image URL also names the drawing code
+        "map_id": render_store.map_digest(structure_data),
+        "map_url": f"/api/maps/{image_id}.{output_format}",
+        "format": output_format,
+        "mime_type": rendering.MIME_TYPES[output_format],
+    }
+    if not image_url_only:
+        response["map_image"] = base64.b64encode(image).decode('utf-8')
+    return response
+
 @app.post("/api/generate-map")
-def map_endpoint(request: MapRequest):
+async def map_endpoint(request: MapRequest):
 
     # 1. Get Structure from AI
-    structure_data = ai_service.AIService.generate_concept_map_data(request.topic)
-    
-    # 2. Convert to Image using Python NetworkX
-    image_base64 = maps.generate_network_graph(structure_data)
-    
-    return {"map_image": image_base64}
+    structure_data = await ai_service.AIService.generate_concept_map_data(request.topic, refresh=request.refresh)
+    return await map_response(structure_data, request.output_format, request.image_url_only)
 
-@app.get("/api/progress")
-def get_progress(db: Session = Depends(get_db)):
-    try:
-        # Calculate Total Study Hours (from timer sessions)
-        total_seconds = db.query(func.sum(models.StudySession.duration_seconds))\
-            .filter(models.StudySession.activity_type == "timer_focus").scalar() or 0
-        total_hours = round(total_seconds / 3600, 1)
-
-        # Calculate Quizzes Taken
-        quizzes_count = db.query(models.StudySession)\
-            .filter(models.StudySession.activity_type == "quiz").count()
-        
-        # Simple count for now to avoid distinct errors
-        streak_days = db.query(models.StudySession).count()
+async def map_response(structure_data: dict, output_format: str, image_url_only: bool = False) -> dict:
+    # Keep the structure server-side so /api/maps/<id>/expand can grow it later
+    map_id = await run_in_threadpool(map_graphs.remember, structure_data)
 
+    if output_format == "layout":
+        # 2a. Layout only (no matplotlib): the client draws the boxes and lines
+        from . import maps
+        try:
+            with timing.span("layout"):
+                layout = await run_in_threadpool(maps.layout_network_graph, structure_data)
+        except Exception as e:
+            print(f"CRITICAL MAP LAYOUT ERROR: {e}")
+            raise HTTPException(status_code=500, detail=f"Map layout failed: {str(e)[:100]}")
         return {
-            "study_hours": total_hours,
-            "quizzes_taken": quizzes_count,
-            "streak_days": streak_days
+            "map_id": map_id,
+            "format": "layout",
+            "layout": layout,
         }
+
+    # 2. Render the image
+    return await map_image_response(structure_data, output_format, image_url_only)
+
+@app.post("/api/study-pack")
+async def study_pack_endpoint(request: StudyPackRequest):
+    """
+    Summary, quiz, flashcards and concept map for one topic from a single LLM
+    call, instead of one call per artifact. Only the requested parts are
+    returned; "map" has the same shape as /api/generate-map's response.
+    """
+    pack = await ai_service.AIService.generate_study_pack(request.topic, request.parts, refresh=request.refresh)
+    response = {"topic": request.topic}
+    for part in ("summary", "quiz", "flashcards"):
+        if part in pack:
+            response[part] = pack[part]
+    if "map" in pack:
+        response["map"] = await map_response(pack["map"], request.map_format, request.image_url_only)
+    return response
+
+@app.post("/api/maps/{map_id}/expand")
+async def expand_map_node(map_id: str, request: ExpandNodeRequest):
+    """
+    Grows one branch of a stored map: the AI is asked only for the children
+    of `node`, and only that node's subtree is laid out again. The expanded
+    map gets its own map_id; the original stays available.
+    """
+    graph = None
+    if re.fullmatch(r"[0-9a-f]{32}", map_id):
+        graph = await run_in_threadpool(map_graphs.load, map_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Map not found")
+
+    structure = graph["structure"]
+    edges = structure.get("edges", [])
+    labels = {structure.get("root")} | {e.get("source") for e in edges} | {e.get("target") for e in edges}
+    if request.node not in labels:
+        raise HTTPException(status_code=404, detail="Node not found in map")
+
+    # 1. Ask the AI for this node's children only
+    existing = [e.get("target") for e in edges if e.get("source") == request.node]
+    try:
+        expansion = await ai_service.AIService.expand_concept_map_node(
+            structure.get("root") or request.node, request.node, existing, refresh=request.refresh)
     except Exception as e:
-        print(f"ERROR calculating progress: {e}")
-        return {
-            "study_hours": 0,
-            "quizzes_taken": 0,
-            "streak_days": 0
-        }
+        print(f"Map expansion error: {e}")
+        raise HTTPException(status_code=503, detail=f"Map expansion failed: {str(e)[:100]}")
+
+    # 2. Merge and re-lay out the affected subtree
+    try:
+        result = await run_in_threadpool(map_graphs.expand, graph, request.node, expansion["children"])
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Node not found in map")
+
+    response = {"parent_id": map_id, "added": result["added"]}
+    if request.output_format == "layout":
+        return {**response, "map_id": result["map_id"], "format": "layout", "layout": result["layout"]}
+    image = await map_image_response(result["structure"], request.output_format, request.image_url_only)
+    return {**response, **image}
+
+@app.get("/api/maps/{map_file}")
+def get_map_image(map_file: str, request: Request):
+    match = re.fullmatch(r"([0-9a-f]{32})\.(png|svgz|svg)", map_file)
+    if not match:
+        raise HTTPException(status_code=404, detail="Map not found")
+    image_id, output_format = match.groups()
+
+    etag = f'"{image_id}-{output_format}"'
+    headers = {"ETag": etag, "Cache-Control": render_store.CACHE_CONTROL}
+    if output_format == "svgz":
+        headers["Content-Encoding"] = "gzip"
+    if render_store.etag_matches(request.headers.get("if-none-match", ""), etag,
+                                 lambda: render_store.store.get(map_file) is not None):
+        return Response(status_code=304, headers=headers)
+
+    image = render_store.store.get(map_file)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Map not found")
+    return Response(content=image, media_type=rendering.MIME_TYPES[output_format], headers=headers)
+
+@app.get("/api/progress")
+def get_progress(db: Session = Depends(get_db)):
+    # Served from the counters track_activity maintains - no scan of study_sessions
+    return progress.read(db)
+
+@app.get("/api/chat/history")
+def get_chat_history(limit: int = 50, before: Optional[datetime] = None, db: Session = Depends(get_db)):
+    messages = chat_history.page(db, limit, before)
+    return {
+        "messages": [
+            {"role": m.role, "content": m.content, "timestamp": m.timestamp}
+            for m in messages
+        ]
+    }
 
 @app.delete("/api/chat")
 def clear_chat_history(db: Session = Depends(get_db)):
@@ -157,11 +439,82 @@ def clear_chat_history(db: Session = Depends(get_db)):
 
 @app.delete("/api/progress")
 def reset_progress(db: Session = Depends(get_db)):
-    db.query(models.StudySession).delete()
+    activity_buffer.buffer.clear()
+    progress.reset(db)
     db.commit()
     return {"status": "reset"}
 
 @app.get("/api/analytics/dashboard")
-def get_analytics_dashboard(db: Session = Depends(get_db)):
-    chart_base64 = analytics.generate_study_chart(db)
-    return {"chart": chart_base64}
+async def get_analytics_dashboard(
+    output_format: Literal["png", "svg", "svgz"] = "png",
+    start: Optional[datetime] = None, # inclusive
+    end: Optional[datetime] = None, # exclusive
+    db: Session = Depends(get_db),
+):
+    # Aggregated in SQL: only one row per activity type reaches the renderer
+    summary = await run_in_threadpool(analytics.summarize_study_time, db, start, end)
+    try:
+        chart_base64 = await render_pool.pool.submit(analytics.render_study_chart, summary, output_format)
+    except render_pool.RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except render_pool.RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return {"chart": chart_base64, "format": output_format, "mime_type": rendering.MIME_TYPES[output_format]}
+
+@app.get("/api/analytics/rollup")
+def get_analytics_rollup(
+    bucket: Literal["hour", "day", "week", "month"] = "day",
+    start: Optional[datetime] = None, # inclusive
+    end: Optional[datetime] = None, # exclusive
+    activity_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    rows = analytics.study_time_rollup(db, bucket, start, end, activity_type)
+    return {"bucket": bucket, "rows": rows}
+
+@app.get("/api/admin/models")
+def get_model_catalog():
+    return model_catalog.catalog.snapshot()
+
+@app.post("/api/admin/models/refresh")
+def refresh_model_catalog():
+    started = model_catalog.catalog.refresh_async()
+    return {"status": "refreshing" if started else "already_refreshing"}
+
+@app.get("/api/admin/cache")
+def get_result_cache_stats():
+    return result_cache.cache.stats()
+
+@app.delete("/api/admin/cache")
+def clear_result_cache():
+    result_cache.cache.clear()
+    return {"status": "cleared"}
+
+@app.get("/api/admin/providers")
+def get_provider_latency():
+    return {"hedging": hedging.AI_HEDGING, "providers": hedging.latency.snapshot()}
+
+@app.get("/api/admin/circuits")
+def get_circuit_breakers():
+    return circuit_breaker.breakers.snapshot()
+
+@app.get("/api/admin/coalescing")
+def get_coalescing_stats():
+    return singleflight.group.stats()
+
+@app.get("/api/admin/render")
+def get_render_stats():
+    return {"pool": render_pool.pool.stats(), "store": render_store.store.stats()}
+
+@app.get("/api/admin/activity-buffer")
+def get_activity_buffer_stats():
+    return activity_buffer.buffer.stats()
+
+@app.get("/api/admin/question-bank")
+def get_question_bank_stats(db: Session = Depends(get_db)):
+    return question_bank.bank.stats(db)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(timing.render_metrics(), media_type="text/plain; version=0.0.4")
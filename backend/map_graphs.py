@@ -0,0 +1,129 @@
+import json
+from sqlalchemy.dialects.sqlite import insert
+from . import database, models, render_store, timing
+
+# Graphs stored before the map_graphs table existed sit in the render store as <map_id>.graph.json
+LEGACY_GRAPH_SUFFIX = "graph.json"
+
+
+def _dump_points(points):
+    return json.dumps({node: list(xy) for node, xy in points.items()}, ensure_ascii=False)
+
+
+def save(edge_data: dict, pos=None, slots=None, replace=True) -> str:
+    """
+    Stores a map's structure (and its layout, when known) under its content
+    digest, which doubles as the map id. With replace=False an already
+    stored map is kept as it is. Returns the map id.
+    """
+    map_id = render_store.map_digest(edge_data)
+    table = models.MapGraph.__table__
+    values = {
+        "structure": json.dumps(edge_data, ensure_ascii=False),
+        "pos": _dump_points(pos) if pos is not None else None,
+        "slots": _dump_points(slots) if slots is not None else None,
+    }
+    statement = insert(table).values(map_id=map_id, **values)
+    if replace:
+        statement = statement.on_conflict_do_update(index_elements=[table.c.map_id], set_=values)
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[table.c.map_id])
+    db = database.SessionLocal()
+    try:
+        db.execute(statement)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Map graph write error: {e}")
+    finally:
+        db.close()
+    return map_id
+
+
+def _stored(map_id: str) -> bool:
+    db = database.SessionLocal()
+    try:
+        return db.query(models.MapGraph.map_id).filter(models.MapGraph.map_id == map_id).first() is not None
+    finally:
+        db.close()
+
+
+def remember(edge_data: dict) -> str:
+    """
+    save() with its layout unless this structure is already stored, so the
+    first expansion of a map is laid out incrementally too.
+    """
+    map_id = render_store.map_digest(edge_data)
+    if not _stored(map_id):
+        from . import maps # pulls in networkx/matplotlib; kept off the app import path
+        try:
+            G, root, layout_type = maps.build_graph(edge_data)
+            with timing.span("layout"):
+                pos, slots = maps.layout_state(G, root, layout_type)
+        except Exception as e:
+            # expand() lays out a map stored without positions on first use
+            print(f"Map graph layout error: {e}")
+            pos = slots = None
+        save(edge_data, pos, slots, replace=False)
+    return map_id
+
+
+def _parse(structure, pos, slots):
+    graph = {"structure": structure, "pos": None, "slots": None}
+    if pos is not None:
+        graph["pos"] = {node: tuple(xy) for node, xy in pos.items()}
+        graph["slots"] = {node: tuple(slot) for node, slot in (slots or {}).items()}
+    return graph
+
+
+def load(map_id: str):
+    """Returns {"structure", "pos", "slots"} for a stored map, or None."""
+    db = database.SessionLocal()
+    try:
+        row = db.query(models.MapGraph).filter(models.MapGraph.map_id == map_id).first()
+    finally:
+        db.close()
+    if row is not None:
+        return _parse(
+            json.loads(row.structure),
+            json.loads(row.pos) if row.pos is not None else None,
+            json.loads(row.slots) if row.slots is not None else None,
+        )
+    data = render_store.store.get(f"{map_id}.{LEGACY_GRAPH_SUFFIX}")
+    if data is None:
+        return None
+    graph = json.loads(data)
+    return _parse(graph["structure"], graph.get("pos"), graph.get("slots"))
+
+
+def expand(graph: dict, node: str, children) -> dict:
+    """
+    Merges `children` under `node`, re-lays out only that node's subtree and
+    stores the result as a new map. Raises KeyError if `node` is not in the map.
+
+    Returns {"map_id", "structure", "added", "layout"} where "layout" is the
+    maps.layout_payload() of the expanded map.
+    """
+    from . import maps # pulls in networkx/matplotlib; kept off the app import path
+    structure, added = maps.merge_children(graph["structure"], node, children)
+    G, root, layout_type = maps.build_graph(structure)
+    if node not in G:
+        raise KeyError(node)
+
+    with timing.span("layout"):
+        pos, slots = graph.get("pos"), graph.get("slots")
+        if pos is None:
+            # First expansion of this map: lay it out once, later expansions reuse it
+            pos, slots = maps.layout_state(G, root, layout_type)
+        elif added:
+            pos, slots = maps.expand_layout(G, root, layout_type, pos, slots, node)
+        depths = maps.get_node_depths(G, root)
+        layout = maps.layout_payload(G, root, layout_type, pos, depths)
+
+    map_id = save(structure, pos, slots)
+    return {
+        "map_id": map_id,
+        "structure": structure,
+        "added": added,
+        "layout": layout,
+    }
@@ -1,44 +1,32 @@
 
+import os
 import networkx as nx
+import numpy as np
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import io
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.patches import FancyBboxPatch
 import base64
 import random
+import re
 import textwrap
+from functools import lru_cache
+from . import tree_layout, rendering
 
 def hierarchy_pos(G, root=None, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5):
     '''
     If the graph is a tree this will return the positions to plot this in a 
     hierarchical layout. If it contains cycles, it uses a BFS tree to force hierarchy.
+    Siblings get horizontal space in proportion to their subtree's leaf count.
     '''
     if root is None:
         # Find a node that is a likely root (zero in-degree) or just first node
         sources = [n for n in G.nodes if G.in_degree(n) == 0]
         root = sources[0] if sources else list(G.nodes)[0]
 
-    # FORCE HIERARCHY: Create a BFS tree for layout purposes to ignore back-edges/cycles
-    layout_G = nx.bfs_tree(G, root)
-
-    def _hierarchy_pos(G, root, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5, pos = None, parent = None):
-        if pos is None:
-            pos = {root:(xcenter,vert_loc)}
-        else:
-            pos[root] = (xcenter, vert_loc)
-        
-        children = list(G.neighbors(root))
-        if len(children)!=0:
-            dx = width/len(children) 
-            nextx = xcenter - width/2 - dx/2
-            for child in children:
-                nextx += dx
-                pos = _hierarchy_pos(G,child, width = dx, vert_gap = vert_gap, 
-                                    vert_loc = vert_loc-vert_gap, xcenter=nextx,
-                                    pos=pos, parent = root)
-        return pos
-
-    return _hierarchy_pos(layout_G, root, width, vert_gap, vert_loc, xcenter)
+    # FORCE HIERARCHY: lay out the BFS tree (iteratively - deep trees cannot hit the recursion limit)
+    return tree_layout.tree_layout(G, root, width, vert_gap, vert_loc, xcenter).positions()
 
 def get_node_depths(G, root):
     """Calculate depth of each node from root using BFS."""
@@ -50,173 +38,424 @@ def get_node_depths(G, root):
         pass
     return depths
 
-def generate_network_graph(edge_data):
-    try:
-        # 1. Create a Directed Graph
-        G = nx.DiGraph()
+# Fail-safe: Skip conceptual "trash" nodes
+TRASH_KEYWORDS = ["power", "jurisdiction", "role", "composition", "history", "summary", "function", "overview"]
+TRASH_PATTERN = re.compile("|".join(map(re.escape, TRASH_KEYWORDS)))
+
+# Define Palette (Red, Blue, Green, Orange, Purple) - matching the reference style
+DEPTH_COLORS = [
+    '#ef4444', # Red (Root)
+    '#3b82f6', # Blue (Level 1)
+    '#22c55e', # Green (Level 2)
+    '#f97316', # Orange (Level 3)
+    '#8b5cf6', # Purple (Level 4)
+    '#06b6d4', # Cyan
+]
+EDGE_COLOR = '#94a3b8' # Slate 400 (Gray)
+TEXT_COLOR = '#1e293b' # Slate 800 (Dark Text)
+TITLE_COLOR = '#064e3b'
+BACKGROUND_COLOR = '#f8fafc'
+
+MAX_LABEL_WIDTH = 18 # Compact labels
+BASE_FONT_SIZE = 10 # Smaller font for compact view
+TREE_WIDTH = 10.0
+TREE_VERT_GAP = 0.5 # Reduced vertical gap
+
+# Set with the MAP_DRAW_BACKEND env var; see rendering (it is part of stored render keys)
+MAP_DRAW_BACKEND = rendering.MAP_DRAW_BACKEND
+
+@lru_cache(maxsize=4096)
+def wrap_label(label: str) -> str:
+    return "\n".join(textwrap.wrap(label, width=MAX_LABEL_WIDTH))
 
-        # 2. Add edges from data (WITH TRASH FILTER)
-        root = edge_data.get("root")
-        edges = edge_data.get("edges", [])
+def build_graph(edge_data):
+    """Steps 1-2: builds the filtered DiGraph. Returns (G, root, layout_type)."""
+    # 1. Create a Directed Graph
+    G = nx.DiGraph()
+
+    # 2. Add edges from data (WITH TRASH FILTER)
+    root = edge_data.get("root")
+    edges = edge_data.get("edges", [])
+
+    if root:
+        G.add_node(root)
         
-        # Fail-safe: Skip conceptual "trash" nodes
-        TRASH_KEYWORDS = ["power", "jurisdiction", "role", "composition", "history", "summary", "function", "overview"]
+    for edge in edges:
+        source = edge.get("source", "")
+        target = edge.get("target", "")
+        relation = edge.get("relationship", "")
         
-        if root:
-            G.add_node(root)
-            
-        for edge in edges:
-            source = edge.get("source", "")
-            target = edge.get("target", "")
-            relation = edge.get("relationship", "")
-            
-            # ACTIVE TRASH FILTER: Skip edges leading to conceptual nodes
-            if any(kw in source.lower() for kw in TRASH_KEYWORDS) or \
-               any(kw in target.lower() for kw in TRASH_KEYWORDS):
-                continue
-                
-            # Add nodes if they don't exist
-            G.add_edge(source, target, label=relation)
-
-        if not G.nodes:
-            # Emergency recovery if everything was filtered out
-            G.add_node(root if root else "System")
+        # ACTIVE TRASH FILTER: Skip edges leading to conceptual nodes
+        if TRASH_PATTERN.search(source.lower()) or TRASH_PATTERN.search(target.lower()):
+            continue
             
-        # 3. Dynamic Canvas Sizing (FORCE PORTRAIT FOR TREES)
-        num_nodes = len(G.nodes)
-        if root and root in G:
-            depths = get_node_depths(G, root)
+        # Add nodes if they don't exist
+        G.add_edge(source, target, label=relation)
+
+    if not G.nodes:
+        # Emergency recovery if everything was filtered out
+        G.add_node(root if root else "System")
+
+    if not (root and root in G):
+        # Find a root if not provided
+        sources = [n for n in G.nodes if G.in_degree(n) == 0]
+        root = sources[0] if sources else list(G.nodes)[0]
+
+    return G, root, edge_data.get("layout", "tree")
+
+def compute_layout(G, root, layout_type):
+    """Steps 3-4: returns (pos, depths) for every node in G."""
+    depths = get_node_depths(G, root)
+
+    try:
+        if layout_type == "tree" and root and root in G:
+            # Tight Tree Layout
+            pos = hierarchy_pos(G, root, width=TREE_WIDTH, vert_gap=TREE_VERT_GAP)
+        elif layout_type == "cycle":
+            pos = nx.circular_layout(G)
+        elif layout_type == "star":
+            pos = nx.shell_layout(G, nlist=[[root], list(set(G.nodes) - {root})])
         else:
-            # Find a root if not provided
-            sources = [n for n in G.nodes if G.in_degree(n) == 0]
-            root = sources[0] if sources else list(G.nodes)[0]
-            depths = get_node_depths(G, root)
+            try:
+                pos = nx.nx_agraph.graphviz_layout(G, prog='dot') if hasattr(nx, 'nx_agraph') else nx.kamada_kawai_layout(G)
+            except:
+                pos = nx.spring_layout(G, k=1.4, iterations=50)
+    except Exception as e:
+        print(f"Layout Error: {e}")
+        pos = nx.spring_layout(G)
 
-        # Dynamic Canvas Sizing - Balanced for hierarchy
-        max_depth = max(depths.values()) if depths else 0
-        
-        # COMPACT FORMAT (User Requested - "No Scrolling")
-        plt.figure(figsize=(13, 9), facecolor='#f8fafc')
-        
-        # 4. Determine Layout
-        layout_type = edge_data.get("layout", "tree")
+    _place_unreached(G, pos)
+    return pos, depths
+
+def _place_unreached(G, pos):
+    # SAFETY CHECK: Ensure ALL nodes have a position (Handles disconnected components)
+    missing_nodes = [node for node in G.nodes if node not in pos]
+    if missing_nodes:
+        print(f"Warning: Layout missed {len(missing_nodes)} nodes (disconnected components). Patching positions.")
+        # Place missing nodes in a separate cluster using spring layout
+        # We offset them slightly to avoid overlap with the main tree
+        subgraph = G.subgraph(missing_nodes)
+        fallback_pos = nx.spring_layout(subgraph, center=(TREE_WIDTH / 2, -1))
+        pos.update(fallback_pos)
+
+def layout_state(G, root, layout_type):
+    """
+    compute_layout() positions plus, for tree layouts, each node's horizontal
+    slot {node: (x0, width)} so that later expansions can be laid out in place.
+    """
+    if layout_type == "tree" and root in G:
+        layout = tree_layout.tree_layout(G, root, width=TREE_WIDTH, vert_gap=TREE_VERT_GAP)
+        pos, slots = layout.positions(), layout.slots()
+        _place_unreached(G, pos)
+        return pos, slots
+    pos, _ = compute_layout(G, root, layout_type)
+    return pos, {}
+
+def expand_layout(G, root, layout_type, pos, slots, node):
+    """
+    Re-lays out only the subtree under `node` inside the slot it already
+    owns, after children were added to it; every other node keeps its
+    position. Returns updated (pos, slots). Falls back to layout_state()
+    when there is no slot to work in (non-tree layouts, unreached nodes).
+    """
+    if layout_type != "tree" or node not in slots or root not in G:
+        return layout_state(G, root, layout_type)
+
+    nodes, _, children = tree_layout.bfs_children(G, root)
+    sub_nodes, sub_parent = tree_layout.subtree(nodes, children, nodes.index(node))
+    x0, width = slots[node]
+    layout = tree_layout.layout_from_parents(
+        sub_nodes, sub_parent, width=width, vert_gap=TREE_VERT_GAP,
+        vert_loc=pos[node][1], xcenter=x0 + width / 2,
+    )
+    pos = {**pos, **layout.positions()}
+    slots = {**slots, **layout.slots()}
+    _place_unreached(G, pos)
+    return pos, slots
+
+def merge_children(edge_data, node, children, limit=8):
+    """
+    Adds `children` ([{"target", "relationship"}]) under `node`. Skips
+    trash-filtered labels and labels already in the map (so an expansion
+    never creates a cycle). Returns (new edge_data, added labels).
+    """
+    existing = {edge_data.get("root")}
+    for edge in edge_data.get("edges", []):
+        existing.update((edge.get("source"), edge.get("target")))
+
+    added = []
+    edges = list(edge_data.get("edges", []))
+    for child in children:
+        target = " ".join(str(child.get("target", "")).split())
+        if not target or target in existing or TRASH_PATTERN.search(target.lower()):
+            continue
+        existing.add(target)
+        added.append(target)
+        edges.append({"source": node, "target": target, "relationship": str(child.get("relationship", ""))})
+        if len(added) >= limit:
+            break
+    return {**edge_data, "edges": edges}, added
+
+def edge_polylines(G, pos, orthogonal=True):
+    """
+    Returns an (E, k, 2) array of edge polylines. Orthogonal edges run down from
+    the parent, across at the midpoint, then down into the child (k=4);
+    otherwise edges are straight segments (k=2).
+    """
+    if G.number_of_edges() == 0:
+        return np.zeros((0, 4 if orthogonal else 2, 2))
+    ends = np.array([(pos[u], pos[v]) for u, v in G.edges], dtype=float)
+    start, end = ends[:, 0], ends[:, 1]
+    if not orthogonal:
+        return ends
+    mid_y = (start[:, 1] + end[:, 1]) / 2
+    return np.stack([
+        start,
+        np.column_stack([start[:, 0], mid_y]),
+        np.column_stack([end[:, 0], mid_y]),
+        end,
+    ], axis=1)
+
+def _draw_legacy(G, pos, depths, wrapped_labels):
+    """One artist per edge and per node label (the original drawing path)."""
+    nodelist = list(G.nodes)
+
+    # Draw Edges (Orthogonal / Angular Lines)
+    try:
+        # connectionstyle='angle,angleA=0,angleB=-90' creates vertical-then-horizontal lines suitable for top-down trees
+        nx.draw_networkx_edges(G, pos, 
+                             edge_color=EDGE_COLOR,
+                             arrows=False, 
+                             width=1.5, 
+                             alpha=0.8, 
+                             node_size=0, # Important so lines reach the text center roughly
+                             connectionstyle="angle,angleA=-90,angleB=0,rad=5")
+    except Exception as e:
+        print(f"Edge drawing failed: {e}. Falling back.")
+        nx.draw_networkx_edges(G, pos, edge_color=EDGE_COLOR, arrows=False)
+
+    # Draw Nodes (Invisible - we use Label BBox as the visual node)
+    nx.draw_networkx_nodes(G, pos, 
+                          nodelist=nodelist,
+                          node_size=0, # INVISIBLE NODES
+                          alpha=0.0)
+    
+    # Draw Node Labels (The actual "Boxes")
+    for i, node in enumerate(G.nodes):
+        x, y = pos[node]
+        d = depths.get(node, 0)
         
-        try:
-            if layout_type == "tree" and root and root in G:
-                # Tight Tree Layout
-                tree_width = 10.0 
-                pos = hierarchy_pos(G, root, width=tree_width, vert_gap=0.5) # Reduced vertical gap
-            elif layout_type == "cycle":
-                pos = nx.circular_layout(G)
-            elif layout_type == "star":
-                pos = nx.shell_layout(G, nlist=[[root], list(set(G.nodes) - {root})])
-            else:
-                try:
-                    pos = nx.nx_agraph.graphviz_layout(G, prog='dot') if hasattr(nx, 'nx_agraph') else nx.kamada_kawai_layout(G)
-                except:
-                    pos = nx.spring_layout(G, k=1.4, iterations=50)
-        except Exception as e:
-            print(f"Layout Error: {e}")
-            pos = nx.spring_layout(G)
-
-        # SAFETY CHECK: Ensure ALL nodes have a position (Handles disconnected components)
-        missing_nodes = [node for node in G.nodes if node not in pos]
-        if missing_nodes:
-            print(f"Warning: Layout missed {len(missing_nodes)} nodes (disconnected components). Patching positions.")
-            # Place missing nodes in a separate cluster using spring layout
-            # We offset them slightly to avoid overlap with the main tree
-            subgraph = G.subgraph(missing_nodes)
-            fallback_pos = nx.spring_layout(subgraph, center=(width/2, -1)) 
-            pos.update(fallback_pos)
-
-        # 5. Styling & Drawing (Professional Org-Chart Theme)
-        max_label_width = 18 # Compact labels
-        base_font_size = 10 # Smaller font for compact view
- 
+        # Cycle through colors based on depth
+        color = DEPTH_COLORS[d % len(DEPTH_COLORS)]
         
-        nodelist = list(G.nodes)
-        wrapped_labels = {node: "\n".join(textwrap.wrap(str(node), width=max_label_width)) for node in nodelist}
+        # Root is slightly larger/bolder
+        fontsize = BASE_FONT_SIZE + 2 if d == 0 else BASE_FONT_SIZE
+        fontweight = 'bold' if d == 0 else 'semibold'
         
-        # Define Palette (Red, Blue, Green, Orange, Purple) - matching the reference style
-        depth_colors = [
-        '#ef4444', # Red (Root)
-        '#3b82f6', # Blue (Level 1)
-        '#22c55e', # Green (Level 2)
-        '#f97316', # Orange (Level 3)
-        '#8b5cf6', # Purple (Level 4)
-        '#06b6d4', # Cyan
+        plt.text(x, y, wrapped_labels[node],
+                 fontsize=fontsize,
+                 fontweight=fontweight,
+                 color=TEXT_COLOR,
+                 ha='center', va='center',
+                 bbox=dict(
+                     facecolor='white', 
+                     edgecolor=color, # Depth-based border color
+                     boxstyle='round,pad=0.5', 
+                     alpha=1.0, 
+                     linewidth=2.0 
+                 ))
+
+def _label_extent_points(label, fontsize, bold=False):
+    """Approximate (width, height) in points of a wrapped label plus its box padding."""
+    lines = label.split("\n")
+    width = max(len(line) for line in lines) * fontsize * (0.66 if bold else 0.6)
+    height = len(lines) * fontsize * 1.2
+    return width + fontsize, height + fontsize # pad=0.5 (in font-size units) on each side
+
+def _draw_batched(ax, G, pos, depths, wrapped_labels, orthogonal):
+    """All edges in one LineCollection and all node boxes in one PatchCollection."""
+    nodelist = list(G.nodes)
+    xy = np.array([pos[node] for node in nodelist], dtype=float)
+    depth = np.array([depths.get(node, 0) for node in nodelist])
+    edge_colors = np.array(DEPTH_COLORS)[depth % len(DEPTH_COLORS)]
+    fontsizes = np.where(depth == 0, BASE_FONT_SIZE + 2, BASE_FONT_SIZE)
+
+    # Box sizes in points, then in data units once the axes scale is fixed
+    extents = np.array([
+        _label_extent_points(wrapped_labels[n], f, bold=(d == 0))
+        for n, f, d in zip(nodelist, fontsizes, depth)
+    ])
+    half = extents / 2 * ax.figure.dpi / 72 # pixels
+
+    # Fit the limits to the nodes plus their boxes (two passes: the scale depends on the limits)
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    span = np.maximum(hi - lo, 1e-6)
+    for _ in range(2):
+        ax.set_xlim(lo[0] - span[0] * 0.05, hi[0] + span[0] * 0.05)
+        ax.set_ylim(lo[1] - span[1] * 0.05, hi[1] + span[1] * 0.05)
+        data_per_px = np.array([np.ptp(ax.get_xlim()) / ax.bbox.width, np.ptp(ax.get_ylim()) / ax.bbox.height])
+        half_data = half * data_per_px
+        lo = (xy - half_data).min(axis=0)
+        hi = (xy + half_data).max(axis=0)
+        span = np.maximum(hi - lo, 1e-6)
+
+    ax.add_collection(LineCollection(
+        edge_polylines(G, pos, orthogonal),
+        colors=EDGE_COLOR, linewidths=1.5, alpha=0.8, zorder=1,
+    ))
+
+    boxes = [
+        FancyBboxPatch((x - w, y - h), 2 * w, 2 * h,
+                       boxstyle=f"round,pad=0,rounding_size={min(w, h) * 0.4}",
+                       mutation_aspect=data_per_px[1] / data_per_px[0])
+        for (x, y), (w, h) in zip(xy, half_data)
     ]
+    ax.add_collection(PatchCollection(
+        boxes, facecolors='white', edgecolors=edge_colors, linewidths=2.0, zorder=2,
+    ))
 
-        # Draw Edges (Orthogonal / Angular Lines)
-        try:
-            # connectionstyle='angle,angleA=0,angleB=-90' creates vertical-then-horizontal lines suitable for top-down trees
-            nx.draw_networkx_edges(G, pos, 
-                                 edge_color='#94a3b8', # Slate 400 (Gray)
-                                 arrows=False, 
-                                 width=1.5, 
-                                 alpha=0.8, 
-                                 node_size=0, # Important so lines reach the text center roughly
-                                 connectionstyle="angle,angleA=-90,angleB=0,rad=5")
-        except Exception as e:
-            print(f"Edge drawing failed: {e}. Falling back.")
-            nx.draw_networkx_edges(G, pos, edge_color='#94a3b8', arrows=False)
-
-        # Draw Nodes (Invisible - we use Label BBox as the visual node)
-        nx.draw_networkx_nodes(G, pos, 
-                              nodelist=nodelist,
-                              node_size=0, # INVISIBLE NODES
-                              alpha=0.0)
-        
-        # Draw Node Labels (The actual "Boxes")
-        for i, node in enumerate(G.nodes):
-            x, y = pos[node]
-            d = depths.get(node, 0)
-            
-            # Cycle through colors based on depth
-            color = depth_colors[d % len(depth_colors)]
-            
-            # Root is slightly larger/bolder
-            fontsize = base_font_size + 2 if d == 0 else base_font_size
-            fontweight = 'bold' if d == 0 else 'semibold'
-            
-            plt.text(x, y, wrapped_labels[node],
-                     fontsize=fontsize,
-                     fontweight=fontweight,
-                     color='#1e293b', # Slate 800 (Dark Text)
-                     ha='center', va='center',
-                     bbox=dict(
-                         facecolor='white', 
-                         edgecolor=color, # Depth-based border color
-                         boxstyle='round,pad=0.5', 
-                         alpha=1.0, 
-                         linewidth=2.0 
-                     ))
-
-        title_color = '#064e3b'
-        # Use 'Organizational Chart' for tree-based hierarchies
-        suffix = "Organizational Chart" if layout_type == "tree" else "Concept Map"
-        plt.title(f"{root if root else 'System'} {suffix}", fontsize=20, fontweight='bold', pad=30, color=title_color)
+    for node, (x, y), d, fontsize in zip(nodelist, xy, depth, fontsizes):
+        ax.text(x, y, wrapped_labels[node],
+                fontsize=fontsize,
+                fontweight='bold' if d == 0 else 'semibold',
+                color=TEXT_COLOR,
+                ha='center', va='center', zorder=3)
+
+def map_title(root, layout_type):
+    # Use 'Organizational Chart' for tree-based hierarchies
+    suffix = "Organizational Chart" if layout_type == "tree" else "Concept Map"
+    return f"{root if root else 'System'} {suffix}"
+
+def render_network_graph(edge_data, output_format="png", backend=None) -> bytes:
+    """Renders the concept map as png, svg or svgz bytes. Raises on failure."""
+    G, root, layout_type = build_graph(edge_data)
+    pos, depths = compute_layout(G, root, layout_type)
+
+    # 5. Styling & Drawing (Professional Org-Chart Theme)
+    # Wrapping is cached per unique label
+    wrapped_labels = {node: wrap_label(str(node)) for node in G.nodes}
+    title = map_title(root, layout_type)
+
+    if (backend or MAP_DRAW_BACKEND) == "legacy":
+        # COMPACT FORMAT (User Requested - "No Scrolling")
+        fig = plt.figure(figsize=(13, 9), facecolor=BACKGROUND_COLOR)
+        _draw_legacy(G, pos, depths, wrapped_labels)
+        plt.title(title, fontsize=20, fontweight='bold', pad=30, color=TITLE_COLOR)
         plt.axis('off')
         plt.tight_layout()
 
         # 6. Save and Convert
-        buffer = io.BytesIO()
         # Save with light gray background to make emerald pop
-        plt.savefig(buffer, format='png', bbox_inches='tight', transparent=False, facecolor='#f8fafc', dpi=130)
-        buffer.seek(0)
-        plt.close()
+        data = rendering.save_figure(fig, output_format, dpi=130, bbox_inches='tight', transparent=False, facecolor=BACKGROUND_COLOR)
+        plt.close(fig)
+        return data
+
+    # COMPACT FORMAT (User Requested - "No Scrolling") on the worker's reusable Agg figure
+    fig = rendering.reusable_figure("concept_map", figsize=(13, 9), facecolor=BACKGROUND_COLOR)
+    ax = fig.add_axes([0.02, 0.02, 0.96, 0.88])
+    _draw_batched(ax, G, pos, depths, wrapped_labels, orthogonal=(layout_type == "tree"))
+    ax.set_title(title, fontsize=20, fontweight='bold', pad=30, color=TITLE_COLOR)
+    ax.axis('off')
+
+    # 6. Save and Convert
+    # The limits already fit the boxes, so skip bbox_inches='tight' (it costs an extra full draw)
+    return rendering.save_figure(fig, output_format, dpi=130, transparent=False, facecolor=BACKGROUND_COLOR)
+
+# Client-side canvas in points: the batched figure's axes area (13x9 in at 72 pt/in)
+LAYOUT_CANVAS = (round(13 * 72 * 0.96), round(9 * 72 * 0.88))
+LAYOUT_MARGIN = 12
+
+def layout_network_graph(edge_data) -> dict:
+    """
+    Steps 1-4 without drawing: the filtered, laid-out map as compact JSON for
+    the browser to draw. Coordinates are in points on a LAYOUT_CANVAS-sized
+    canvas with y pointing down (SVG convention); w/h are the label box sizes
+    and edge points are the polylines the server would draw. Raises on failure.
+    """
+    G, root, layout_type = build_graph(edge_data)
+    pos, depths = compute_layout(G, root, layout_type)
+    return layout_payload(G, root, layout_type, pos, depths)
 
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+def layout_payload(G, root, layout_type, pos, depths) -> dict:
+    """Serializes an already laid-out graph for layout_network_graph()."""
+    nodelist = list(G.nodes)
+    index = {node: i for i, node in enumerate(nodelist)}
+    xy = np.array([pos[node] for node in nodelist], dtype=float)
+    depth = np.array([depths.get(node, 0) for node in nodelist])
+    fontsizes = np.where(depth == 0, BASE_FONT_SIZE + 2, BASE_FONT_SIZE)
+    wrapped_labels = [wrap_label(str(node)) for node in nodelist]
+    extents = np.array([
+        _label_extent_points(label, f, bold=(d == 0))
+        for label, f, d in zip(wrapped_labels, fontsizes, depth)
+    ])
 
+    # Fit the node centres into the canvas, leaving room for the widest/tallest box
+    canvas = np.array(LAYOUT_CANVAS, dtype=float)
+    inset = LAYOUT_MARGIN + extents.max(axis=0) / 2
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    flat = hi - lo <= 1e-9 # single node, or all nodes on one row/column: centre that axis
+    span = np.where(flat, 1.0, hi - lo)
+    scaled = inset + (xy - lo) / span * (canvas - 2 * inset)
+    scaled[:, flat] = canvas[flat] / 2
+    scaled[:, 1] = canvas[1] - scaled[:, 1] # flip y: matplotlib is y-up, SVG is y-down
+    canvas_pos = {node: tuple(p) for node, p in zip(nodelist, scaled)}
+
+    polylines = np.round(edge_polylines(G, canvas_pos, orthogonal=(layout_type == "tree")), 1)
+    return {
+        "title": map_title(root, layout_type),
+        "layout": layout_type,
+        "width": int(canvas[0]),
+        "height": int(canvas[1]),
+        "style": {
+            "background": BACKGROUND_COLOR,
+            "edge": EDGE_COLOR,
+            "text": TEXT_COLOR,
+            "title": TITLE_COLOR,
+            "font_size": BASE_FONT_SIZE,
+        },
+        "nodes": [
+            {
+                "id": i,
+                "label": str(node),
+                "lines": wrapped_labels[i].split("\n"),
+                "depth": int(depth[i]),
+                "color": DEPTH_COLORS[depth[i] % len(DEPTH_COLORS)],
+                "x": round(float(scaled[i, 0]), 1),
+                "y": round(float(scaled[i, 1]), 1),
+                "w": round(float(extents[i, 0]), 1),
+                "h": round(float(extents[i, 1]), 1),
+            }
+            for i, node in enumerate(nodelist)
+        ],
+        "edges": [
+            {
+                "source": index[u],
+                "target": index[v],
+                "label": data.get("label", ""),
+                "points": points.tolist(),
+            }
+            for (u, v, data), points in zip(G.edges(data=True), polylines)
+        ],
+    }
+
+def render_network_graph_png(edge_data, backend=None) -> bytes:
+    return render_network_graph(edge_data, "png", backend)
+
+def render_error_image(error, output_format="png") -> bytes:
+    # Fallback Image Generation
+    fig = rendering.reusable_figure("map_error", figsize=(16, 12)) # Reduced size based on feedback
+    fig.text(0.5, 0.5, f"Map Generation Failed:\n{str(error)[:100]}", 
+             ha='center', va='center', fontsize=14, color='red')
+    return rendering.save_figure(fig, output_format)
+
+def render_error_png(error) -> bytes:
+    return render_error_image(error, "png")
+
+def generate_network_graph(edge_data, output_format="png"):
+    try:
+        data = render_network_graph(edge_data, output_format)
     except Exception as e:
         print(f"CRITICAL MAP GENERATION ERROR: {e}")
-        # Fallback Image Generation
-        plt.figure(figsize=(16, 12)) # Reduced size based on feedback
-        plt.text(0.5, 0.5, f"Map Generation Failed:\n{str(e)[:100]}", 
-                 ha='center', va='center', fontsize=14, color='red')
-        plt.axis('off')
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        plt.close()
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        plt.close('all') # Drop the half-drawn figure
+        data = render_error_image(e, output_format)
+    return base64.b64encode(data).decode('utf-8')
@@ -0,0 +1,42 @@
+"""
+Tables that existed before versioned migrations; created only where missing.
+
+The DDL is frozen as the models defined it at the time, so this version
+means the same schema however the models change later (later changes get
+their own migration).
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE TABLE IF NOT EXISTS chat_history ("
+    "id INTEGER NOT NULL, role VARCHAR, content TEXT, "
+    "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS ix_chat_history_id ON chat_history (id)",
+
+    "CREATE TABLE IF NOT EXISTS quizzes ("
+    "id INTEGER NOT NULL, topic VARCHAR, questions TEXT, score INTEGER, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS ix_quizzes_id ON quizzes (id)",
+
+    "CREATE TABLE IF NOT EXISTS study_sessions ("
+    "id INTEGER NOT NULL, activity_type VARCHAR, duration_seconds INTEGER, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS ix_study_sessions_id ON study_sessions (id)",
+
+    "CREATE TABLE IF NOT EXISTS generated_results ("
+    "id INTEGER NOT NULL, cache_key VARCHAR, generator VARCHAR, topic VARCHAR, payload TEXT, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS ix_generated_results_id ON generated_results (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_generated_results_cache_key ON generated_results (cache_key)",
+
+    "CREATE TABLE IF NOT EXISTS progress_counters ("
+    "activity_type VARCHAR NOT NULL, sessions INTEGER, total_seconds INTEGER, PRIMARY KEY (activity_type))",
+
+    "CREATE TABLE IF NOT EXISTS study_streak ("
+    "id INTEGER NOT NULL, last_study_day DATE, current_days INTEGER, longest_days INTEGER, PRIMARY KEY (id))",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
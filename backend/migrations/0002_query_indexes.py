@@ -0,0 +1,25 @@
+"""
+Composite indexes for the progress, analytics and chat-history queries.
+
+- study_sessions (activity_type, created_at, duration_seconds): per-activity
+  totals and date-range filters are answered from the index alone.
+- study_sessions (created_at): date-range rollups across all activities.
+- chat_history (timestamp): newest-first history pages (the rowid, i.e. id,
+  is the implicit last column, so ORDER BY timestamp, id needs no sort).
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_study_sessions_activity_created "
+    "ON study_sessions (activity_type, created_at, duration_seconds)",
+    "CREATE INDEX IF NOT EXISTS ix_study_sessions_created ON study_sessions (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_history_timestamp ON chat_history (timestamp)",
+    # Give the planner row counts for the new indexes
+    "ANALYZE study_sessions",
+    "ANALYZE chat_history",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
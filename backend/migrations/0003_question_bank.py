@@ -0,0 +1,26 @@
+"""
+Question bank: one normalized row per generated quiz question.
+
+- quiz_questions (topic, question_hash) UNIQUE: de-duplicates questions per
+  topic and serves the pool count and random draw for a topic.
+
+Quizzes already in the result cache are copied in by the app at startup
+(question_bank.backfill_if_needed), not here, so this script stays
+independent of application code.
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE TABLE IF NOT EXISTS quiz_questions ("
+    "id INTEGER NOT NULL, quiz_id INTEGER, topic VARCHAR NOT NULL, question_hash VARCHAR NOT NULL, "
+    "question TEXT, options TEXT, answer TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, "
+    "PRIMARY KEY (id), FOREIGN KEY(quiz_id) REFERENCES quizzes (id))",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_quiz_questions_topic_hash ON quiz_questions (topic, question_hash)",
+    # Give the planner row counts for the new index
+    "ANALYZE quiz_questions",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
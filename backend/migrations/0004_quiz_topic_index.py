@@ -0,0 +1,16 @@
+"""
+quizzes (topic): the question bank counts the LLM quizzes recorded per topic
+to decide when a topic's pool is served as it is.
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_quizzes_topic ON quizzes (topic)",
+    # Give the planner row counts for the new index
+    "ANALYZE quizzes",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
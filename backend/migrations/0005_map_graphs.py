@@ -0,0 +1,19 @@
+"""
+map_graphs: concept maps kept for /api/maps/<id>/expand, by map id.
+
+They used to be files in the render store's directory, where its size and
+age caps could delete a map still on a user's screen. Graphs already there
+are still read from it (map_graphs.load), not copied here.
+"""
+from sqlalchemy import text
+
+STATEMENTS = [
+    "CREATE TABLE IF NOT EXISTS map_graphs ("
+    "map_id VARCHAR NOT NULL, structure TEXT, pos TEXT, slots TEXT, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (map_id))",
+]
+
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
@@ -0,0 +1,88 @@
+"""
+Versioned schema migrations.
+
+Every module in this package named NNNN_<description>.py defines
+`upgrade(conn)`. upgrade() applies the ones newer than the version recorded
+in the schema_version table, in order, each in its own transaction together
+with its version row, so a failed script leaves the database at the last
+good version. Each of those transactions takes the write lock first and
+re-reads the version, so workers starting together apply every script once.
+"""
+import contextlib
+import importlib
+import pkgutil
+import re
+from sqlalchemy import text
+
+VERSION_TABLE = "schema_version"
+_SCRIPT_NAME = re.compile(r"^(\d{4})_(\w+)$")
+
+
+def discover():
+    """Returns [(version, name, module)] for every migration script, oldest first."""
+    scripts = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _SCRIPT_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            scripts.append((int(match.group(1)), match.group(2), module))
+    scripts.sort(key=lambda script: script[0])
+    versions = [version for version, _, _ in scripts]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return scripts
+
+
+def current_version(conn) -> int:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+        "applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return conn.execute(text(f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}")).scalar()
+
+
+@contextlib.contextmanager
+def write_transaction(engine):
+    """
+    A transaction that holds the database write lock from its first statement
+    (BEGIN IMMEDIATE on SQLite), so nothing read inside it can change before
+    it commits. Other databases use a plain transaction.
+    """
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            yield conn
+        return
+    with engine.connect() as conn:
+        # Keep pysqlite from issuing its own deferred BEGIN
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+
+
+def upgrade(engine, target=None):
+    """Applies pending migrations up to `target` (default: latest). Returns the versions applied."""
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for script_version, name, module in discover():
+        if script_version <= version or (target is not None and script_version > target):
+            continue
+        with write_transaction(engine) as conn:
+            # Another worker may have applied it while this one waited for the lock
+            if script_version <= current_version(conn):
+                continue
+            module.upgrade(conn)
+            conn.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, name) VALUES (:version, :name)"),
+                {"version": script_version, "name": name},
+            )
+        print(f"Applied migration {script_version:04d}_{name}")
+        applied.append(script_version)
+    return applied
@@ -0,0 +1,38 @@
+"""
+Applies pending migrations, optionally verifying that the indexed queries use
+their indexes.
+
+Run from the repository root:
+    python -m backend.migrations [--check] [--database sqlite:///./study_buddy.db]
+"""
+import argparse
+import sys
+from sqlalchemy import create_engine
+from .. import database
+from . import upgrade, current_version
+from .plans import check_query_plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=database.SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--check", action="store_true", help="EXPLAIN the indexed queries and fail if one scans")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database)
+    upgrade(engine)
+    with engine.begin() as conn:
+        print(f"Schema version: {current_version(conn)}")
+
+    if args.check:
+        failed = 0
+        for description, indexes, ok, plan in check_query_plans(engine):
+            failed += not ok
+            print(f"[{'ok' if ok else 'FAIL'}] {description} (expects {' or '.join(indexes)})")
+            for line in plan:
+                print(f"       {line}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
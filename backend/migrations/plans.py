@@ -0,0 +1,88 @@
+"""
+Query-plan checks: runs the app's own analytics, chat-history and question-bank
+queries against a migrated database, captures the SQL they emit, and asks SQLite
+(EXPLAIN QUERY PLAN) whether each one is served by the expected index.
+"""
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from .. import analytics, chat_history, question_bank
+
+ACTIVITY_CREATED = "ix_study_sessions_activity_created"
+CREATED = "ix_study_sessions_created"
+CHAT_TIMESTAMP = "ix_chat_history_timestamp"
+QUESTION_TOPIC = "ux_quiz_questions_topic_hash"
+QUIZ_TOPIC = "ix_quizzes_topic"
+
+# (description, query runner, indexes any of which may serve each of its SELECTs)
+CHECKS = [
+    ("dashboard summary, all time",
+     lambda db: analytics.summarize_study_time(db),
+     (ACTIVITY_CREATED,)),
+    ("dashboard summary, date range",
+     lambda db: analytics.summarize_study_time(db, datetime(2026, 1, 1), datetime(2026, 2, 1)),
+     (ACTIVITY_CREATED, CREATED)),
+    ("rollup by day, one activity",
+     lambda db: analytics.study_time_rollup(db, "day", datetime(2026, 1, 1), None, "quiz"),
+     (ACTIVITY_CREATED,)),
+    ("rollup by month, date range",
+     lambda db: analytics.study_time_rollup(db, "month", datetime(2026, 1, 1), datetime(2026, 1, 8)),
+     (CREATED, ACTIVITY_CREATED)),
+    ("chat history page",
+     lambda db: chat_history.page(db, 50, datetime(2026, 1, 1)),
+     (CHAT_TIMESTAMP,)),
+    ("quiz question pool and draw",
+     lambda db: (question_bank.pool_size(db, "photosynthesis"), question_bank.sample(db, "photosynthesis")),
+     (QUESTION_TOPIC,)),
+    ("quiz generations for a topic",
+     lambda db: question_bank.generations(db, "photosynthesis"),
+     (QUIZ_TOPIC,)),
+]
+
+TABLES = ("study_sessions", "chat_history", "quiz_questions", "quizzes")
+
+
+def capture_selects(engine, run):
+    """Runs run(db) and returns the (sql, params) of every SELECT it executed."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    db = sessionmaker(bind=engine)()
+    try:
+        run(db)
+    finally:
+        db.rollback()
+        db.close()
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            return [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        finally:
+            cursor.close()
+
+
+def uses_index(plan, indexes) -> bool:
+    """True if every step that reads an indexed table goes through one of `indexes`."""
+    reads = [line for line in plan if line.split(" ")[0] in ("SCAN", "SEARCH") and line.split(" ")[1] in TABLES]
+    return bool(reads) and all(any(index in line for index in indexes) for line in reads)
+
+
+def check_query_plans(engine):
+    """Returns [(description, indexes, ok, plan lines)] for every entry in CHECKS."""
+    results = []
+    for description, run, indexes in CHECKS:
+        plan = []
+        for statement, parameters in capture_selects(engine, run):
+            if any(table in statement for table in TABLES):
+                plan.extend(explain(engine, statement, parameters))
+        results.append((description, indexes, uses_index(plan, indexes), plan))
+    return results
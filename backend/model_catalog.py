@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from . import providers
+
+load_dotenv()
+
+# How long a fetched model list is considered fresh, and how often the
+# background refresher re-lists models from Gemini.
+MODEL_CATALOG_TTL = float(os.getenv("MODEL_CATALOG_TTL", "900"))
+MODEL_CATALOG_REFRESH_INTERVAL = float(os.getenv("MODEL_CATALOG_REFRESH_INTERVAL", "600"))
+# After a failed listing, get() waits this long before trying again, doubling
+# per consecutive failure up to the max, so an outage costs one call per window
+MODEL_CATALOG_RETRY_AFTER = float(os.getenv("MODEL_CATALOG_RETRY_AFTER", "30"))
+MODEL_CATALOG_RETRY_MAX = float(os.getenv("MODEL_CATALOG_RETRY_MAX", "600"))
+
+# Used until the first listing completes (or if it never succeeds)
+FALLBACK_MODELS = ['models/gemini-1.5-flash']
+
+# Define preference order
+MODEL_PREFERENCE = [
+    'gemini-2.0-flash',
+    'gemini-1.5-pro',
+    'gemini-1.5-flash',
+    'gemini-pro',
+    'gemini-1.0-pro'
+]
+
+
+def prioritize_models(model_names):
+    """
+    Returns a prioritized list of GEMINI models (excludes Gemma which doesn't support JSON mode).
+    """
+    # CRITICAL: Filter out Gemma models - they don't support JSON mode
+    all_models = [m for m in model_names if 'gemini' in m.lower() and 'gemma' not in m.lower()]
+
+    prioritized_models = []
+
+    # 1. Add preferred models in order if they exist
+    for p in MODEL_PREFERENCE:
+        for m in all_models:
+            if p in m and m not in prioritized_models:
+                prioritized_models.append(m)
+
+    # 2. Add any remaining models that weren't in our preference list
+    for m in all_models:
+        if m not in prioritized_models:
+            prioritized_models.append(m)
+
+    return prioritized_models
+
+
+def fetch_gemini_models():
+    """Lists every model that supports content generation (one network round trip)."""
+    return providers.list_gemini_models()
+
+
+class ModelCatalog:
+    """
+    Caches the prioritized Gemini model list with stale-while-revalidate semantics.
+
+    get() never blocks on the network: a stale list is served while a refresh
+    runs in a background thread, and the fallback list is served until the
+    first listing has completed. After a failed listing, get() backs off
+    (retry_after, doubling up to retry_max) before refreshing again.
+    """
+
+    def __init__(self, fetcher=fetch_gemini_models, ttl=MODEL_CATALOG_TTL,
+                 retry_after=MODEL_CATALOG_RETRY_AFTER, retry_max=MODEL_CATALOG_RETRY_MAX):
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.retry_max = retry_max
+        self._lock = threading.Lock()
+        self._models = []
+        self._fetched_at = None
+        self._refreshing = False
+        self._last_error = None
+        self._failures = 0 # consecutive failed listings
+        self._retry_at = 0.0 # monotonic time before which get() does not refresh
+        self._refresh_count = 0
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def age(self):
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def get(self):
+        with self._lock:
+            models = list(self._models)
+            age = self.age()
+            backing_off = time.monotonic() < self._retry_at
+
+        if (age is None or age > self.ttl) and not backing_off:
+            self.refresh_async()
+
+        return models or list(FALLBACK_MODELS)
+
+    def refresh(self):
+        """Fetches the model list synchronously and swaps it in."""
+        try:
+            models = prioritize_models(self._fetcher())
+            with self._lock:
+                self._models = models
+                self._fetched_at = time.monotonic()
+                self._last_error = None
+                self._failures = 0
+                self._retry_at = 0.0
+                self._refresh_count += 1
+            print(f"DEBUG: Prioritized Model List: {models}")
+            return models
+        except Exception as e:
+            print(f"Error listing models: {e}")
+            with self._lock:
+                self._last_error = str(e)
+                self._failures += 1
+                delay = min(self.retry_max, self.retry_after * 2 ** (self._failures - 1))
+                self._retry_at = time.monotonic() + delay
+            return None
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh_async(self):
+        """Starts a background refresh unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="model-catalog-refresh", daemon=True).start()
+        return True
+
+    def start_background_refresh(self, interval=MODEL_CATALOG_REFRESH_INTERVAL):
+        """Keeps the catalog warm by re-listing models every `interval` seconds."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.is_set():
+                with self._lock:
+                    busy = self._refreshing
+                    self._refreshing = True
+                if not busy:
+                    self.refresh()
+                self._stop.wait(interval)
+
+        self._refresher = threading.Thread(target=_loop, name="model-catalog-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop.set()
+
+    def snapshot(self):
+        with self._lock:
+            age = self.age()
+            return {
+                "models": list(self._models),
+                "age_seconds": round(age, 1) if age is not None else None,
+                "ttl_seconds": self.ttl,
+                "stale": age is None or age > self.ttl,
+                "refreshing": self._refreshing,
+                "refresh_count": self._refresh_count,
+                "last_error": self._last_error,
+                "consecutive_failures": self._failures,
+                "retry_in_seconds": round(max(0.0, self._retry_at - time.monotonic()), 1),
+            }
+
+
+catalog = ModelCatalog()
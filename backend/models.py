@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Index, ForeignKey
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -11,6 +11,11 @@ class ChatHistory(Base):
     content = Column(Text)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Added by migrations/0002_query_indexes.py
+    __table_args__ = (
+        Index("ix_chat_history_timestamp", "timestamp"),
+    )
+
 class Quiz(Base):
     __tablename__ = "quizzes"
 
@@ -20,6 +25,39 @@ class Quiz(Base):
     score = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Added by migrations/0004_quiz_topic_index.py
+    __table_args__ = (
+        Index("ix_quizzes_topic", "topic"),
+    )
+
+class QuizQuestion(Base):
+    __tablename__ = "quiz_questions"
+
+    # One normalized question of a generated quiz; see question_bank.py
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id")) # the generated quiz it first appeared in
+    topic = Column(String, nullable=False) # normalized topic
+    question_hash = Column(String, nullable=False) # question_bank.question_hash(question)
+    question = Column(Text)
+    options = Column(Text) # JSON list of option strings
+    answer = Column(Text) # one of the options
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Added by migrations/0003_question_bank.py
+    __table_args__ = (
+        Index("ux_quiz_questions_topic_hash", "topic", "question_hash", unique=True),
+    )
+
+class MapGraph(Base):
+    __tablename__ = "map_graphs"
+
+    # A concept map kept for /api/maps/<id>/expand; see map_graphs.py
+    map_id = Column(String, primary_key=True) # render_store.map_digest(structure)
+    structure = Column(Text) # JSON {"root", "layout", "edges"}
+    pos = Column(Text) # JSON {node: [x, y]}, or NULL until laid out
+    slots = Column(Text) # JSON {node: [x0, width]} for tree layouts
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class StudySession(Base):
     __tablename__ = "study_sessions"
 
@@ -27,3 +65,35 @@ class StudySession(Base):
     activity_type = Column(String) # "quiz", "timer_focus", "chat"
     duration_seconds = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Added by migrations/0002_query_indexes.py
+    __table_args__ = (
+        Index("ix_study_sessions_activity_created", "activity_type", "created_at", "duration_seconds"),
+        Index("ix_study_sessions_created", "created_at"),
+    )
+
+class GeneratedResult(Base):
+    __tablename__ = "generated_results"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True) # "<generator>:v<prompt_version>:<normalized topic>"
+    generator = Column(String) # "quiz", "flashcards", "summary", "concept_map"
+    topic = Column(String) # normalized topic
+    payload = Column(Text) # JSON string of the generated result
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ProgressCounter(Base):
+    __tablename__ = "progress_counters"
+
+    # Materialized totals per activity, maintained by progress.record_activity()
+    activity_type = Column(String, primary_key=True)
+    sessions = Column(Integer, default=0)
+    total_seconds = Column(Integer, default=0)
+
+class StudyStreak(Base):
+    __tablename__ = "study_streak"
+
+    id = Column(Integer, primary_key=True) # single row, id=1
+    last_study_day = Column(Date) # UTC day of the latest session
+    current_days = Column(Integer, default=0) # consecutive study days ending at last_study_day
+    longest_days = Column(Integer, default=0)
@@ -0,0 +1,155 @@
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import case, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from . import models
+
+STREAK_ROW_ID = 1
+
+
+def utc_now() -> datetime:
+    # Sessions are stamped with SQLite's CURRENT_TIMESTAMP: naive UTC, whole seconds
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def utc_today() -> date:
+    return utc_now().date()
+
+
+def _bump_counter(db: Session, activity_type: str, sessions: int, seconds: int):
+    counters = models.ProgressCounter.__table__
+    stmt = insert(counters).values(activity_type=activity_type, sessions=sessions, total_seconds=seconds)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[counters.c.activity_type],
+        set_={
+            "sessions": counters.c.sessions + sessions,
+            "total_seconds": counters.c.total_seconds + seconds,
+        },
+    ))
+
+
+def _bump_streak(db: Session, day: date):
+    streak = models.StudyStreak.__table__
+    current = case(
+        (streak.c.last_study_day >= day, streak.c.current_days), # same day, or a late write for an earlier one
+        (streak.c.last_study_day == day - timedelta(days=1), streak.c.current_days + 1),
+        else_=1,
+    )
+    stmt = insert(streak).values(id=STREAK_ROW_ID, last_study_day=day, current_days=1, longest_days=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[streak.c.id],
+        set_={
+            # SQLite evaluates every SET expression against the old row
+            "current_days": current,
+            "longest_days": func.max(streak.c.longest_days, current),
+            "last_study_day": func.max(streak.c.last_study_day, day),
+        },
+    ))
+
+
+def record_activity(db: Session, activity_type: str, duration_seconds: int, day: date = None):
+    """
+    Adds one session to the materialized counters and the study streak.
+    Both are single-row upserts evaluated by SQLite against the current row,
+    so concurrent writers never lose an increment. Does not commit: call it
+    in the same transaction as the StudySession insert.
+    """
+    _bump_counter(db, activity_type, 1, duration_seconds or 0)
+    _bump_streak(db, day or utc_today())
+
+
+def record_sessions(db: Session, sessions):
+    """
+    Bulk form of StudySession insert + record_activity(): one executemany
+    INSERT, one counter upsert per activity type and one streak upsert per
+    distinct day. `sessions` is a list of dicts with activity_type,
+    duration_seconds and optionally created_at (naive UTC). Does not commit.
+    """
+    if not sessions:
+        return
+    rows = [
+        {
+            "activity_type": s["activity_type"],
+            "duration_seconds": s.get("duration_seconds") or 0,
+            "created_at": s.get("created_at") or utc_now(),
+        }
+        for s in sessions
+    ]
+    db.execute(insert(models.StudySession.__table__), rows)
+
+    totals = {}
+    for row in rows:
+        count, seconds = totals.get(row["activity_type"], (0, 0))
+        totals[row["activity_type"]] = (count + 1, seconds + row["duration_seconds"])
+    for activity_type, (count, seconds) in totals.items():
+        _bump_counter(db, activity_type, count, seconds)
+    for day in sorted({row["created_at"].date() for row in rows}):
+        _bump_streak(db, day)
+
+
+def read(db: Session, today: date = None) -> dict:
+    """The /api/progress payload, from the materialized rows only (O(1) in history size)."""
+    counters = {
+        row.activity_type: row
+        for row in db.query(models.ProgressCounter).filter(
+            models.ProgressCounter.activity_type.in_(("timer_focus", "quiz"))
+        )
+    }
+    streak = db.get(models.StudyStreak, STREAK_ROW_ID)
+
+    focus = counters.get("timer_focus")
+    quizzes = counters.get("quiz")
+    current_days = longest_days = 0
+    if streak is not None and streak.last_study_day is not None:
+        longest_days = streak.longest_days or 0
+        # The streak survives until a whole UTC day passes without studying
+        if streak.last_study_day >= (today or utc_today()) - timedelta(days=1):
+            current_days = streak.current_days or 0
+
+    return {
+        "study_hours": round((focus.total_seconds if focus else 0) / 3600, 1),
+        "quizzes_taken": quizzes.sessions if quizzes else 0,
+        "streak_days": current_days,
+        "longest_streak_days": longest_days,
+    }
+
+
+def rebuild(db: Session):
+    """Recomputes the counters and streak from study_sessions (one pass of GROUP BY / DISTINCT)."""
+    db.query(models.ProgressCounter).delete()
+    db.query(models.StudyStreak).delete()
+
+    totals = db.query(
+        models.StudySession.activity_type,
+        func.count(models.StudySession.id),
+        func.coalesce(func.sum(models.StudySession.duration_seconds), 0),
+    ).group_by(models.StudySession.activity_type)
+    for activity_type, sessions, total_seconds in totals:
+        db.add(models.ProgressCounter(activity_type=activity_type, sessions=sessions, total_seconds=total_seconds))
+
+    study_day = func.date(models.StudySession.created_at)
+    days = [date.fromisoformat(d) for (d,) in db.query(study_day).distinct().order_by(study_day) if d]
+    if days:
+        current = longest = 1
+        for previous, day in zip(days, days[1:]):
+            current = current + 1 if day - previous == timedelta(days=1) else 1
+            longest = max(longest, current)
+        db.add(models.StudyStreak(id=STREAK_ROW_ID, last_study_day=days[-1], current_days=current, longest_days=longest))
+    db.commit()
+
+
+def backfill_if_needed(db: Session) -> bool:
+    """Rebuilds once for databases that have sessions recorded before the counters existed."""
+    has_counters = db.query(models.ProgressCounter.activity_type).first() is not None
+    has_sessions = db.query(models.StudySession.id).first() is not None
+    if has_sessions and not has_counters:
+        rebuild(db)
+        return True
+    return False
+
+
+def reset(db: Session):
+    """Deletes all sessions along with their counters and streak. Does not commit."""
+    db.query(models.StudySession).delete()
+    db.query(models.ProgressCounter).delete()
+    db.query(models.StudyStreak).delete()
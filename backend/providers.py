@@ -0,0 +1,274 @@
+import os
+import json
+import threading
+import httpx
+from dotenv import load_dotenv
+from . import timing
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# When set (e.g. http://127.0.0.1:8100/v1beta for backend.benchmarks.fake_providers),
+# Gemini is called over its REST API with the pooled httpx client instead of the SDK
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "").rstrip("/")
+
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+
+# Using Mistral v0.3 on classic endpoint (more stable than router)
+HUGGINGFACE_API_URL = os.getenv(
+    "HUGGINGFACE_API_URL",
+    "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.3"
+)
+HUGGINGFACE_MODEL = HUGGINGFACE_API_URL.rstrip("/").split("/models/")[-1]
+POLLINATIONS_API_URL = os.getenv("POLLINATIONS_API_URL", "https://text.pollinations.ai/")
+
+# Connection pool shared by every request on this worker
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+_client = None
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def gemini():
+    """
+    The google.generativeai module, imported and configured on first use.
+    Importing it takes about a second, so it is kept off the import path of
+    the app and loaded by the startup warm-up (or the first Gemini call).
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if GEMINI_API_KEY:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                _genai = genai
+    return _genai
+
+
+class ProviderResponse:
+    """Minimal stand-in for Gemini's response object (text + parts)."""
+
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+def get_client() -> httpx.AsyncClient:
+    """Returns the pooled keep-alive client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=10.0),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def _gemini_url(model_name: str, method: str) -> str:
+    if not model_name.startswith("models/"):
+        model_name = f"models/{model_name}"
+    return f"{GEMINI_API_BASE}/{model_name}:{method}"
+
+
+def _gemini_payload(prompt: str, generation_config=None) -> dict:
+    payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if generation_config:
+        payload["generationConfig"] = {
+            "responseMimeType" if key == "response_mime_type" else key: value
+            for key, value in generation_config.items()
+        }
+    return payload
+
+
+def _gemini_text(result: dict) -> str:
+    candidates = result.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+def list_gemini_models():
+    """Names of the Gemini models that support generateContent."""
+    if GEMINI_API_BASE:
+        response = httpx.get(f"{GEMINI_API_BASE}/models", headers={"x-goog-api-key": GEMINI_API_KEY or ""}, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return [
+            m["name"] for m in response.json().get("models", [])
+            if "generateContent" in m.get("supportedGenerationMethods", [])
+        ]
+    return [m.name for m in gemini().list_models() if 'generateContent' in m.supported_generation_methods]
+
+
+async def _generate_with_gemini_rest(model_name: str, prompt: str, generation_config=None):
+    response = await get_client().post(
+        _gemini_url(model_name, "generateContent"),
+        headers={"x-goog-api-key": GEMINI_API_KEY or ""},
+        json=_gemini_payload(prompt, generation_config),
+    )
+    if response.status_code != 200:
+        raise Exception(f"Gemini API Error {response.status_code}: {response.text[:200]}")
+    return ProviderResponse(_gemini_text(response.json()))
+
+
+async def generate_with_gemini(model_name: str, prompt: str, generation_config=None):
+    if GEMINI_API_BASE:
+        response = await _generate_with_gemini_rest(model_name, prompt, generation_config)
+        timing.annotate(provider="gemini", model=model_name)
+        return response
+    model = gemini().GenerativeModel(model_name)
+    response = await model.generate_content_async(prompt, generation_config=generation_config)
+    timing.annotate(provider="gemini", model=model_name)
+    return response
+
+
+async def generate_with_huggingface(prompt: str):
+    """
+    Fallback generator using Direct HTTP Request to Hugging Face
+    """
+    if not HUGGINGFACE_API_KEY:
+        raise Exception("No Hugging Face Key available for fallback.")
+
+    print("Switched to Hugging Face Model (Mistral-7B via HTTP)...")
+
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+
+    # Mistral expects a specific prompt format for best results, but raw text works too
+    payload = {
+        "inputs": f"[INST] {prompt} [/INST]",
+        "parameters": {
+            "max_new_tokens": 1000,
+            "temperature": 0.7,
+            "return_full_text": False
+        }
+    }
+
+    try:
+        response = await get_client().post(HUGGINGFACE_API_URL, headers=headers, json=payload)
+
+        if response.status_code != 200:
+            raise Exception(f"HF API Error {response.status_code}: {response.text}")
+
+        result = response.json()
+        # HF returns a list of objects, usually [{'generated_text': '...'}]
+        if isinstance(result, list) and len(result) > 0:
+            generated_text = result[0].get('generated_text', '')
+        elif isinstance(result, dict):
+            generated_text = result.get('generated_text', '')
+        else:
+            generated_text = str(result)
+
+        timing.annotate(provider="huggingface", model=HUGGINGFACE_MODEL)
+        return ProviderResponse(generated_text)
+
+    except Exception as e:
+        print(f"Hugging Face HTTP Error: {e}")
+        raise e
+
+
+async def generate_with_pollinations(prompt: str):
+    """
+    Free public AI API - No authentication required!
+    """
+    print("Switched to Pollinations.ai (Free Public API)...")
+
+    try:
+        # Pollinations accepts plain text prompts
+        response = await get_client().post(
+            POLLINATIONS_API_URL,
+            json={"messages": [{"role": "user", "content": prompt}]},
+        )
+
+        if response.status_code == 200:
+            timing.annotate(provider="pollinations")
+            return ProviderResponse(response.text)
+        raise Exception(f"Pollinations API Error {response.status_code}: {response.text[:100]}")
+
+    except Exception as e:
+        print(f"Pollinations Error: {e}")
+        raise e
+
+
+async def stream_with_gemini(model_name: str, prompt: str, generation_config=None):
+    """Yields text chunks from Gemini's streaming API as they arrive."""
+    if GEMINI_API_BASE:
+        async with get_client().stream(
+            "POST",
+            _gemini_url(model_name, "streamGenerateContent") + "?alt=sse",
+            headers={"x-goog-api-key": GEMINI_API_KEY or ""},
+            json=_gemini_payload(prompt, generation_config),
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"Gemini API Error {response.status_code}: {body.decode(errors='replace')[:200]}")
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    text = _gemini_text(json.loads(line[len("data:"):]))
+                    if text:
+                        yield text
+        return
+    model = gemini().GenerativeModel(model_name)
+    response = await model.generate_content_async(prompt, generation_config=generation_config, stream=True)
+    async for chunk in response:
+        if chunk.parts:
+            yield chunk.text
+
+
+async def stream_with_huggingface(prompt: str):
+    """Yields generated tokens from Hugging Face's server-sent event stream."""
+    if not HUGGINGFACE_API_KEY:
+        raise Exception("No Hugging Face Key available for fallback.")
+
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+    payload = {
+        "inputs": f"[INST] {prompt} [/INST]",
+        "parameters": {
+            "max_new_tokens": 1000,
+            "temperature": 0.7,
+            "return_full_text": False
+        },
+        "stream": True
+    }
+
+    async with get_client().stream("POST", HUGGINGFACE_API_URL, headers=headers, json=payload) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise Exception(f"HF API Error {response.status_code}: {body.decode(errors='replace')[:200]}")
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):])
+            token = event.get("token", {})
+            if not token.get("special"):
+                yield token.get("text", "")
+
+
+async def stream_with_pollinations(prompt: str):
+    """Relays the Pollinations plain-text body chunk by chunk as it is received."""
+    async with get_client().stream(
+        "POST",
+        POLLINATIONS_API_URL,
+        json={"messages": [{"role": "user", "content": prompt}]},
+    ) as response:
+        if response.status_code != 200:
+            body = await response.aread()
+            raise Exception(f"Pollinations API Error {response.status_code}: {body.decode(errors='replace')[:100]}")
+
+        async for chunk in response.aiter_text():
+            if chunk:
+                yield chunk
@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import hashlib
+import asyncio
+import threading
+from dotenv import load_dotenv
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from . import database, models, topic_index
+from .result_cache import normalize_topic
+
+load_dotenv()
+
+# Every generated quiz question is kept per topic; once a topic's pool is big
+# enough, quizzes are drawn from it instead of generated. Off with QUESTION_BANK=0.
+QUESTION_BANK = os.getenv("QUESTION_BANK", "1") == "1"
+# Questions a topic needs before quizzes are sampled rather than generated (each LLM quiz adds up to QUIZ_SIZE)
+QUESTION_BANK_MIN_POOL = int(os.getenv("QUESTION_BANK_MIN_POOL", "30"))
+# LLM quizzes per topic after which its pool is served as it is, even below
+# the minimum: a model that keeps repeating itself must not keep a topic on the LLM path
+QUESTION_BANK_MAX_GENERATIONS = int(os.getenv("QUESTION_BANK_MAX_GENERATIONS", "5"))
+QUIZ_SIZE = 10
+# Existing questions listed in the generation prompt as ones not to repeat
+AVOID_IN_PROMPT = 40
+
+_OPTION_LETTERS = "ABCD"
+
+
+def _clean(value) -> str:
+    return " ".join(str(value).split()) if isinstance(value, (str, int, float)) else ""
+
+
+def question_hash(question: str) -> str:
+    """Identity of a question within a topic: casing, spacing and punctuation do not count."""
+    text = re.sub(r"[\W_]+", " ", question.lower()).strip()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_question(item):
+    """
+    {"question", "options", "answer"} with whitespace collapsed, duplicate
+    options dropped and the answer spelled exactly like one of the options,
+    or None if the item is not a usable multiple-choice question. An answer
+    given as a letter ("B") or in another case is mapped to its option.
+    """
+    if not isinstance(item, dict):
+        return None
+    question = _clean(item.get("question"))
+    options = item.get("options")
+    if not question or not isinstance(options, list):
+        return None
+    options = list(dict.fromkeys(option for option in map(_clean, options) if option))
+    if len(options) < 2:
+        return None
+
+    answer = _clean(item.get("answer"))
+    if answer not in options:
+        by_case = {option.lower(): option for option in options}
+        letter = answer.upper().rstrip(").")
+        if answer.lower() in by_case:
+            answer = by_case[answer.lower()]
+        elif len(letter) == 1 and letter in _OPTION_LETTERS[:len(options)]:
+            answer = options[_OPTION_LETTERS.index(letter)]
+        else:
+            return None
+    return {"question": question, "options": options, "answer": answer}
+
+
+def normalize_questions(items):
+    """normalize_question() over a list, dropping unusable items and repeats."""
+    questions = {}
+    for item in items if isinstance(items, list) else []:
+        question = normalize_question(item)
+        if question is not None:
+            questions.setdefault(question_hash(question["question"]), question)
+    return list(questions.values())
+
+
+def numbered(questions):
+    """Questions as served by /api/generate-quiz: ids 1..n in order."""
+    return [{"id": i, **question} for i, question in enumerate(questions, 1)]
+
+
+def normalize_quiz(value) -> dict:
+    """A generated quiz as served and cached: {"questions": numbered(normalize_questions(...))}."""
+    questions = value.get("questions") if isinstance(value, dict) else None
+    return {"questions": numbered(normalize_questions(questions))}
+
+
+def add_quiz(db, topic: str, questions) -> int:
+    """
+    Records a generated quiz in `quizzes` and adds its questions to the bank,
+    skipping ones the topic already has. `db` is a Session or Connection.
+    Returns the number of new questions. Does not commit.
+    """
+    questions = normalize_questions(questions)
+    if not questions:
+        return 0
+    topic = normalize_topic(topic)
+    quiz = db.execute(insert(models.Quiz.__table__).values(topic=topic, questions=json.dumps(questions)))
+    quiz_id = quiz.inserted_primary_key[0]
+
+    bank = models.QuizQuestion.__table__
+    rows = [
+        {
+            "quiz_id": quiz_id,
+            "topic": topic,
+            "question_hash": question_hash(q["question"]),
+            "question": q["question"],
+            "options": json.dumps(q["options"]),
+            "answer": q["answer"],
+        }
+        for q in questions
+    ]
+    before = pool_size(db, topic)
+    db.execute(insert(bank).on_conflict_do_nothing(index_elements=[bank.c.topic, bank.c.question_hash]), rows)
+    return pool_size(db, topic) - before
+
+
+def pool_size(db, topic: str) -> int:
+    bank = models.QuizQuestion.__table__
+    return db.execute(
+        func.count(bank.c.id).select().where(bank.c.topic == normalize_topic(topic))
+    ).scalar()
+
+
+def generations(db, topic: str) -> int:
+    """How many LLM quizzes have been recorded for `topic`."""
+    quizzes = models.Quiz.__table__
+    return db.execute(
+        func.count(quizzes.c.id).select().where(quizzes.c.topic == normalize_topic(topic))
+    ).scalar()
+
+
+def recent_questions(db, topic: str, limit: int = AVOID_IN_PROMPT):
+    """The newest `limit` question texts in the pool for `topic`."""
+    bank = models.QuizQuestion.__table__
+    return db.execute(
+        bank.select().with_only_columns(bank.c.question)
+        .where(bank.c.topic == normalize_topic(topic))
+        .order_by(bank.c.id.desc()).limit(limit)
+    ).scalars().all()
+
+
+def sample(db, topic: str, size: int = QUIZ_SIZE):
+    """Up to `size` random questions from the pool for `topic`."""
+    bank = models.QuizQuestion.__table__
+    rows = db.execute(
+        bank.select().with_only_columns(bank.c.question, bank.c.options, bank.c.answer)
+        .where(bank.c.topic == normalize_topic(topic))
+        .order_by(func.random()).limit(size)
+    ).all()
+    return [{"question": q, "options": json.loads(options), "answer": a} for q, options, a in rows]
+
+
+def backfill_if_needed(db: Session) -> int:
+    """
+    Seeds an empty bank once from quizzes already in the result cache.
+    Returns the number of questions added. Does not commit.
+    """
+    if db.query(models.QuizQuestion.id).first() is not None:
+        return 0
+    added = 0
+    rows = db.query(models.GeneratedResult.topic, models.GeneratedResult.payload)\
+        .filter(models.GeneratedResult.generator == "quiz").all()
+    for topic, payload in rows:
+        try:
+            questions = json.loads(payload).get("questions")
+        except (TypeError, ValueError, AttributeError):
+            continue
+        added += add_quiz(db, topic, questions)
+    return added
+
+
+class QuestionBank:
+    """
+    Quiz serving from the quiz_questions table: fresh random quizzes for
+    topics whose pool is ready, and the bookkeeping for generated ones.
+
+    A pool is ready once it has min_pool questions, or at least QUIZ_SIZE
+    after max_generations LLM quizzes for the topic.
+    """
+
+    def __init__(self, enabled=QUESTION_BANK, min_pool=QUESTION_BANK_MIN_POOL,
+                 max_generations=QUESTION_BANK_MAX_GENERATIONS):
+        self.enabled = enabled
+        self.min_pool = max(min_pool, QUIZ_SIZE)
+        self.max_generations = max_generations
+        self._lock = threading.Lock()
+        self.draws = 0
+        self.similar_draws = 0
+        self.short_pools = 0
+        self.generated_quizzes = 0
+        self.added = 0
+        self.duplicates = 0
+
+    def _count(self, attr, n=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + n)
+
+    def _ready(self, db, topic: str, min_pool: int = None) -> bool:
+        size = pool_size(db, topic)
+        if min_pool is not None:
+            return size >= max(min_pool, QUIZ_SIZE)
+        if size >= self.min_pool:
+            return True
+        return size >= QUIZ_SIZE and generations(db, topic) >= self.max_generations
+
+    def draw(self, topic: str, min_pool: int = None):
+        """
+        A QUIZ_SIZE-question quiz sampled from the pool for `topic`, or, when
+        that pool is not ready, from the most similar topic (see topic_index)
+        whose pool is. None if there is none. `min_pool` replaces the
+        readiness rule with a plain minimum pool size. The quiz has the
+        same shape as a generated one (see normalize_quiz).
+        """
+        normalized = normalize_topic(topic)
+        db = database.SessionLocal()
+        try:
+            source = normalized
+            if not self._ready(db, normalized, min_pool):
+                similar = (
+                    candidate for candidate, _ in topic_index.index.candidates("quiz", normalized)
+                    if candidate != normalized
+                )
+                source = next((candidate for candidate in similar if self._ready(db, candidate, min_pool)), None)
+                if source is None:
+                    self._count("short_pools")
+                    return None
+                self._count("similar_draws")
+            questions = sample(db, source)
+        except Exception as e:
+            print(f"Question bank read error: {e}")
+            return None
+        finally:
+            db.close()
+        self._count("draws")
+        return {"questions": numbered(questions)}
+
+    def add(self, topic: str, questions) -> int:
+        """Stores a generated quiz; returns how many of its questions were new to the topic."""
+        db = database.SessionLocal()
+        try:
+            added = add_quiz(db, topic, questions)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Question bank write error: {e}")
+            return 0
+        finally:
+            db.close()
+        self._count("generated_quizzes")
+        self._count("added", added)
+        self._count("duplicates", len(normalize_questions(questions)) - added)
+        return added
+
+    def avoid(self, topic: str):
+        """Questions the next LLM quiz for `topic` should not repeat."""
+        db = database.SessionLocal()
+        try:
+            return recent_questions(db, topic)
+        except Exception as e:
+            print(f"Question bank read error: {e}")
+            return []
+        finally:
+            db.close()
+
+    async def adraw(self, topic: str, min_pool: int = None):
+        return await asyncio.to_thread(self.draw, topic, min_pool)
+
+    async def aavoid(self, topic: str):
+        return await asyncio.to_thread(self.avoid, topic)
+
+    async def aadd(self, topic: str, questions) -> int:
+        return await asyncio.to_thread(self.add, topic, questions)
+
+    def stats(self, db: Session):
+        bank = models.QuizQuestion.__table__
+        questions, topics = db.execute(
+            func.count(bank.c.id).select().add_columns(func.count(bank.c.topic.distinct()))
+        ).one()
+        return {
+            "enabled": self.enabled,
+            "min_pool": self.min_pool,
+            "max_generations": self.max_generations,
+            "quiz_size": QUIZ_SIZE,
+            "questions": questions,
+            "topics": topics,
+            "draws": self.draws,
+            "similar_draws": self.similar_draws,
+            "short_pools": self.short_pools,
+            "generated_quizzes": self.generated_quizzes,
+            "added": self.added,
+            "duplicates": self.duplicates,
+        }
+
+
+bank = QuestionBank()
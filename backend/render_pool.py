@@ -0,0 +1,141 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from . import timing
+
+load_dotenv()
+
+# RENDER_POOL_WORKERS=0 renders in one background thread of this process instead,
+# one at a time because pyplot's global state is not thread-safe.
+RENDER_POOL_WORKERS = int(os.getenv("RENDER_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_QUEUE_DEPTH = int(os.getenv("RENDER_QUEUE_DEPTH", "32"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+# Workers never fork the server itself: it has event-loop, DB-pool and provider
+# client threads whose locks a forked child could inherit held.
+RENDER_POOL_START_METHOD = os.getenv(
+    "RENDER_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _warm_worker():
+    """Runs once per worker process: pay matplotlib/networkx import cost before the first render."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    import networkx  # noqa: F401
+    from . import maps, analytics  # noqa: F401
+
+
+def _ping():
+    return os.getpid()
+
+
+class RenderPool:
+    """
+    Runs matplotlib renders in a pool of warm worker processes.
+
+    Each worker renders one figure at a time, so renders scale across cores
+    without sharing pyplot state. At most `queue_depth` renders may be queued
+    or running; beyond that submit() raises RenderQueueFull straight away.
+    A render keeps its slot until it actually ends, even after its caller
+    got RenderTimeout, so timed-out work cannot pile up behind the limit.
+    """
+
+    def __init__(self, workers=RENDER_POOL_WORKERS, queue_depth=RENDER_QUEUE_DEPTH, timeout=RENDER_TIMEOUT,
+                 start_method=RENDER_POOL_START_METHOD):
+        self.workers = workers
+        self.start_method = start_method
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._executor = None
+        self._slots = threading.Lock() # guards _pending, which executor threads also release
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.workers <= 0:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_warm_worker,
+                )
+        return self._executor
+
+    def _release(self, future=None):
+        with self._slots:
+            self._pending -= 1
+
+    async def start(self):
+        """Spawns and warms every worker so the first requests do not pay for it."""
+        if self.workers <= 0:
+            await asyncio.to_thread(_warm_worker)
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.workers)))
+
+    async def submit(self, fn, *args, timeout=None):
+        """Runs fn(*args) in the pool and awaits its result. fn and args must be picklable."""
+        with self._slots:
+            if self._pending >= self.queue_depth:
+                self.rejected += 1
+                raise RenderQueueFull(f"Render queue is full ({self.queue_depth} pending)")
+            self._pending += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the render ends (or is cancelled before it starts), not when the caller stops waiting
+        future.add_done_callback(self._release)
+        try:
+            with timing.span("render"): # queueing included: that is what the request waits for
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            # The worker finishes the abandoned render in the background, still holding its slot; the caller is released now
+            self.timeouts += 1
+            raise RenderTimeout(f"Render exceeded {timeout or self.timeout:.0f}s")
+        except Exception:
+            self.failures += 1
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "start_method": self.start_method,
+            "queue_depth": self.queue_depth,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+        }
+
+
+pool = RenderPool()
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from dotenv import load_dotenv
+from . import rendering
+from .result_cache import LRUCache
+
+load_dotenv()
+
+RENDER_STORE_DIR = os.getenv("RENDER_STORE_DIR", os.path.join(os.path.dirname(__file__), "render_cache"))
+RENDER_STORE_MAX_ENTRIES = int(os.getenv("RENDER_STORE_MAX_ENTRIES", "256"))
+# Caps on the directory; least recently used files go first. 0 turns a cap off.
+RENDER_STORE_MAX_BYTES = int(os.getenv("RENDER_STORE_MAX_BYTES", str(512 * 2**20)))
+RENDER_STORE_MAX_AGE = float(os.getenv("RENDER_STORE_MAX_AGE", str(30 * 24 * 3600)))
+# A prune over the size cap goes down to this fraction of it, so it does not run on every put
+PRUNE_TO = 0.9
+# Seconds between age sweeps, and between mtime refreshes of a file served from memory
+PRUNE_INTERVAL = 3600
+TOUCH_INTERVAL = 600
+
+# Renders are immutable (the key hashes everything that shapes them), so clients may cache them forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def map_digest(edge_data: dict) -> str:
+    """
+    Content hash of a concept map's structure. Edge order, duplicate edges and
+    surrounding whitespace do not change the digest.
+    """
+    edges = sorted({
+        (
+            str(edge.get("source", "")).strip(),
+            str(edge.get("target", "")).strip(),
+            str(edge.get("relationship", "")).strip(),
+        )
+        for edge in edge_data.get("edges", [])
+    })
+    canonical = {
+        "root": str(edge_data.get("root") or "").strip(),
+        "layout": edge_data.get("layout", "tree"),
+        "edges": edges,
+    }
+    payload = json.dumps(canonical, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def render_digest(edge_data: dict) -> str:
+    """
+    Key of a map's rendered image: map_digest() plus the drawing code that
+    produces it (rendering.RENDER_VERSION and MAP_DRAW_BACKEND).
+    """
+    payload = f"{map_digest(edge_data)}:v{rendering.RENDER_VERSION}:{rendering.MAP_DRAW_BACKEND}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: str, etag: str, exists) -> bool:
+    """
+    Whether an If-None-Match header matches `etag` (weak comparison, so W/
+    prefixes are ignored). "*" matches when `exists()` is true.
+    """
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    tags = {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+    return etag in tags or ("*" in tags and exists())
+
+
+class RenderStore:
+    """
+    Content-addressed store of rendered maps: memory LRU in front of a directory of files.
+
+    A file's mtime is its last use (refreshed at most every TOUCH_INTERVAL
+    while it is served from memory). prune() deletes files unused for
+    max_age seconds, then the least recently used until the directory is
+    within max_bytes; put() runs it when the directory grows past max_bytes
+    and at most every PRUNE_INTERVAL otherwise.
+    """
+
+    def __init__(self, directory=RENDER_STORE_DIR, max_entries=RENDER_STORE_MAX_ENTRIES,
+                 max_bytes=RENDER_STORE_MAX_BYTES, max_age=RENDER_STORE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory = LRUCache(max_entries, ttl=float("inf"))
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None # unknown until the first prune() scans the directory
+        self._next_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.pruned = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str):
+        entry = self.memory.get(key)
+        if entry is not None:
+            data, touched = entry
+            if time.monotonic() - touched > TOUCH_INTERVAL:
+                self._touch(key)
+                self.memory.put(key, (data, time.monotonic()))
+            return data
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except (FileNotFoundError, OSError):
+            return None
+        self._touch(key)
+        self.memory.put(key, (data, time.monotonic()))
+        return data
+
+    def put(self, key: str, data: bytes):
+        self.memory.put(key, (data, time.monotonic()))
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            with self._disk_lock:
+                try:
+                    replaced = os.path.getsize(path)
+                except OSError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(data) - replaced
+                due = (
+                    self._disk_bytes is None
+                    or (self.max_bytes and self._disk_bytes > self.max_bytes)
+                    or time.monotonic() >= self._next_prune
+                )
+        except OSError as e:
+            print(f"Render store write error: {e}")
+            return
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Applies max_age and max_bytes to the directory; returns the number of files deleted."""
+        with self._disk_lock:
+            self._next_prune = time.monotonic() + PRUNE_INTERVAL
+            files = []
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.name))
+            except FileNotFoundError:
+                self._disk_bytes = 0
+                return 0
+            except OSError as e:
+                print(f"Render store prune error: {e}")
+                return 0
+
+            files.sort() # least recently used first
+            total = sum(size for _, size, _ in files)
+            now = time.time()
+            removed = 0
+            for mtime, size, name in files:
+                expired = self.max_age and now - mtime > self.max_age
+                over = self.max_bytes and total > self.max_bytes * PRUNE_TO
+                if not (expired or over):
+                    break
+                if name.endswith(".tmp") and not expired:
+                    continue # a write in progress
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Render store prune error: {e}")
+                    continue
+                total -= size
+                removed += 1
+            self._disk_bytes = total
+        with self._lock:
+            self.pruned += removed
+        if removed:
+            print(f"Render store pruned {removed} files, {total / 2**20:.1f} MB left")
+        return removed
+
+    async def get_or_render(self, edge_data: dict, render, output_format: str = "png"):
+        """
+        Returns (render_digest, bytes). `render(edge_data, output_format)` is an
+        async callable and is only awaited if this structure was never rendered
+        in that format by the current drawing code.
+        """
+        digest = render_digest(edge_data)
+        key = f"{digest}.{output_format}"
+        data = await asyncio.to_thread(self.get, key)
+        with self._lock:
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if data is None:
+            data = await render(edge_data, output_format)
+            await asyncio.to_thread(self.put, key, data)
+            with self._lock:
+                self.renders += 1
+        return digest, data
+
+    def stats(self):
+        return {
+            "memory_entries": len(self.memory),
+            "disk_bytes": self._disk_bytes,
+            "max_bytes": self.max_bytes,
+            "max_age": self.max_age,
+            "pruned": self.pruned,
+            "hits": self.hits,
+            "misses": self.misses,
+            "renders": self.renders,
+        }
+
+
+store = RenderStore()
@@ -0,0 +1,68 @@
+import io
+import os
+import threading
+
+OUTPUT_FORMATS = ("png", "svg", "svgz")
+
+# "batched" draws all edges/boxes as two collections; "legacy" is one artist per node/edge
+MAP_DRAW_BACKEND = os.getenv("MAP_DRAW_BACKEND", "batched")
+# Part of every stored map render's key (see render_store.render_digest): bump it
+# whenever map drawing changes, so images from older code are not served
+RENDER_VERSION = 2
+
+MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "svgz": "image/svg+xml", # served with Content-Encoding: gzip
+}
+
+# Emit SVG text as <text> elements rather than glyph paths: far smaller, and the browser renders it crisply
+SVG_RC = {"svg.fonttype": "none"}
+
+_local = threading.local()
+
+
+def _matplotlib():
+    # Imported on first render rather than with the app (about half a second)
+    import matplotlib
+    matplotlib.use('Agg')
+    return matplotlib
+
+
+def reusable_figure(name: str, figsize, facecolor='white'):
+    """
+    Returns a cleared matplotlib Figure with an Agg canvas, created once per
+    thread (or render worker) and reused for every later render. Avoids
+    pyplot's global figure manager entirely.
+    """
+    figures = getattr(_local, "figures", None)
+    if figures is None:
+        figures = _local.figures = {}
+
+    fig = figures.get(name)
+    if fig is None:
+        _matplotlib()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        figures[name] = fig
+    else:
+        fig.clear()
+        fig.set_size_inches(figsize)
+    fig.set_facecolor(facecolor)
+    return fig
+
+
+def save_figure(fig, output_format: str = "png", dpi=100, **kwargs) -> bytes:
+    """Serializes fig as png, svg or svgz (gzipped svg) bytes."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    buffer = io.BytesIO()
+    if output_format == "png":
+        fig.savefig(buffer, format="png", dpi=dpi, **kwargs)
+    else:
+        with _matplotlib().rc_context(SVG_RC):
+            fig.savefig(buffer, format=output_format, **kwargs)
+    return buffer.getvalue()
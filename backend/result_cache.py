@@ -0,0 +1,294 @@
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from . import database, models, topic_index
+
+load_dotenv()
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+
+# Bump a generator's version whenever its prompt changes so old results are not served
+PROMPT_VERSIONS = {
+    "quiz": 2,
+    "flashcards": 1,
+    "summary": 1,
+    "concept_map": 1,
+    "concept_map_expand": 1,
+    "study_pack": 1,
+}
+
+
+# Quotes around a topic and sentence punctuation after it. Symbols such as +, #
+# and a leading dot are part of it ("C", "C++", "C#" and ".NET" are different topics)
+_TOPIC_EDGES = re.compile(r"^[\s'\"`“”‘’¿¡]+|[\s?!.,;:'\"`“”‘’]+$")
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercases, collapses whitespace and strips surrounding sentence punctuation and quotes."""
+    text = " ".join(str(topic).lower().split())
+    return _TOPIC_EDGES.sub("", text)
+
+
+def make_key(generator: str, topic: str) -> str:
+    version = PROMPT_VERSIONS.get(generator, 1)
+    return f"{generator}:v{version}:{normalize_topic(topic)}"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ResultCache:
+    """
+    Two-tier cache for generated artifacts: an in-process LRU in front of the
+    generated_results SQLite table, so results survive restarts and are shared
+    between workers.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries, ttl)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.refreshes = 0
+        self.semantic_hits = 0
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, generator: str, topic: str, refresh: bool = False):
+        """Returns the cached result or None. refresh=True forces a miss."""
+        key = make_key(generator, topic)
+        if refresh:
+            self._count("refreshes")
+            self._count("misses")
+            return None
+
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        value = self._load(key)
+        if value is not None:
+            self._count("db_hits")
+            self.memory.put(key, value)
+            return value
+
+        value = self._get_similar(generator, topic)
+        if value is not None:
+            self._count("semantic_hits")
+            self.memory.put(key, value) # the same wording again is a plain memory hit
+            return value
+
+        self._count("misses")
+        return None
+
+    def _get_similar(self, generator: str, topic: str):
+        """
+        The result cached for a near-duplicate of `topic` (see topic_index),
+        or None. Candidates are tried best first; ones whose row has expired
+        or is gone are dropped from the index so they stop shadowing live ones.
+        """
+        if not topic_index.index.covers(generator):
+            return None
+        normalized = normalize_topic(topic)
+        gone = []
+        value = None
+        for similar, _ in topic_index.index.candidates(generator, normalized):
+            if similar == normalized:
+                continue
+            similar_key = make_key(generator, similar)
+            value = self.memory.get(similar_key)
+            if value is None:
+                value, state = self._fetch(similar_key)
+                if state == "gone":
+                    gone.append(similar)
+            if value is not None:
+                break
+        if gone:
+            self._unindex(generator, gone)
+        return value
+
+    def put(self, generator: str, topic: str, value):
+        key = make_key(generator, topic)
+        self.memory.put(key, value)
+        self._store(key, generator, normalize_topic(topic), value)
+        self._index(generator, [normalize_topic(topic)])
+        self._count("stores")
+
+    def _index(self, generator: str, topics):
+        if not topic_index.index.covers(generator):
+            return
+        try:
+            topic_index.index.indexes[generator].add(topics)
+        except Exception as e:
+            print(f"Semantic index write error: {e}")
+
+    def _unindex(self, generator: str, topics):
+        try:
+            topic_index.index.remove(generator, topics)
+        except Exception as e:
+            print(f"Semantic index write error: {e}")
+
+    def index_stored_topics(self):
+        """
+        Brings the semantic index in line with generated_results (run at
+        startup): live results not yet indexed are added, and indexed topics
+        whose result has expired, been deleted or belongs to an older prompt
+        version are removed. Only the difference is embedded or rewritten.
+        """
+        if not topic_index.SEMANTIC_CACHE:
+            return
+        generators = list(topic_index.index.indexes)
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        db = database.SessionLocal()
+        try:
+            rows = db.query(models.GeneratedResult.generator, models.GeneratedResult.topic, models.GeneratedResult.cache_key)\
+                .filter(models.GeneratedResult.generator.in_(generators), models.GeneratedResult.created_at >= cutoff).all()
+        finally:
+            db.close()
+        live = {generator: set() for generator in generators}
+        for generator, topic, key in rows:
+            if key == make_key(generator, topic):
+                live[generator].add(topic)
+        for generator, topics in live.items():
+            index = topic_index.index.indexes[generator]
+            missing = [topic for topic in topics if topic not in index]
+            stale = [topic for topic in index.topics() if topic not in topics]
+            if missing:
+                self._index(generator, missing)
+            if stale:
+                self._unindex(generator, stale)
+            if missing or stale:
+                print(f"Semantic index {generator}: {len(missing)} topics added, {len(stale)} removed")
+
+    async def aget(self, generator: str, topic: str, refresh: bool = False):
+        """Event-loop friendly get(): memory hits stay inline, SQLite runs in a thread."""
+        key = make_key(generator, topic)
+        if not refresh:
+            value = self.memory.get(key)
+            if value is not None:
+                self._count("memory_hits")
+                return value
+        return await asyncio.to_thread(self.get, generator, topic, refresh)
+
+    async def aput(self, generator: str, topic: str, value):
+        await asyncio.to_thread(self.put, generator, topic, value)
+
+    def _load(self, key):
+        return self._fetch(key)[0]
+
+    def _fetch(self, key):
+        """(value, state): state is "hit", "gone" (no row, or expired) or "error"."""
+        db = database.SessionLocal()
+        try:
+            row = db.query(models.GeneratedResult).filter(models.GeneratedResult.cache_key == key).first()
+            if row is None:
+                return None, "gone"
+            if row.created_at and row.created_at < datetime.utcnow() - timedelta(seconds=self.ttl):
+                self.memory.expirations += 1
+                return None, "gone"
+            return json.loads(row.payload), "hit"
+        except Exception as e:
+            print(f"Result cache read error: {e}")
+            return None, "error"
+        finally:
+            db.close()
+
+    def _store(self, key, generator, topic, value):
+        db = database.SessionLocal()
+        try:
+            row = db.query(models.GeneratedResult).filter(models.GeneratedResult.cache_key == key).first()
+            if row is None:
+                row = models.GeneratedResult(cache_key=key, generator=generator, topic=topic)
+                db.add(row)
+            row.payload = json.dumps(value)
+            row.created_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Result cache write error: {e}")
+        finally:
+            db.close()
+
+    def clear(self):
+        self.memory.clear()
+        topic_index.index.clear()
+        db = database.SessionLocal()
+        try:
+            db.query(models.GeneratedResult).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self):
+        return {
+            "memory_entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "refreshes": self.refreshes,
+            "semantic_hits": self.semantic_hits,
+            "semantic_index": topic_index.index.stats(),
+            "evictions": self.memory.evictions,
+            "expirations": self.memory.expirations,
+        }
+
+
+cache = ResultCache()
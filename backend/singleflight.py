@@ -0,0 +1,54 @@
+import asyncio
+from collections import defaultdict
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    The first caller (the leader) starts produce(); callers arriving while it
+    is still running await the same task. The task is shielded, so a leader
+    whose client disconnects does not cancel the work for everyone else.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = defaultdict(int)
+        self.coalesced = defaultdict(int)
+
+    @staticmethod
+    def _label(key: str) -> str:
+        return key.split(":", 1)[0]
+
+    async def do(self, key: str, produce):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced[self._label(key)] += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(produce())
+        self._inflight[key] = task
+        self.leaders[self._label(key)] += 1
+
+        def _forget(finished):
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+
+        task.add_done_callback(_forget)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        labels = sorted(set(self.leaders) | set(self.coalesced))
+        return {
+            "in_flight": len(self._inflight),
+            "generators": {
+                label: {
+                    "provider_calls": self.leaders[label],
+                    "coalesced_callers": self.coalesced[label],
+                }
+                for label in labels
+            },
+        }
+
+
+group = SingleFlight()
@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+# Stage timings are sent back in a Server-Timing header (visible in the browser's
+# network panel). Set SERVER_TIMING=0 to keep them to /metrics only.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+
+# Upper bounds in seconds; LLM calls routinely take several seconds, so the
+# usual Prometheus defaults are extended up to a minute.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+class Span:
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+        self.seconds = None
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set, in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = labels + "," if labels else ""
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-2]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-2]}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_seconds = Histogram(
+    "studybuddy_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+span_seconds = Histogram(
+    "studybuddy_span_duration_seconds", "Latency of request stages (LLM call, JSON parsing, layout, render, DB commit).",
+    ("span", "provider", "model"))
+
+# Spans recorded during the current request; threadpool calls and tasks started
+# from it see the same list because it is shared, not copied, with the context.
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+_open_span = contextvars.ContextVar("open_span", default=None)
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Times the enclosed block as one stage of the current request (if any) and
+    records it in span_seconds. Works in sync and async code alike.
+    """
+    current = Span(name, labels)
+    token = _open_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        _open_span.reset(token)
+        _record(current)
+
+
+def annotate(**labels):
+    """Adds labels (e.g. the model that answered) to the innermost open span."""
+    current = _open_span.get()
+    if current is not None:
+        current.labels.update(labels)
+
+
+def _record(current: Span):
+    span_seconds.observe(current.seconds, span=current.name, **current.labels)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append(current)
+
+
+def begin_request():
+    """Starts collecting spans for the request running in this context."""
+    return _request_spans.set([])
+
+
+def end_request(token):
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    return spans
+
+
+def server_timing_header(spans, total_seconds: float) -> str:
+    entries = []
+    for s in spans:
+        entry = f"{s.name};dur={s.seconds * 1000:.1f}"
+        desc = "/".join(str(v) for v in s.labels.values() if v)
+        if desc:
+            entry += f';desc="{_escape(desc)}"'
+        entries.append(entry)
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics() -> str:
+    return "\n".join(request_seconds.render() + span_seconds.render()) + "\n"
+
+
+# --- DB commit spans: every Session (sync, or the one behind an AsyncSession) ---
+
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    start = session.info.pop("commit_started", None)
+    if start is not None:
+        current = Span("db_commit", {})
+        current.seconds = time.perf_counter() - start
+        _record(current)
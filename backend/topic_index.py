@@ -0,0 +1,429 @@
+import os
+import re
+import zlib
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+load_dotenv()
+
+# Near-duplicate topic lookup for the result cache: "What is photosynthesis?"
+# and "how does photosynthesis work" are served what was generated for
+# "photosynthesis". Off with SEMANTIC_CACHE=0.
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "1") == "1"
+SEMANTIC_CACHE_DIR = os.getenv("SEMANTIC_CACHE_DIR", os.path.join(os.path.dirname(__file__), "semantic_index"))
+# Cosine similarity a cached topic needs to be served for a new one; see benchmarks/bench_semantic_cache.py
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8"))
+SEMANTIC_CACHE_GENERATORS = [
+    g.strip() for g in os.getenv("SEMANTIC_CACHE_GENERATORS", "summary,quiz,flashcards,concept_map").split(",") if g.strip()
+]
+
+EMBEDDING_DIM = 256
+NGRAM_SIZES = (3, 4)
+WORD_WEIGHT = 3.0 # whole words outweigh shared n-grams: "organic" vs "inorganic" chemistry is 0.76, not 0.87
+CANDIDATES = 8 # best matches checked against the marker guard (and, by callers, for a live result)
+COMPACT_FRACTION = 0.25 # removed rows are dropped from disk once they are this share of the index
+
+# Words that change how a topic is asked, not what it is about
+FILLER_WORDS = frozenset("""
+    a an the of in on for to and or with about is are was what how why does do did work works
+    explain explained explanation introduction intro basics basic overview guide tell me please
+    study notes summary quiz flashcards
+""".split())
+
+# Trailing + and # belong to the word: "c", "c++" and "c#" are different tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+[+#]*")
+ORDINAL_SUFFIX = re.compile(r"(\d+)(st|nd|rd|th)")
+# Roman numerals up to 39 (sequels, parts, wars, monarchs); larger ones are mostly ordinary words ("mix", "cd")
+ROMAN_NUMERAL = re.compile(r"(x{0,3})(ix|iv|v?i{0,3})")
+ROMAN_VALUES = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9}
+ORDINAL_WORDS = {
+    word: n for n, word in enumerate(
+        "first second third fourth fifth sixth seventh eighth ninth tenth eleventh twelfth".split(), 1
+    )
+}
+
+
+def _content_words(topic: str):
+    words = [w for w in TOKEN_PATTERN.findall(topic.lower()) if w not in FILLER_WORDS]
+    return words or TOKEN_PATTERN.findall(topic.lower())
+
+
+def _number(word: str):
+    """The number a word spells ("2", "2nd", "second", "ii"), or None."""
+    if word.isdigit():
+        return int(word)
+    ordinal = ORDINAL_SUFFIX.fullmatch(word)
+    if ordinal:
+        return int(ordinal.group(1))
+    if word in ORDINAL_WORDS:
+        return ORDINAL_WORDS[word]
+    roman = ROMAN_NUMERAL.fullmatch(word)
+    if word and roman:
+        tens, ones = roman.groups()
+        return 10 * len(tens) + ROMAN_VALUES.get(ones, 0)
+    return None
+
+
+def _markers(topic: str):
+    """
+    What two topics must share to match however similar they look: the
+    numbers they mention, however spelled ("world war 2" = "world war ii"),
+    and symbol-bearing words like "c++" and "c#".
+    """
+    markers = set()
+    for word in TOKEN_PATTERN.findall(topic.lower()):
+        number = _number(word)
+        if number is not None:
+            markers.add(str(number))
+        elif not word.isalnum():
+            markers.add(word)
+    return markers
+
+
+def embed(topics):
+    """
+    L2-normalized hashed character n-gram vectors (EMBEDDING_DIM float32 per
+    topic). CPU-only and dependency-free; robust to word order, plurals,
+    casing and filler words like "how does ... work".
+    """
+    import numpy as np # imported on first use, like matplotlib, to keep app startup lean
+    vectors = np.zeros((len(topics), EMBEDDING_DIM), dtype=np.float32)
+    for row, topic in enumerate(topics):
+        words = _content_words(topic)
+        text = f" {' '.join(words)} "
+        grams = [(text[i:i + n], 1.0) for n in NGRAM_SIZES for i in range(len(text) - n + 1)]
+        grams += [(f"w:{w}", WORD_WEIGHT) for w in words]
+        for gram, weight in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            vectors[row, h % EMBEDDING_DIM] += weight if h & 0x80000000 else -weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """
+    Topics and their embeddings for one generator, persisted as
+    <name>.topics.txt (one topic per line) and <name>.vectors.npy, a
+    memory-mapped float32 matrix grown by doubling. Lookup is one
+    matrix-vector product over every stored row.
+
+    remove() zeroes a topic's row, which never matches, and appends the row
+    number to <name>.removed.txt; once removed rows reach COMPACT_FRACTION
+    of the index all three files are rewritten without them.
+
+    Several server processes may share the files: every read and write holds
+    <name>.lock and first catches up with what the others appended (or
+    reloads, after a compaction or clear elsewhere).
+    """
+
+    def __init__(self, directory: str, name: str, initial_capacity=1024):
+        self.topics_path = os.path.join(directory, f"{name}.topics.txt")
+        self.vectors_path = os.path.join(directory, f"{name}.vectors.npy")
+        self.removed_path = os.path.join(directory, f"{name}.removed.txt")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._topics = []
+        self._rows = {}
+        self._removed = set() # row numbers of removed topics
+        self._vectors = None
+        self._loaded = False
+        # How far this process has read the shared files, and which files it read
+        self._topics_file = None # (st_dev, st_ino) of the topic list
+        self._topics_offset = 0
+        self._removed_offset = 0
+        self._vectors_file = None
+
+    @contextmanager
+    def _file_lock(self):
+        """Excludes other processes using the same files. Taken inside self._lock."""
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass # LK_LOCK gives up after ~10 seconds; keep waiting
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _identity(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    @staticmethod
+    def _read_lines(path, offset):
+        """Complete lines appended to `path` after byte `offset`, and the new offset."""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1 # a line still being written is picked up next time
+        return data[:end].decode("utf-8").splitlines(), offset + end
+
+    def _open_vectors(self):
+        import numpy as np
+        self._vectors = np.load(self.vectors_path, mmap_mode="r+")
+        self._vectors_file = self._identity(self.vectors_path)
+
+    def _load(self):
+        import numpy as np
+        self._vectors = None
+        self._topics_file = self._identity(self.topics_path)
+        self._topics, self._topics_offset = self._read_lines(self.topics_path, 0)
+        self._rows = {topic: row for row, topic in enumerate(self._topics)}
+
+        vectors = None
+        if os.path.exists(self.vectors_path):
+            try:
+                vectors = np.load(self.vectors_path, mmap_mode="r+")
+            except (OSError, ValueError) as e:
+                print(f"Semantic index {self.vectors_path} unreadable, rebuilding: {e}")
+        if vectors is None or vectors.shape[1] != EMBEDDING_DIM or vectors.shape[0] < len(self._topics):
+            # Missing, stale or written by another embedding: re-embed from the topic list
+            vectors = self._allocate(max(self.initial_capacity, 2 * len(self._topics)))
+            if self._topics:
+                vectors[:len(self._topics)] = embed(self._topics)
+                vectors.flush()
+        self._vectors = vectors
+        self._vectors_file = self._identity(self.vectors_path)
+        # Zeroed rows were removed, whether or not the removal made it into removed.txt
+        count = len(self._topics)
+        removed = np.flatnonzero(~vectors[:count].any(axis=1)).tolist() if count else []
+        self._removed = set()
+        self._removed_offset = 0
+        self._forget(removed)
+        self._forget(self._read_removed())
+        self._loaded = True
+
+    def _read_removed(self):
+        lines, self._removed_offset = self._read_lines(self.removed_path, self._removed_offset)
+        return [int(line) for line in lines if line.isdigit()]
+
+    def _forget(self, rows):
+        for row in rows:
+            if row < len(self._topics) and row not in self._removed:
+                self._removed.add(row)
+                if self._rows.get(self._topics[row]) == row:
+                    del self._rows[self._topics[row]]
+
+    def _sync(self):
+        """Catches up with the files. Called with both locks held."""
+        if not self._loaded or self._identity(self.topics_path) != self._topics_file:
+            # First use, or another process compacted or cleared the index
+            self._load()
+            return
+        new, self._topics_offset = self._read_lines(self.topics_path, self._topics_offset)
+        for topic in new:
+            self._rows[topic] = len(self._topics)
+            self._topics.append(topic)
+        if new and self._identity(self.vectors_path) != self._vectors_file:
+            self._open_vectors() # another process grew the matrix
+        self._forget(self._read_removed())
+
+    def _allocate(self, capacity, copy_from=None):
+        import numpy as np
+        tmp = self.vectors_path + ".tmp"
+        vectors = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, EMBEDDING_DIM))
+        if copy_from is not None:
+            vectors[:len(copy_from)] = copy_from
+        vectors.flush()
+        del vectors
+        os.replace(tmp, self.vectors_path)
+        return np.load(self.vectors_path, mmap_mode="r+")
+
+    def add(self, topics):
+        """Indexes the (normalized) topics not already present."""
+        with self._lock, self._file_lock():
+            self._sync()
+            new = list(dict.fromkeys(t for t in topics if t and "\n" not in t and t not in self._rows))
+            if not new:
+                return
+            count = len(self._topics)
+            if count + len(new) > self._vectors.shape[0]:
+                capacity = max(2 * self._vectors.shape[0], count + len(new))
+                old, self._vectors = self._vectors[:count].copy(), None
+                self._vectors = self._allocate(capacity, old)
+                self._vectors_file = self._identity(self.vectors_path)
+            self._vectors[count:count + len(new)] = embed(new)
+            self._vectors.flush()
+            # The topic list is written last: a crash in between leaves unused rows, never unlabelled ones
+            data = "".join(f"{t}\n" for t in new).encode("utf-8")
+            with open(self.topics_path, "ab") as f:
+                f.write(data)
+            self._topics_file = self._identity(self.topics_path)
+            self._topics_offset += len(data)
+            for topic in new:
+                self._rows[topic] = len(self._topics)
+                self._topics.append(topic)
+
+    def candidates(self, topic: str, threshold: float, limit: int = CANDIDATES):
+        """
+        Up to `limit` indexed topics with similarity >= threshold, best first,
+        as [(topic, similarity)]. Topics with different markers (numbers,
+        "c" / "c++") never match; see _markers().
+        """
+        import numpy as np
+        with self._lock, self._file_lock():
+            self._sync()
+            count = len(self._topics)
+            vectors = self._vectors
+            topics = self._topics
+            removed = set(self._removed)
+        if count == 0:
+            return []
+
+        scores = vectors[:count] @ embed([topic])[0]
+        # Removed rows are zero vectors, scoring 0: below any useful threshold
+        k = min(max(limit, CANDIDATES), count)
+        best = np.argpartition(-scores, k - 1)[:k]
+        markers = _markers(topic)
+        matches = []
+        for row in best[np.argsort(-scores[best])]:
+            if scores[row] < threshold or len(matches) == limit:
+                break
+            if row not in removed and _markers(topics[row]) == markers:
+                matches.append((topics[row], float(scores[row])))
+        return matches
+
+    def nearest(self, topic: str, threshold: float):
+        """The most similar indexed topic with similarity >= threshold, as (topic, similarity), or None."""
+        matches = self.candidates(topic, threshold, limit=1)
+        return matches[0] if matches else None
+
+    def remove(self, topics):
+        """Drops the given topics; compacts the files once enough rows are removed."""
+        with self._lock, self._file_lock():
+            self._sync()
+            rows = sorted(self._rows[t] for t in dict.fromkeys(topics) if t in self._rows)
+            if not rows:
+                return
+            self._vectors[rows] = 0.0
+            self._vectors.flush()
+            data = "".join(f"{row}\n" for row in rows).encode("utf-8")
+            with open(self.removed_path, "ab") as f:
+                f.write(data)
+            self._removed_offset += len(data)
+            self._forget(rows)
+            if len(self._removed) >= max(1, COMPACT_FRACTION * len(self._topics)):
+                self._compact()
+
+    def _compact(self):
+        """Rewrites the files without removed rows. Called with both locks held."""
+        import numpy as np
+        keep = [row for row in range(len(self._topics)) if row not in self._removed]
+        topics = [self._topics[row] for row in keep]
+        kept = self._vectors[np.asarray(keep, dtype=np.int64)].copy() if keep else None
+        # Vectors go first: a crash before the new topic list is in place leaves
+        # no vectors file, and _load() re-embeds from whichever list survived
+        self._vectors = None
+        os.remove(self.vectors_path)
+        tmp = self.topics_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("".join(f"{t}\n" for t in topics))
+        os.replace(tmp, self.topics_path)
+        # Row numbers in removed.txt referred to the old list
+        if os.path.exists(self.removed_path):
+            os.remove(self.removed_path)
+        self._vectors = self._allocate(max(self.initial_capacity, 2 * len(topics)), kept)
+        self._load()
+
+    def topics(self):
+        """The indexed topics (removed ones excluded)."""
+        with self._lock, self._file_lock():
+            self._sync()
+            return list(self._rows)
+
+    def __contains__(self, topic):
+        with self._lock, self._file_lock():
+            self._sync()
+            return topic in self._rows
+
+    def __len__(self):
+        with self._lock, self._file_lock():
+            self._sync()
+            return len(self._rows)
+
+    def clear(self):
+        with self._lock, self._file_lock():
+            self._vectors = None
+            for path in (self.topics_path, self.vectors_path, self.removed_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._topics, self._rows, self._removed = [], {}, set()
+            self._loaded = False
+
+
+class TopicIndex:
+    """One VectorIndex per result-cache generator."""
+
+    def __init__(self, directory=SEMANTIC_CACHE_DIR, generators=SEMANTIC_CACHE_GENERATORS,
+                 threshold=SEMANTIC_CACHE_THRESHOLD, enabled=SEMANTIC_CACHE):
+        self.threshold = threshold
+        self.enabled = enabled
+        self.indexes = {generator: VectorIndex(directory, generator) for generator in generators}
+        self.hits = 0
+        self.misses = 0
+
+    def covers(self, generator: str) -> bool:
+        return self.enabled and generator in self.indexes
+
+    def add(self, generator: str, topic: str):
+        if self.covers(generator):
+            self.indexes[generator].add([topic])
+
+    def candidates(self, generator: str, topic: str):
+        """[(cached topic, similarity)] close enough to `topic` for `generator`, best first."""
+        if not self.covers(generator):
+            return []
+        matches = self.indexes[generator].candidates(topic, self.threshold)
+        if matches:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return matches
+
+    def remove(self, generator: str, topics):
+        if self.covers(generator):
+            self.indexes[generator].remove(topics)
+
+    def clear(self):
+        for index in self.indexes.values():
+            index.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "topics": {generator: len(index) for generator, index in self.indexes.items()} if self.enabled else {},
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+index = TopicIndex()
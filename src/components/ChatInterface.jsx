@@ -29,7 +29,7 @@ const ChatInterface = () => {
         setIsLoading(true);
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -37,11 +37,35 @@ const ChatInterface = () => {
                 body: JSON.stringify({ message: input }),
             });
 
-            if (!response.ok) throw new Error('Network response was not ok');
+            if (!response.ok || !response.body) throw new Error('Network response was not ok');
 
-            const data = await response.json();
-            const aiMessage = { role: 'ai', content: data.response };
-            setMessages(prev => [...prev, aiMessage]);
+            // Show the answer as it streams in (server-sent events)
+            setMessages(prev => [...prev, { role: 'ai', content: '' }]);
+            setIsLoading(false);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let content = '';
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const event of events) {
+                    const dataLine = event.split('\n').find(line => line.startsWith('data:'));
+                    if (!dataLine) continue;
+                    const data = JSON.parse(dataLine.slice(5));
+                    if (data.delta) content += data.delta;
+                    if (data.error) content += `\n\n⚠️ ${data.error}`;
+                }
+
+                const aiMessage = { role: 'ai', content };
+                setMessages(prev => [...prev.slice(0, -1), aiMessage]);
+            }
         } catch (error) {
             console.error('Error:', error);
             setMessages(prev => [...prev, { role: 'ai', content: 'Sorry, I encountered an error. Please try again.' }]);
@@ -0,0 +1,83 @@
+import React from 'react';
+
+// Draws the layout JSON returned by /api/generate-map with output_format: 'layout'.
+// Coordinates are in points with y pointing down, so they map straight onto the SVG viewBox.
+// With onNodeClick, clicking a box asks to expand that node (see /api/maps/<id>/expand).
+const TITLE_HEIGHT = 48;
+
+const ConceptMap = ({ layout, className, onNodeClick, busyNode }) => {
+    const { width, height, style, nodes, edges, title } = layout;
+
+    return (
+        <svg
+            viewBox={`0 ${-TITLE_HEIGHT} ${width} ${height + TITLE_HEIGHT}`}
+            className={className}
+            style={{ background: style.background }}
+            role="img"
+            aria-label={title}
+        >
+            <text
+                x={width / 2}
+                y={-TITLE_HEIGHT / 2}
+                textAnchor="middle"
+                dominantBaseline="middle"
+                fontSize={20}
+                fontWeight="bold"
+                fill={style.title}
+            >
+                {title}
+            </text>
+
+            <g fill="none" stroke={style.edge} strokeWidth={1.5} strokeOpacity={0.8}>
+                {edges.map((edge) => (
+                    <polyline
+                        key={`${edge.source}-${edge.target}`}
+                        points={edge.points.map(([x, y]) => `${x},${y}`).join(' ')}
+                    >
+                        {edge.label && <title>{edge.label}</title>}
+                    </polyline>
+                ))}
+            </g>
+
+            {nodes.map((node) => {
+                const fontSize = node.depth === 0 ? style.font_size + 2 : style.font_size;
+                const lineHeight = fontSize * 1.2;
+                const firstLineY = node.y - ((node.lines.length - 1) * lineHeight) / 2;
+                return (
+                    <g
+                        key={node.label}
+                        onClick={onNodeClick ? (e) => { e.stopPropagation(); onNodeClick(node.label); } : undefined}
+                        style={{ cursor: onNodeClick ? 'pointer' : undefined, opacity: busyNode === node.label ? 0.5 : 1 }}
+                    >
+                        {onNodeClick && <title>Expand "{node.label}"</title>}
+                        <rect
+                            x={node.x - node.w / 2}
+                            y={node.y - node.h / 2}
+                            width={node.w}
+                            height={node.h}
+                            rx={Math.min(node.w, node.h) * 0.2}
+                            fill="white"
+                            stroke={node.color}
+                            strokeWidth={2}
+                        />
+                        <text
+                            textAnchor="middle"
+                            dominantBaseline="middle"
+                            fontSize={fontSize}
+                            fontWeight={node.depth === 0 ? 'bold' : 600}
+                            fill={style.text}
+                        >
+                            {node.lines.map((line, i) => (
+                                <tspan key={i} x={node.x} y={firstLineY + i * lineHeight}>
+                                    {line}
+                                </tspan>
+                            ))}
+                        </text>
+                    </g>
+                );
+            })}
+        </svg>
+    );
+};
+
+export default ConceptMap;
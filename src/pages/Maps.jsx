@@ -1,17 +1,21 @@
 import React, { useState } from 'react';
 import { Share2, Loader2, Sparkles, X, ZoomIn } from 'lucide-react';
+import ConceptMap from '../components/ConceptMap';
 
 const Maps = () => {
     const [topic, setTopic] = useState('');
     const [loading, setLoading] = useState(false);
-    const [mapImage, setMapImage] = useState(null);
+    const [mapLayout, setMapLayout] = useState(null);
+    const [mapId, setMapId] = useState(null);
+    const [expandingNode, setExpandingNode] = useState(null);
     const [isZoomed, setIsZoomed] = useState(false);
     const [error, setError] = useState(null);
 
     const generateMap = async () => {
         if (!topic.trim()) return;
         setLoading(true);
-        setMapImage(null);
+        setMapLayout(null);
+        setMapId(null);
         setError(null);
         setIsZoomed(false);
 
@@ -19,7 +23,7 @@ const Maps = () => {
             const res = await fetch('/api/generate-map', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ topic })
+                body: JSON.stringify({ topic, output_format: 'layout' })
             });
 
             if (!res.ok) {
@@ -28,10 +32,11 @@ const Maps = () => {
             }
 
             const data = await res.json();
-            if (data.map_image) {
-                setMapImage(`data:image/png;base64,${data.map_image}`);
+            if (data.layout) {
+                setMapLayout(data.layout);
+                setMapId(data.map_id);
             } else {
-                throw new Error("No image data received from AI");
+                throw new Error("No map data received from AI");
             }
         } catch (err) {
             console.error(err);
@@ -41,6 +46,35 @@ const Maps = () => {
         }
     };
 
+    // Asks the backend for the children of one node only; the rest of the map keeps its layout
+    const expandNode = async (node) => {
+        if (!mapId || expandingNode) return;
+        setExpandingNode(node);
+        setError(null);
+
+        try {
+            const res = await fetch(`/api/maps/${mapId}/expand`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ node, output_format: 'layout' })
+            });
+
+            if (!res.ok) {
+                const errText = await res.text();
+                throw new Error(`Error ${res.status}: ${errText || res.statusText}`);
+            }
+
+            const data = await res.json();
+            setMapLayout(data.layout);
+            setMapId(data.map_id);
+        } catch (err) {
+            console.error(err);
+            setError(err.message || "Failed to expand the map. Please try again.");
+        } finally {
+            setExpandingNode(null);
+        }
+    };
+
     return (
         <div className="pt-24 pb-12 min-h-screen bg-slate-50">
             <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
@@ -85,19 +119,19 @@ const Maps = () => {
                         )}
                     </div>
 
-                    {mapImage && (
+                    {mapLayout && (
                         <div className="relative z-10 w-full max-w-4xl mt-8">
                             <div
                                 className="bg-white p-4 rounded-xl shadow-lg border border-slate-200 cursor-zoom-in group relative"
                                 onClick={() => setIsZoomed(true)}
                             >
-                                <img src={mapImage} alt="Generated Concept Map" className="w-full rounded-lg" />
+                                <ConceptMap layout={mapLayout} className="w-full h-auto rounded-lg" onNodeClick={expandNode} busyNode={expandingNode} />
                                 <div className="absolute inset-0 bg-black/0 group-hover:bg-black/5 transition-colors rounded-lg flex items-center justify-center">
                                     <ZoomIn className="text-white opacity-0 group-hover:opacity-100 w-10 h-10 transition-opacity drop-shadow-lg" />
                                 </div>
                             </div>
                             <div className="text-center mt-4">
-                                <p className="text-sm text-slate-500 italic">Click the image to expand</p>
+                                <p className="text-sm text-slate-500 italic">Click a concept to expand it, or the background to enlarge the map</p>
                             </div>
                         </div>
                     )}
@@ -125,9 +159,10 @@ const Maps = () => {
                             className="relative max-w-7xl w-full animate-in zoom-in duration-300"
                             onClick={(e) => e.stopPropagation()}
                         >
-                            <img
-                                src={mapImage}
-                                alt="Full Screen Concept Map"
+                            <ConceptMap
+                                layout={mapLayout}
+                                onNodeClick={expandNode}
+                                busyNode={expandingNode}
                                 className="w-full h-auto rounded-xl shadow-2xl border border-white/10"
                             />
                             <p className="text-center text-white/70 text-sm mt-4">
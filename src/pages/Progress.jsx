@@ -12,10 +12,10 @@ const Progress = () => {
             .then(data => setStats(data))
             .catch(err => console.error("Error fetching progress:", err));
 
-        fetch('/api/analytics/dashboard')
+        fetch('/api/analytics/dashboard?output_format=svg')
             .then(res => res.json())
             .then(data => {
-                if (data.chart) setChartImage(`data:image/png;base64,${data.chart}`);
+                if (data.chart) setChartImage(`data:${data.mime_type || 'image/png'};base64,${data.chart}`);
             })
             .catch(err => console.error("Error fetching chart:", err));
     }, []);